@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from app.core.security import PasswordHashOverloaded
 from fastapi.security import OAuth2PasswordBearer
 from app.services.admin_service import AdminService
 from app.models.response import ResponseModel
@@ -50,6 +51,11 @@ async def admin_login(login_data: AdminLogin):
             msg="Login successful",
             data=Token(access_token=access_token)
         )
+    except PasswordHashOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -111,6 +117,11 @@ async def create_admin(
             msg="Admin created successfully",
             data=new_admin
         )
+    except PasswordHashOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
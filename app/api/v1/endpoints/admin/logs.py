@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from app.utils.pagination import InvalidCursor
 from app.services.admin_service import AdminService
 from app.models.response import ResponseModel
 from app.services.auth_service import get_current_admin
@@ -12,7 +13,9 @@ async def get_points_logs(
     skip: int = 0,
     limit: int = 10,
     sort_by: str = "created_at",
-    sort_order: int = -1
+    sort_order: int = -1,
+    cursor: Optional[str] = None,
+    with_total: bool = True
 ):
     """获取积分变动记录列表
     
@@ -22,6 +25,8 @@ async def get_points_logs(
         limit (int): 每页记录数，默认10
         sort_by (str): 排序字段，默认created_at
         sort_order (int): 排序方式，1为升序，-1为降序，默认-1
+        cursor (str, optional): 上一页返回的 next_cursor，传入时按游标翻页（忽略 skip）
+        with_total (bool): 是否统计总数（总数有短时间缓存），默认True
     
     Returns:
         ResponseModel: {
@@ -55,7 +60,9 @@ async def get_points_logs(
             skip=skip,
             limit=limit,
             sort_by=sort_by,
-            sort_order=sort_order
+            sort_order=sort_order,
+            cursor=cursor,
+            with_total=with_total
         )
         
         return ResponseModel(
@@ -63,6 +70,11 @@ async def get_points_logs(
             msg="Success",
             data=logs_data
         )
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -76,7 +88,9 @@ async def get_admin_logs(
     limit: int = 10,
     sort_by: str = "created_at",
     sort_order: int = -1,
-    action: Optional[str] = None
+    action: Optional[str] = None,
+    cursor: Optional[str] = None,
+    with_total: bool = True
 ):
     """获取管理员操作日志
     
@@ -87,6 +101,8 @@ async def get_admin_logs(
         sort_by (str): 排序字段，默认created_at
         sort_order (int): 排序方式，1为升序，-1为降序，默认-1
         action (str, optional): 操作类型筛选
+        cursor (str, optional): 上一页返回的 next_cursor，传入时按游标翻页（忽略 skip）
+        with_total (bool): 是否统计总数（总数有短时间缓存），默认True
     
     Returns:
         ResponseModel: {
@@ -121,13 +137,20 @@ async def get_admin_logs(
             limit=limit,
             sort_by=sort_by,
             sort_order=sort_order,
-            action=action
+            action=action,
+            cursor=cursor,
+            with_total=with_total
         )
         return ResponseModel(
             code=200,
             msg="Success",
             data=logs_data
         )
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
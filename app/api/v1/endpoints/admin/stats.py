@@ -1,11 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from app.services.admin_service import AdminService
 from app.models.response import ResponseModel
 from app.services.auth_service import get_current_admin
+from app.core.config import settings
+from app.services.stats_service import StatsService, cached_overview
+from app.utils.utils import legal_action_cache
+from datetime import datetime, timedelta
 from typing import Optional
+import os
 
 router = APIRouter()
 
+@router.get("/stats/overview", response_model=ResponseModel)
+async def get_stats_overview(
+    request: Request,
+    response: Response,
+    current_admin = Depends(get_current_admin)
+):
+    """获取仪表盘汇总数据
+
+    一次返回 /stats/points-increase（各周期）、/stats/total-users、/stats/active-users 的数据，
+    各项查询并发执行，结果在进程内缓存 STATS_OVERVIEW_CACHE_TTL 秒。
+    响应带 ETag，请求头 If-None-Match 与之相同时返回 304。
+
+    Args:
+        current_admin: 当前登录的管理员信息，由 OAuth2 认证提供
+
+    Returns:
+        ResponseModel: {
+            "code": 200,
+            "msg": "Success",
+            "data": {
+                "points_increase": {
+                    "day": int,    # 今日积分增加量
+                    "week": int,   # 本周积分增加量
+                    "month": int,  # 本月积分增加量
+                    "total": int   # 积分增加总量
+                },
+                "total_users": int,  # 用户总数
+                "active_users": int  # 活跃用户数量
+            }
+        }
+
+    Raises:
+        HTTPException 401: 未授权访问
+        HTTPException 500: 服务器内部错误
+    """
+    try:
+        if not current_admin:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Unauthorized"
+            )
+
+        overview, etag = await cached_overview()
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"private, max-age={settings.STATS_OVERVIEW_CACHE_TTL}"
+        }
+        if_none_match = [tag.strip().replace("W/", "") for tag in request.headers.get("if-none-match", "").split(",")]
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
+        return ResponseModel(
+            code=200,
+            msg="Success",
+            data=overview
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
 @router.get("/stats/points-increase", response_model=ResponseModel)
 async def get_points_increase(
     period: Optional[str] = None,
@@ -145,3 +215,122 @@ async def get_active_users(current_admin = Depends(get_current_admin)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+
+@router.get("/stats/timeseries", response_model=ResponseModel)
+async def get_stats_timeseries(
+    metric: str = "points",
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_admin = Depends(get_current_admin)
+):
+    """获取统计时间序列
+
+    Args:
+        metric (str): 指标，可选值：
+            - points: 积分变动（points_change 总和、count 次数）
+            - users: 用户数快照（total_users、active_users）
+        granularity (str): 粒度，hour 或 day，默认 day
+        start (datetime, optional): 开始时间（含），默认 end 之前 30 天（hour 粒度为 24 小时）
+        end (datetime, optional): 结束时间（不含），默认当前时间
+        current_admin: 当前登录的管理员信息，由 OAuth2 认证提供
+
+    时间按 UTC 分桶，没有数据的桶值为 0，一次最多返回 1000 个桶。
+
+    Returns:
+        ResponseModel: {
+            "code": 200,
+            "msg": "Success",
+            "data": {
+                "metric": str,
+                "granularity": str,
+                "series": [
+                    {"bucket": datetime, "points_change": int, "count": int}
+                ]
+            }
+        }
+
+    Raises:
+        HTTPException 401: 未授权访问
+        HTTPException 400: 参数无效
+        HTTPException 500: 服务器内部错误
+    """
+    try:
+        if not current_admin:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Unauthorized"
+            )
+
+        end = end or datetime.utcnow()
+        if start is None:
+            start = end - (timedelta(hours=24) if granularity == "hour" else timedelta(days=30))
+
+        series = await StatsService().get_timeseries(metric, granularity, start, end)
+
+        return ResponseModel(
+            code=200,
+            msg="Success",
+            data={"metric": metric, "granularity": granularity, "series": series}
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@router.get("/stats/legal-action-cache", response_model=ResponseModel)
+async def get_legal_action_cache_stats(current_admin = Depends(get_current_admin)):
+    """获取合法出牌缓存的统计数据
+
+    缓存在每个 worker 进程内独立维护，返回的是处理本次请求的进程的计数。
+
+    Args:
+        current_admin: 当前登录的管理员信息，由 OAuth2 认证提供
+
+    Returns:
+        ResponseModel: {
+            "code": 200,
+            "msg": "Success",
+            "data": {
+                "pid": int,           # 进程号
+                "size": int,          # 当前缓存条数
+                "maxsize": int,       # 最大缓存条数
+                "hits": int,          # 进程内命中次数
+                "misses": int,        # 进程内未命中次数
+                "evictions": int,     # 淘汰次数
+                "hit_rate": float,    # 进程内命中率
+                "redis_enabled": bool,
+                "redis_hits": int,    # Redis 二级缓存命中次数
+                "redis_errors": int
+            }
+        }
+
+    Raises:
+        HTTPException 401: 未授权访问
+        HTTPException 500: 服务器内部错误
+    """
+    try:
+        if not current_admin:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Unauthorized"
+            )
+
+        return ResponseModel(
+            code=200,
+            msg="Success",
+            data={"pid": os.getpid(), **legal_action_cache.stats()}
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from app.utils.pagination import InvalidCursor
+from app.core.security import PasswordHashOverloaded
 from app.services.admin_service import AdminService
 from app.models.response import ResponseModel
 from app.schemas.admin import UpdatePasswordRequest, IncreasePointsRequest
@@ -14,7 +16,9 @@ async def get_users(
     skip: int = 0,
     limit: int = 10,
     sort_by: str = "created_at",
-    sort_order: int = -1
+    sort_order: int = -1,
+    cursor: Optional[str] = None,
+    with_total: bool = True
 ):
     """获取用户列表
     
@@ -24,6 +28,8 @@ async def get_users(
         limit (int): 每页记录数，默认10
         sort_by (str): 排序字段，默认created_at
         sort_order (int): 排序方式，1为升序，-1为降序，默认-1
+        cursor (str, optional): 上一页返回的 next_cursor，传入时按游标翻页（忽略 skip）
+        with_total (bool): 是否统计总数（总数有短时间缓存），默认True
     
     Returns:
         ResponseModel: {
@@ -57,13 +63,20 @@ async def get_users(
             limit=limit,
             sort_by=sort_by,
             sort_order=sort_order,
-            current_admin_id=str(current_admin.id)
+            current_admin_id=str(current_admin.id),
+            cursor=cursor,
+            with_total=with_total
         )
         return ResponseModel(
             code=200,
             msg="Success",
             data=users_data
         )
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -180,6 +193,11 @@ async def update_user(
             msg="User updated successfully",
             data=updated_user
         )
+    except PasswordHashOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -243,6 +261,11 @@ async def update_user_password(
             msg="User password updated successfully",
             data=updated_user
         )
+    except PasswordHashOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -9,10 +9,12 @@ from app.services.bills_service import BillsService
 from app.schemas.bills import (
     UserPointDetailSchema, 
     BillQueryParams,
+    BillCursorQueryParams,
     UserTaskID
 )
 from app.models.user import User, UserInDB
 from app.models.response import ResponseModel
+from app.utils.pagination import InvalidCursor
 
 router = APIRouter()
 
@@ -128,4 +130,22 @@ async def get_bill_list(
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+@router.post("/list/cursor")
+async def get_bill_list_by_cursor(
+    query_params: BillCursorQueryParams, 
+    current_user: User = Depends(get_current_user)
+):
+    """
+    按游标获取账单列表
 
+    第一页不传 cursor，之后每次传入上一页返回的 next_cursor；next_cursor 为 null 表示没有更多数据。
+    """
+    try:
+        page = await BillsService.get_bill_list_by_cursor(current_user, query_params)
+        return ResponseModel(
+                code=200,
+                msg="Success",
+                data= page
+            )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
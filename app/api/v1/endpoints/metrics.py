@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import collect, render
+from app.db.redis import get_redis
+from app.services.ai_queue_service import AIQueueService
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus 指标
+
+    汇总所有 web 进程和 AI worker 进程最近上报的指标（本进程为实时数据）：
+        - fastserver_http_request_duration_seconds{route,method,status,quantile}
+        - fastserver_redis_command_duration_seconds / fastserver_mongo_command_duration_seconds{outcome,quantile}
+        - fastserver_pklord_ai_request_duration_seconds{endpoint,outcome,quantile}
+        - fastserver_ai_queue_pending / fastserver_ai_queue_processing：REQ 队列深度
+        - fastserver_access_log_dropped_total：访问日志队列满时丢弃的条数
+        - fastserver_metrics_processes：参与汇总的进程数
+
+    设置了 METRICS_TOKEN 时需要请求头 Authorization: Bearer <token>。
+    """
+    if settings.METRICS_TOKEN and authorization != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Unauthorized"
+        )
+
+    redis_client = get_redis()
+    merged, processes = await collect(redis_client, "web")
+    gauges = {"metrics_processes": processes}
+    if redis_client is not None:
+        depth = await AIQueueService(redis_client).depth()
+        gauges["ai_queue_pending"] = depth["pending"]
+        gauges["ai_queue_processing"] = depth["processing"]
+    return PlainTextResponse(render(merged, gauges), media_type="text/plain; version=0.0.4")
@@ -1,21 +1,39 @@
+import asyncio
 import json
-from fastapi import APIRouter,Depends
+import time
+from typing import Optional
+from fastapi import APIRouter,Depends,Header,HTTPException,Query,Request
+from fastapi.responses import StreamingResponse
 from app.models.response import ResponseModel
 from app.models.play import PredictPutCardModel
-from app.utils.utils import get_landlord_score
+from app.utils.utils import get_landlord_score, legal_action_cache
+from app.utils.hand import validate_cards
 from app.utils.pklord_ai import PklordAI, PklordLocal
 #from app.core.scheduler import request_queue, request_results
 from app.services.auth_service import get_current_user
 from app.models.user import User, UserInDB
 from app.db.redis import get_redis
+from app.services.ai_queue_service import AIQueueService
+from app.services.result_service import ResultService, ResultWaitersExhausted
 import uuid
 router = APIRouter()
 
 QUEUE_KEY = "pklord_request_queue"
-RESULT_KEY = "pklord_results:"
+# 长轮询单次最多阻塞的秒数，每个等待中的请求会占用一个 Redis 连接
+RESULT_WAIT_MAX_TIMEOUT = 30
+# SSE 空闲时发送保活注释的间隔（秒）
+SSE_KEEPALIVE_INTERVAL = 15
+# SSE 一次最多订阅的请求数
+RESULT_STREAM_MAX_IDS = 20
+# 请求头 X-Sync-Result 取这些值时开启同步模式
+SYNC_HEADER_VALUES = {"1", "true", "yes"}
 
 @router.get("/play/pklord/getLandlordScore", response_model=ResponseModel)
 async def getLandlordScore(current_hand: str, pk_status: int, oppo_call: int, current_user: User = Depends(get_current_user)):
+    try:
+        validate_cards(current_hand)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     score = get_landlord_score(current_hand)
     
     if oppo_call > 0:
@@ -27,33 +45,46 @@ async def getLandlordScore(current_hand: str, pk_status: int, oppo_call: int, cu
 
 # ,current_user: User = Depends(get_current_user)
 @router.post("/play/pklord/predictPutCard", response_model=ResponseModel)
-async def predictPutCard(data: PredictPutCardModel, current_user: User = Depends(get_current_user)):
+async def predictPutCard(
+    data: PredictPutCardModel,
+    sync: bool = False,
+    x_sync_result: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    预测出牌
+
+    默认模式：返回 request_id，客户端再通过 getRequestResult / waitRequestResult 获取结果。
+    同步模式（请求头 X-Sync-Result: 1 或查询参数 sync=true）：
+        本地策略出牌直接返回 code 200，data 为出牌结果，不写 Redis；
+        需要 AI 计算的请求返回 code 202，data 为 request_id，按默认模式获取结果。
+    """
     try:
         redis_client = get_redis() 
+        sync_mode = sync or (x_sync_result or "").lower() in SYNC_HEADER_VALUES
         # 生成唯一的请求ID
         request_id = str(uuid.uuid4())
         print(f"request.pk_status: {data.pk_status}")
         
         if data.pk_status != 2:
-            playable = PklordLocal.play_cards(data)
+            actions = None
+            if data.pk_status == 0:
+                # 先查进程内缓存，未命中再查 Redis 二级缓存，其他 worker 算过的局面不必重算
+                actions = await legal_action_cache.aget(data.current_hand, PklordLocal.last_move(data), redis_client)
+            playable = PklordLocal.play_cards(data, actions)
+            if sync_mode:
+                return ResponseModel(code=200, msg="success", data=playable)
             # 将结果存储到Redis
-            await redis_client.setex(
-                request_id,
-                600,
-                json.dumps({
-                    "code": 200,
-                    "msg": "success",
-                    "data": playable
-                })
-            )
+            await ResultService(redis_client).publish(request_id, {
+                "code": 200,
+                "msg": "success",
+                "data": playable
+            })
         else:
-            await redis_client.lpush(
-                "REQ",
-                json.dumps({
-                    "request_id":request_id,
-                    "data":data.dict()
-                })
-            )   
+            # 交给独立的 AI worker 处理（python -m app.worker）
+            await AIQueueService(redis_client).enqueue(request_id, data.dict())
+            if sync_mode:
+                return ResponseModel(code=202, msg="请求已加入处理队列", data=request_id)
         
         # 返回请求ID，客户端可以用这个ID查询结果
         return ResponseModel(code=200, msg="请求已加入处理队列", data=request_id)
@@ -64,11 +95,8 @@ async def predictPutCard(data: PredictPutCardModel, current_user: User = Depends
 @router.get("/play/pklord/getRequestResult")
 async def getRequestResult(request_id: str):
 
-    redis_client = get_redis() 
-    result = await redis_client.get(request_id)
-    if result:
-        result_dict = json.loads(result)
-        await redis_client.delete(request_id)
+    result_dict = await ResultService(get_redis()).fetch(request_id)
+    if result_dict:
         print(result_dict)
         return result_dict
     else:
@@ -77,3 +105,71 @@ async def getRequestResult(request_id: str):
             "msg": "请求结果不存在或已被获取", 
             "data": None
         }
+
+@router.get("/play/pklord/waitRequestResult")
+async def waitRequestResult(
+    request_id: str,
+    timeout: int = Query(20, ge=1, le=RESULT_WAIT_MAX_TIMEOUT),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    长轮询获取出牌结果：服务端阻塞等待，结果写入后立即返回，最多等待 timeout 秒
+
+    超时返回 code 408，客户端可以直接再次调用；本进程等待中的请求已满时返回 503。
+    """
+    try:
+        result_dict = await ResultService(get_redis()).wait(request_id, timeout)
+    except ResultWaitersExhausted as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if result_dict:
+        return result_dict
+    return {
+        "code": 408,
+        "msg": "等待超时，结果尚未生成或已被获取",
+        "data": None
+    }
+
+@router.get("/play/pklord/resultStream")
+async def resultStream(
+    request: Request,
+    request_ids: str,
+    timeout: int = Query(60, ge=1, le=600),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    SSE 推送出牌结果
+
+    request_ids 为逗号分隔的请求ID（1 ~ RESULT_STREAM_MAX_IDS 个），每个结果就绪后推送一条 result 事件：
+        event: result
+        data: {"request_id": "...", "code": 200, "msg": "success", "data": "..."}
+    全部推送完或超过 timeout 秒后推送 end 事件并关闭连接；空闲时定期发送注释行保持连接。
+    本进程等待中的请求已满时不占用 Redis 连接，发送注释行后稍后再试。
+    """
+    pending = list(dict.fromkeys(request_id for request_id in request_ids.split(",") if request_id))
+    if not pending:
+        raise HTTPException(status_code=400, detail="request_ids 不能为空")
+    if len(pending) > RESULT_STREAM_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"request_ids 最多 {RESULT_STREAM_MAX_IDS} 个")
+    result_service = ResultService(get_redis())
+
+    async def events():
+        deadline = time.monotonic() + timeout
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or await request.is_disconnected():
+                break
+            try:
+                item = await result_service.wait_any(pending, max(1, min(int(remaining), SSE_KEEPALIVE_INTERVAL)))
+            except ResultWaitersExhausted:
+                yield ": busy\n\n"
+                await asyncio.sleep(1)
+                continue
+            if item is None:
+                yield ": keepalive\n\n"
+                continue
+            request_id, result_dict = item
+            pending.remove(request_id)
+            yield f"event: result\ndata: {json.dumps({'request_id': request_id, **result_dict})}\n\n"
+        yield f"event: end\ndata: {json.dumps({'pending': pending})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from app.core.security import PasswordHashOverloaded
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from app.schemas.user import UserCreate, UserResponse, Token, LoginResponse, RegisterResponse, UserResponseData, PointsResponse
 from app.services.user_service import UserService
@@ -35,6 +36,11 @@ async def register(user_data: UserCreate):
             msg="User registered successfully",
             data=None
         )
+    except PasswordHashOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         return ResponseModel(
             code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -82,6 +88,11 @@ async def login(form_data: UserCreate):
             msg="Login successful",
             data={"access_token": access_token, "token_type": "bearer"}
         )
+    except PasswordHashOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
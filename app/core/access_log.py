@@ -0,0 +1,190 @@
+"""
+结构化访问日志
+
+AccessLogMiddleware 是纯 ASGI 中间件，每个请求结束后生成一行 JSON：
+
+    {"ts": ..., "method": "POST", "path": "/api/v1/play/pklord/predictPutCard", "status": 200,
+     "total_ms": 12.3, "handler_ms": 11.9, "redis_ms": 1.2, "redis_calls": 2,
+     "mongo_ms": 3.4, "mongo_calls": 1, "client": "1.2.3.4", "body": {...}}
+
+- total_ms：从收到请求到响应体发送完毕；handler_ms：到响应头发出为止（路由、依赖和接口函数）
+- redis_ms / mongo_ms：请求内 Redis、MongoDB 调用耗时之和（见 app/core/timing.py）
+- 采样：默认按 ACCESS_LOG_SAMPLE_RATE，ACCESS_LOG_ROUTE_SAMPLE_RATES 可按路径单独设置；
+  5xx 和超过 ACCESS_LOG_SLOW_MS 的慢请求总是记录
+- 请求体：只有 ACCESS_LOG_BODY_ROUTES 中的路径才记录，最多 ACCESS_LOG_BODY_MAX_BYTES 字节，
+  JSON 和表单中的敏感字段（ACCESS_LOG_REDACT_FIELDS）替换为 "***"；其他路径不读取、不缓存请求体
+
+同时把请求耗时按路由模板、方法和状态码记入进程的指标（app/core/metrics.py），与是否记录日志无关。
+
+日志经 QueueHandler 放入内存队列，由 QueueListener 的后台线程写到标准输出，请求处理不等待 IO；
+队列满时丢弃并计数。
+"""
+from datetime import datetime
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import random
+import sys
+import time
+from typing import Any, Optional
+from urllib.parse import parse_qsl
+
+from app.core import timing
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger("access")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+REDACTED = "***"
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """队列满时直接丢弃，不阻塞请求，也不打印异常"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+            registry.inc("access_log_dropped")
+
+    def prepare(self, record):
+        # 消息在中间件中已格式化为 JSON，只需传递字符串
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def start_access_log(stream=None) -> None:
+    """启动后台写日志线程（应用启动时调用，可重复调用）"""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.Queue(maxsize=settings.ACCESS_LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter("%(message)s"))
+    logger.handlers = [_DroppingQueueHandler(log_queue)]
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+
+
+def stop_access_log() -> None:
+    """写完队列中剩余的日志后停止（应用关闭时调用）"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_count() -> int:
+    return _DroppingQueueHandler.dropped
+
+
+def sample_rate(path: str) -> float:
+    return settings.ACCESS_LOG_ROUTE_SAMPLE_RATES.get(path, settings.ACCESS_LOG_SAMPLE_RATE)
+
+
+def should_log(path: str, status: int, total_ms: float) -> bool:
+    if status >= 500 or total_ms >= settings.ACCESS_LOG_SLOW_MS:
+        return True
+    rate = sample_rate(path)
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def redact(value: Any, fields: frozenset) -> Any:
+    """递归替换敏感字段"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if str(key).lower() in fields else redact(item, fields)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item, fields) for item in value]
+    return value
+
+
+def parse_body(body: bytes, content_type: str, truncated: bool) -> Any:
+    """解析并脱敏请求体；截断或无法解析的内容只记录长度，避免漏掉脱敏"""
+    fields = frozenset(field.lower() for field in settings.ACCESS_LOG_REDACT_FIELDS)
+    if not body:
+        return None
+    if not truncated:
+        try:
+            if content_type.startswith("application/json"):
+                return redact(json.loads(body), fields)
+            if content_type.startswith("application/x-www-form-urlencoded"):
+                return redact(dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True)), fields)
+        except ValueError:
+            pass
+    return f"<{len(body)}{'+' if truncated else ''} bytes>"
+
+
+class AccessLogMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        token = timing.begin()
+        path = scope["path"]
+        state = {"status": 500, "handler_end": None}
+        body = bytearray()
+        body_state = {"truncated": False}
+        capture_body = path in settings.ACCESS_LOG_BODY_ROUTES
+        max_bytes = settings.ACCESS_LOG_BODY_MAX_BYTES
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request" and not body_state["truncated"]:
+                chunk = message.get("body", b"")
+                room = max_bytes - len(body)
+                body.extend(chunk[:room])
+                if len(chunk) > room:
+                    body_state["truncated"] = True
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                state["handler_end"] = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper if capture_body else receive, send_wrapper)
+        finally:
+            end = time.perf_counter()
+            summary = timing.end(token)
+            total_ms = (end - start) * 1000
+            route = scope.get("route")
+            registry.observe(
+                "http_request", end - start,
+                route=route.path if route is not None else "<unmatched>",
+                method=scope["method"],
+                status=state["status"]
+            )
+            if settings.ACCESS_LOG_ENABLED and should_log(path, state["status"], total_ms):
+                entry = {
+                    "ts": datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+                    "method": scope["method"],
+                    "path": path,
+                    "status": state["status"],
+                    "total_ms": round(total_ms, 3),
+                    "handler_ms": round(((state["handler_end"] or end) - start) * 1000, 3),
+                    **summary,
+                    "client": scope["client"][0] if scope.get("client") else None,
+                }
+                if capture_body:
+                    headers = dict(scope.get("headers") or [])
+                    content_type = headers.get(b"content-type", b"").decode("latin-1")
+                    entry["body"] = parse_body(bytes(body), content_type, body_state["truncated"])
+                logger.info(json.dumps(entry, ensure_ascii=False, default=str))
@@ -18,6 +18,74 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080
     
+    # 牌型索引配置（关闭后回退到解析 JSON）
+    CARD_INDEX_ENABLED: bool = True
+
+    # 上传对局明细时在事务中更新任务统计、用户点数和明细（需要 MongoDB 4.0+ 副本集），
+    # 关闭时并发写入，失败时回滚已完成的部分
+    BILLS_USE_TRANSACTIONS: bool = False
+
+    # 启动时按 app/db/indexes.py 的注册表创建索引（大集合首次建索引耗时较长，可关闭后用命令行单独执行）
+    MONGODB_ENSURE_INDEXES: bool = True
+
+    # 管理后台用户数快照的刷新间隔（秒），/stats/total-users 等接口读取快照
+    STATS_USER_REFRESH_INTERVAL: int = 60
+    # /stats/overview 响应的进程内缓存秒数，0 表示不缓存
+    STATS_OVERVIEW_CACHE_TTL: int = 10
+
+    # 分页总数（count_documents）在进程内的缓存秒数，0 表示每次都重新统计
+    PAGINATION_COUNT_CACHE_TTL: int = 30
+
+    # 密码哈希线程池大小，以及允许排队等待的请求数（超过后返回 503）
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
+    # 已认证用户缓存（秒 / 条数，0 表示关闭）与活跃时间批量写回间隔（秒）
+    PRINCIPAL_CACHE_TTL: int = 30
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    ACTIVITY_FLUSH_INTERVAL: int = 5
+
+    # 合法出牌缓存配置（进程内 LRU 条数，0 表示关闭；可选 Redis 二级缓存供多个 worker 共享）
+    LEGAL_ACTION_CACHE_SIZE: int = 4096
+    LEGAL_ACTION_CACHE_REDIS: bool = False
+    LEGAL_ACTION_CACHE_REDIS_TTL: int = 3600
+    # 三带、飞机、四带二附件枚举的缓存条数（按去掉主体后的手牌计数缓存）
+    ATTACHMENT_CACHE_SIZE: int = 8192
+
+    # 斗地主AI接口配置（共用一个连接池；MAX_CONCURRENCY 为同时在途的请求上限）
+    PKLORD_AI_BASE_URL: str = "http://47.116.37.81:8567/ai-poker"
+    PKLORD_AI_MAX_CONNECTIONS: int = 20
+    PKLORD_AI_MAX_CONCURRENCY: int = 10
+    PKLORD_AI_RETRIES: int = 2
+    PKLORD_AI_RETRY_BACKOFF: float = 0.2
+
+    # AI 出牌 worker 配置（python -m app.worker）
+    AI_WORKER_PROCESSES: int = 2
+    AI_WORKER_CONSUMERS: int = 8
+    # 领取后超过该秒数仍未确认的请求会被放回队列，需大于一次出牌请求的最长耗时（含重试）
+    AI_QUEUE_VISIBILITY_TIMEOUT: int = 60
+    AI_QUEUE_REAPER_INTERVAL: int = 10
+    # Redis >= 6.2 可使用 BLMOVE，否则使用 BRPOPLPUSH
+    AI_QUEUE_USE_BLMOVE: bool = False
+
+    # 长轮询 / SSE 等结果时每个进程同时阻塞等待（各占一个 Redis 连接）的上限，超过时返回 503
+    RESULT_WAIT_MAX_WAITERS: int = 100
+
+    # 访问日志（app/core/access_log.py）：默认采样率、按路径的采样率（JSON，如 {"/api/v1/play/pklord/getRequestResult": 0.01}）、
+    # 总是记录的慢请求阈值（毫秒）；只有 ACCESS_LOG_BODY_ROUTES 中的路径记录请求体，敏感字段会被替换
+    ACCESS_LOG_ENABLED: bool = True
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    ACCESS_LOG_ROUTE_SAMPLE_RATES: dict = {}
+    ACCESS_LOG_SLOW_MS: int = 1000
+    ACCESS_LOG_BODY_ROUTES: list = []
+    ACCESS_LOG_BODY_MAX_BYTES: int = 2048
+    ACCESS_LOG_REDACT_FIELDS: list = ["password", "new_password", "hashed_password", "token", "access_token"]
+    ACCESS_LOG_QUEUE_SIZE: int = 10000
+
+    # 指标：各进程上报快照到 Redis 的间隔（秒）；设置 METRICS_TOKEN 后 /metrics 需要 Authorization: Bearer <token>
+    METRICS_PUSH_INTERVAL: int = 10
+    METRICS_TOKEN: Optional[str] = None
+
     # 跨域配置
     BACKEND_CORS_ORIGINS: list = ["*"]
     
@@ -0,0 +1,217 @@
+"""
+进程内指标与跨进程汇总
+
+每个进程（restart.py 启动的每个 uvicorn 进程、每个 AI worker 进程）各自维护一个 MetricsRegistry，
+只在本进程的事件循环中更新，不加锁。记录的内容：
+
+    http_request         每个请求的耗时，按 route / method / status 分组（AccessLogMiddleware 记录）
+    redis_command        每条 Redis 命令（或一次 pipeline）的耗时，按 outcome 分组
+    mongo_command        每条 MongoDB 命令的耗时，按 outcome 分组
+    pklord_ai_request    PklordAI 上游每次请求（含重试）的耗时，按 endpoint / outcome 分组
+
+耗时用 HDR 风格的对数线性直方图保存（相对误差约 3%），不同进程的直方图可以直接相加后再计算分位数。
+各进程每隔 METRICS_PUSH_INTERVAL 秒把快照写入 Redis 的 METRICS_KEY 哈希，
+/metrics 接口读取所有进程的快照合并后输出 Prometheus 文本格式。
+
+MongoDB 的命令监听回调在 motor 的线程池中执行，与事件循环线程同时更新计数时极少数情况下会少记一次，对监控可以忽略。
+"""
+import json
+import os
+import socket
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+METRICS_KEY = "metrics:processes"
+NAMESPACE = "fastserver"
+
+# 小于 2^SUB_BITS 微秒的值精确记录，之后每个 2 的幂区间分成 2^(SUB_BITS-1) 个桶
+SUB_BITS = 6
+_EXACT = 1 << SUB_BITS
+_HALF = _EXACT >> 1
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def bucket_index(micros: int) -> int:
+    if micros < _EXACT:
+        return max(micros, 0)
+    shift = micros.bit_length() - SUB_BITS
+    return _EXACT + (shift - 1) * _HALF + ((micros >> shift) - _HALF)
+
+
+def bucket_upper(index: int) -> int:
+    """桶内最大值（微秒）"""
+    if index < _EXACT:
+        return index
+    shift = (index - _EXACT) // _HALF + 1
+    mantissa = (index - _EXACT) % _HALF + _HALF
+    return ((mantissa + 1) << shift) - 1
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds: float) -> None:
+        index = bucket_index(int(seconds * 1e6))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.sum += seconds
+
+    def merge(self, snapshot: dict) -> None:
+        for index, count in snapshot["counts"].items():
+            index = int(index)
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += snapshot["count"]
+        self.sum += snapshot["sum"]
+
+    def quantile(self, q: float) -> float:
+        """分位数（秒），取所在桶的上界"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return bucket_upper(index) / 1e6
+        return bucket_upper(max(self.counts)) / 1e6
+
+    def snapshot(self) -> dict:
+        return {"counts": dict(self.counts), "count": self.count, "sum": self.sum}
+
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: dict) -> LabelKey:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms: Dict[LabelKey, Histogram] = {}
+        self.counters: Dict[LabelKey, float] = {}
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.record(seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        return {
+            "histograms": [
+                {"name": name, "labels": dict(labels), **histogram.snapshot()}
+                for (name, labels), histogram in list(self.histograms.items())
+            ],
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in list(self.counters.items())
+            ],
+        }
+
+    def merge(self, snapshot: dict) -> None:
+        for item in snapshot["histograms"]:
+            key = _key(item["name"], item["labels"])
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.merge(item)
+        for item in snapshot["counters"]:
+            self.inc(item["name"], item["value"], **item["labels"])
+
+
+registry = MetricsRegistry()
+
+
+def process_id(role: str) -> str:
+    return f"{role}:{socket.gethostname()}:{os.getpid()}"
+
+
+async def push_snapshot(redis_client, role: str) -> None:
+    """把本进程的快照写入 Redis，供 /metrics 汇总"""
+    payload = json.dumps({"ts": time.time(), **registry.snapshot()})
+    await redis_client.hset(METRICS_KEY, process_id(role), payload)
+
+
+async def collect(redis_client, role: str) -> Tuple[MetricsRegistry, int]:
+    """
+    合并所有进程的快照；本进程使用实时数据，超过 3 个上报周期没有更新的进程视为已退出并清理
+
+    Returns:
+        (合并后的指标, 参与汇总的进程数)
+    """
+    merged = MetricsRegistry()
+    merged.merge(registry.snapshot())
+    processes = 1
+    if redis_client is None:
+        return merged, processes
+    own = process_id(role)
+    stale_before = time.time() - 3 * settings.METRICS_PUSH_INTERVAL
+    stale = []
+    for field, payload in (await redis_client.hgetall(METRICS_KEY)).items():
+        if field == own:
+            continue
+        snapshot = json.loads(payload)
+        if snapshot["ts"] < stale_before:
+            stale.append(field)
+            continue
+        merged.merge(snapshot)
+        processes += 1
+    if stale:
+        await redis_client.hdel(METRICS_KEY, *stale)
+    return merged, processes
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra: Optional[dict] = None) -> str:
+    pairs = list(labels) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs) + "}"
+
+
+def render(merged: MetricsRegistry, gauges: Dict[str, float]) -> str:
+    """Prometheus 文本格式：耗时为 summary（分位数由合并后的直方图计算），另有计数器和仪表"""
+    lines: List[str] = []
+    by_name: Dict[str, list] = {}
+    for (name, labels), histogram in merged.histograms.items():
+        by_name.setdefault(name, []).append((labels, histogram))
+    for name in sorted(by_name):
+        metric = f"{NAMESPACE}_{name}_duration_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for labels, histogram in sorted(by_name[name], key=lambda item: item[0]):
+            for q in QUANTILES:
+                lines.append(f"{metric}{_labels(labels, {'quantile': q})} {histogram.quantile(q):.6f}")
+            lines.append(f"{metric}_sum{_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{metric}_count{_labels(labels)} {histogram.count}")
+
+    counters: Dict[str, list] = {}
+    for (name, labels), value in merged.counters.items():
+        counters.setdefault(name, []).append((labels, value))
+    for name in sorted(counters):
+        metric = f"{NAMESPACE}_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for labels, value in sorted(counters[name], key=lambda item: item[0]):
+            lines.append(f"{metric}{_labels(labels)} {value:g}")
+
+    for name in sorted(gauges):
+        metric = f"{NAMESPACE}_{name}"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {gauges[name]:g}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,180 @@
+"""
+已认证用户缓存与活跃时间批量写入
+
+PrincipalCache：进程内按 token 缓存解码后的用户，TTL 内的请求不再访问 MongoDB。
+ActivityBuffer：last_active 只记录在内存中，由定时任务每隔几秒用一次 bulk_write 写回。
+
+用户被删除或修改（管理员操作、积分变更、清除统计）时调用 invalidate_user_principal，
+本进程立即失效，并通过 Redis 发布消息通知其他 worker 进程。
+"""
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.db.mongodb import get_database
+from app.db.redis import get_redis
+from app.models.user import User
+
+# 跨进程失效通知的频道，消息内容为 user_id
+INVALIDATE_CHANNEL = "principal:invalidate"
+
+
+class PrincipalCache:
+    """
+    按 token 缓存的用户信息，带 TTL 和容量上限
+
+    同一用户可能有多个 token，另外维护 user_id -> token 集合的索引，用于按用户失效。
+    """
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # token -> (过期时间, user_id, User)，所有条目 TTL 相同，按插入顺序即按过期顺序
+        self._entries = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, user_id, user = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                return None
+            return user
+
+    def put(self, token: str, user: User, token_exp: Optional[float] = None) -> None:
+        """缓存用户，过期时间不超过 token 本身的过期时间"""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_exp:
+            expires_at = min(expires_at, token_exp)
+        user_id = str(user.id)
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (expires_at, user_id, user)
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_user.get(str(user_id), ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[1])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[1]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ActivityBuffer:
+    """合并 last_active 更新，每个用户只保留最后一次活跃时间"""
+
+    def __init__(self):
+        self._pending: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, user_id: str, now: datetime = None) -> None:
+        with self._lock:
+            self._pending[str(user_id)] = now or datetime.utcnow()
+
+    def drain(self) -> Dict[str, datetime]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    async def flush(self, db=None) -> int:
+        """
+        把缓存的活跃时间一次性写回 users 集合
+
+        Returns:
+            int: 写入的用户数
+        """
+        pending = self.drain()
+        if not pending:
+            return 0
+        if db is None:
+            db = get_database()
+        operations = [
+            UpdateOne(
+                {"_id": ObjectId(user_id)},
+                {"$set": {"is_active": True, "last_active": last_active, "updated_at": last_active}}
+            )
+            for user_id, last_active in pending.items()
+        ]
+        try:
+            await db.users.bulk_write(operations, ordered=False)
+        except Exception as e:
+            print(f"Error flushing user activity: {e}")
+            # 写入失败时放回，下次再写；期间有更新的以新的为准
+            with self._lock:
+                for user_id, last_active in pending.items():
+                    self._pending.setdefault(user_id, last_active)
+            return 0
+        return len(operations)
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_TTL, settings.PRINCIPAL_CACHE_SIZE)
+activity_buffer = ActivityBuffer()
+
+
+async def invalidate_user_principal(user_id) -> None:
+    """用户信息变更后调用：本进程立即失效，并通知其他进程"""
+    principal_cache.invalidate_user(str(user_id))
+    redis_client = get_redis()
+    if redis_client is None:
+        return
+    try:
+        await redis_client.publish(INVALIDATE_CHANNEL, str(user_id))
+    except Exception as e:
+        print(f"Error publishing principal invalidation: {e}")
+
+
+async def listen_for_invalidations() -> None:
+    """订阅其他进程发出的失效通知，在应用启动时作为后台任务运行"""
+    while True:
+        pubsub = None
+        try:
+            pubsub = get_redis().pubsub()
+            await pubsub.subscribe(INVALIDATE_CHANNEL)
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get("type") == "message":
+                    principal_cache.invalidate_user(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 订阅断开期间无法收到通知，清空缓存避免使用过期数据
+            print(f"Principal invalidation listener error: {e}")
+            principal_cache.clear()
+            await asyncio.sleep(1)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
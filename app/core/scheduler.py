@@ -1,11 +1,10 @@
-import json
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from app.services.user_service import UserService
-from app.models.play import PredictPutCardModel
+from app.core.config import settings
+from app.core.metrics import push_snapshot
+from app.core.principal_cache import activity_buffer
 from app.db.redis import get_redis
-import asyncio
-
-from app.utils.pklord_ai import PklordAI,PklordLocal
+from app.services.stats_service import StatsService
+from app.services.user_service import UserService
 
 
 async def update_inactive_users_job():
@@ -14,42 +13,23 @@ async def update_inactive_users_job():
     updated_count = await user_service.update_inactive_users()
     print(f"Updated {updated_count} inactive users")
 
-# 后台任务：处理请求队列
-async def process_request_queue():
-    redis_client = get_redis()
-    result = await redis_client.brpop("REQ", timeout=0)
-    if not result:
-        return
-        
-    _, value = result
-    request_data = json.loads(value)
-    request_id = request_data.get("request_id","")
-    request = request_data.get("data","")
-    #print(request)
+async def flush_user_activity_job():
+    """定时任务：批量写回用户活跃时间"""
+    await activity_buffer.flush()
+
+async def refresh_user_stats_job():
+    """定时任务：刷新管理后台的用户数快照"""
+    try:
+        await StatsService().refresh_user_counts()
+    except Exception as e:
+        print(f"Error refreshing user stats: {e}")
+
+async def push_metrics_job():
+    """定时任务：上报本进程的指标快照"""
     try:
-        request = PredictPutCardModel.from_dict(request)
-        playable = PklordAI.play_cards(request)
-        
-        await redis_client.setex(
-            request_id,
-            600,
-            json.dumps({
-                "code": 200,
-                "msg": "success",
-                "data": playable
-            })
-        )
+        await push_snapshot(get_redis(), "web")
     except Exception as e:
-        print(f"处理请求异常: {e}")
-        await redis_client.setex(
-            request_id,
-            600,
-            json.dumps({
-                "code": 500,
-                "msg": "success",
-                "data": None
-            })
-        )
+        print(f"Error pushing metrics: {e}")
 
 def start_scheduler():
     """启动定时任务调度器"""
@@ -57,7 +37,13 @@ def start_scheduler():
     
     # 添加更新不活跃用户状态的任务，每小时执行一次
     scheduler.add_job(update_inactive_users_job, 'interval', hours=1)
-    #scheduler.add_job(process_request_queue, 'interval', seconds=0.3, max_instances=1, coalesce=True)
+    # 批量写回用户活跃时间
+    scheduler.add_job(flush_user_activity_job, 'interval', seconds=settings.ACTIVITY_FLUSH_INTERVAL, max_instances=1, coalesce=True)
+    # 刷新用户数快照
+    scheduler.add_job(refresh_user_stats_job, 'interval', seconds=settings.STATS_USER_REFRESH_INTERVAL, max_instances=1, coalesce=True)
+    # 上报指标快照，供 /metrics 汇总所有进程
+    scheduler.add_job(push_metrics_job, 'interval', seconds=settings.METRICS_PUSH_INTERVAL, max_instances=1, coalesce=True)
+    # AI 出牌请求由独立的 worker 进程处理（python -m app.worker）
     # 启动调度器
     scheduler.start()
     print("Scheduler started...")
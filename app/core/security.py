@@ -0,0 +1,55 @@
+"""
+密码哈希与校验
+
+bcrypt 每次计算约 200ms，直接在事件循环中执行会阻塞整个 worker。
+这里把计算放到专用线程池（bcrypt 计算时会释放 GIL），并限制排队数量：
+排队的请求超过 PASSWORD_HASH_MAX_PENDING 时抛出 PasswordHashOverloaded，接口返回 503。
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+# 已提交（计算中 + 排队中）的任务数，只在事件循环线程中修改
+_pending = 0
+
+
+class PasswordHashOverloaded(Exception):
+    """密码计算排队过多，调用方应返回 503"""
+
+    def __init__(self):
+        super().__init__("服务繁忙，请稍后重试")
+
+
+async def _run(func, *args):
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHashOverloaded()
+    _pending += 1
+    try:
+        return await asyncio.get_event_loop().run_in_executor(_executor, func, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    """在线程池中计算密码哈希"""
+    return await _run(pwd_context.hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """在线程池中校验密码"""
+    return await _run(pwd_context.verify, plain_password, hashed_password)
+
+
+def pending_count() -> int:
+    """当前计算中和排队中的任务数"""
+    return _pending
@@ -0,0 +1,85 @@
+"""
+单个请求内 Redis / MongoDB 调用耗时的统计
+
+访问日志中间件在请求开始时调用 begin()，之后同一请求（包括 motor 放到线程池执行的操作，
+motor 会复制 contextvars）中的每次 Redis 命令和 MongoDB 命令都通过 record() 记入当前请求。
+不在请求中的调用（定时任务、worker）不计入请求，但和请求中的调用一样计入进程的指标（app/core/metrics.py）。
+"""
+from contextvars import ContextVar, Token
+import functools
+import time
+from typing import Dict, Optional
+
+from pymongo import monitoring
+
+from app.core.metrics import registry
+
+# 当前请求的耗时记录：类别 -> 每次调用的秒数。list.append 是原子的，线程池中的回调可以直接追加
+_timings: ContextVar[Optional[Dict[str, list]]] = ContextVar("request_timings", default=None)
+
+KINDS = ("redis", "mongo")
+
+
+def begin() -> Token:
+    """开始记录当前请求"""
+    return _timings.set({kind: [] for kind in KINDS})
+
+
+def end(token: Token) -> Dict[str, float]:
+    """结束记录，返回汇总：{kind}_ms 与 {kind}_calls"""
+    timings = _timings.get()
+    _timings.reset(token)
+    summary = {}
+    for kind in KINDS:
+        samples = timings.get(kind, []) if timings else []
+        summary[f"{kind}_ms"] = round(sum(samples) * 1000.0, 3)
+        summary[f"{kind}_calls"] = len(samples)
+    return summary
+
+
+def record(kind: str, seconds: float, ok: bool = True) -> None:
+    registry.observe(f"{kind}_command", seconds, outcome="ok" if ok else "error")
+    timings = _timings.get()
+    if timings is not None:
+        timings[kind].append(seconds)
+
+
+def _timed(kind: str, func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = await func(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            record(kind, time.perf_counter() - start, ok)
+    return wrapper
+
+
+def instrument_redis(client) -> None:
+    """给 aioredis 客户端的单条命令和 pipeline 执行加上计时"""
+    client.execute_command = _timed("redis", client.execute_command)
+    make_pipeline = client.pipeline
+
+    @functools.wraps(make_pipeline)
+    def pipeline(*args, **kwargs):
+        pipe = make_pipeline(*args, **kwargs)
+        pipe.execute = _timed("redis", pipe.execute)
+        return pipe
+
+    client.pipeline = pipeline
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo 命令监听器，把每条命令的服务端往返耗时记入当前请求"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record("mongo", event.duration_micros / 1e6, ok=False)
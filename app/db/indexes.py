@@ -0,0 +1,183 @@
+"""
+MongoDB 索引注册表
+
+INDEXES 声明每个集合需要的索引，ensure_indexes 在应用启动时（或通过命令行）创建，
+已存在且定义相同的索引不会重复创建，可以反复执行。
+
+HOT_QUERIES 列出主要业务查询的样例，explain_report 用 explain() 检查它们的执行计划，
+标出仍然是全表扫描（COLLSCAN）的查询。
+
+用法:
+    python -m app.db.indexes            # 创建索引
+    python -m app.db.indexes --report   # 创建索引后输出查询计划报告
+    python -m app.db.indexes --report-only
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Dict, List
+
+from bson.son import SON
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from app.core.config import settings
+from app.db.mongodb import close_mongo_connection, connect_to_mongo, get_database
+
+
+def _index(keys, name: str, **kwargs) -> IndexModel:
+    # MongoDB 3.6 前台建索引会锁住整个库，统一使用后台构建
+    return IndexModel(keys, name=name, background=True, **kwargs)
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # 登录按用户名查询；已有数据可能存在重复用户名，不建唯一索引
+        _index([("username", ASCENDING)], "username"),
+        _index([("created_at", DESCENDING), ("_id", DESCENDING)], "created_at"),
+    ],
+    "user_tasks": [
+        # 任务 ID 由唯一索引保证不重复，生成时不再查库
+        _index([("task_id", ASCENDING)], "task_id_unique", unique=True),
+        # 账单列表：按用户筛选，按 (start_time, _id) 倒序翻页
+        _index([("username", ASCENDING), ("start_time", DESCENDING), ("_id", DESCENDING)], "username_start_time"),
+    ],
+    "point_details": [
+        _index([("task_id", ASCENDING)], "task_id"),
+    ],
+    "current_task": [
+        _index([("username", ASCENDING), ("current_task_id", ASCENDING)], "username_current_task_id"),
+    ],
+    "points_logs": [
+        _index([("created_at", DESCENDING), ("_id", DESCENDING)], "created_at"),
+    ],
+    "admin_logs": [
+        _index([("created_at", DESCENDING), ("_id", DESCENDING)], "created_at"),
+        _index([("action", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], "action_created_at"),
+    ],
+    "stats_rollups": [
+        # 按指标和粒度取一段时间内的桶
+        _index([("metric", ASCENDING), ("granularity", ASCENDING), ("bucket", ASCENDING)], "metric_granularity_bucket"),
+    ],
+}
+
+# 主要业务查询的样例：(说明, 集合, 过滤条件, 排序)
+HOT_QUERIES = [
+    ("login / get user by username", "users", {"username": "u"}, None),
+    ("admin user list", "users", {}, [("created_at", -1), ("_id", -1)]),
+    ("end task: find task", "user_tasks", {"username": "u", "task_id": "t"}, None),
+    ("point detail: find task", "user_tasks", {"task_id": "t"}, None),
+    ("bill list", "user_tasks", {"username": "u"}, [("start_time", -1), ("_id", -1)]),
+    ("end task: aggregate details", "point_details", {"task_id": "t"}, None),
+    ("start task: current tasks", "current_task", {"username": "u"}, None),
+    ("end task: clear current task", "current_task", {"username": "u", "current_task_id": "t"}, None),
+    ("points logs", "points_logs", {}, [("created_at", -1), ("_id", -1)]),
+    ("points increase", "points_logs", {"created_at": {"$gte": datetime(2000, 1, 1)}}, None),
+    ("admin logs", "admin_logs", {}, [("created_at", -1), ("_id", -1)]),
+    ("admin logs by action", "admin_logs", {"action": "a"}, [("created_at", -1), ("_id", -1)]),
+    ("stats buckets", "stats_rollups", {"metric": "points", "granularity": "day", "bucket": {"$gte": datetime(2000, 1, 1)}}, None),
+]
+
+
+async def ensure_indexes(db=None) -> Dict[str, List[str]]:
+    """
+    创建注册表中的索引
+
+    索引逐个创建，单个索引失败（例如已有重复数据导致唯一索引无法创建）只打印该索引的错误，
+    不影响同一集合的其他索引、其他集合和应用启动。
+
+    Returns:
+        Dict[str, List[str]]: 集合 -> 创建成功（或已存在）的索引名
+    """
+    if db is None:
+        db = get_database()
+    created = {}
+    for collection, models in INDEXES.items():
+        names = created[collection] = []
+        for model in models:
+            name = model.document["name"]
+            try:
+                names += await db[collection].create_indexes([model])
+            except PyMongoError as e:
+                print(f"Error creating index {name} on {collection}: {e}")
+    return created
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+def _plan_index(plan: dict):
+    if plan.get("indexName"):
+        return plan["indexName"]
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            name = _plan_index(child)
+            if name:
+                return name
+    return None
+
+
+async def explain_report(db=None) -> List[dict]:
+    """
+    用 explain() 检查 HOT_QUERIES 的执行计划
+
+    Returns:
+        List[dict]: 每个查询的 {name, collection, stages, index, collscan}
+    """
+    if db is None:
+        db = get_database()
+    report = []
+    for name, collection, query, sort in HOT_QUERIES:
+        find = SON([("find", collection), ("filter", query)])
+        if sort:
+            find["sort"] = SON(sort)
+        result = await db.command(SON([("explain", find), ("verbosity", "queryPlanner")]))
+        plan = result["queryPlanner"]["winningPlan"]
+        stages = _plan_stages(plan)
+        report.append({
+            "name": name,
+            "collection": collection,
+            "stages": stages,
+            "index": _plan_index(plan),
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
+
+
+def print_report(report: List[dict]) -> None:
+    print(f'{"query":<34}{"collection":<16}{"plan":<40}{"index"}')
+    for row in report:
+        flag = "COLLSCAN" if row["collscan"] else ""
+        plan = " <- ".join(stage for stage in row["stages"] if stage)
+        print(f'{row["name"]:<34}{row["collection"]:<16}{plan:<40}{row["index"] or flag}')
+    collscans = [row["name"] for row in report if row["collscan"]]
+    print(f"{len(collscans)} of {len(report)} queries use COLLSCAN")
+
+
+async def main(create: bool, report: bool) -> None:
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        if create:
+            created = await ensure_indexes(db)
+            for collection, names in created.items():
+                print(f"{collection}: {', '.join(names)}")
+        if report:
+            print_report(await explain_report(db))
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--report", action="store_true", help="创建索引后输出查询计划报告")
+    parser.add_argument("--report-only", action="store_true", help="只输出查询计划报告，不创建索引")
+    args = parser.parse_args()
+    print(f"Database: {settings.MONGODB_DATABASE}")
+    asyncio.run(main(not args.report_only, args.report or args.report_only))
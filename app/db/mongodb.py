@@ -1,12 +1,13 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
+from app.core.timing import MongoCommandTimer
 
 class MongoDB:
     client: AsyncIOMotorClient = None
     
 async def connect_to_mongo():
     try:
-        MongoDB.client = AsyncIOMotorClient(settings.MONGODB_URL)
+        MongoDB.client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[MongoCommandTimer()])
         print("Connected to MongoDB.")
     except Exception as e:
         print(f"Could not connect to MongoDB: {e}")
@@ -1,5 +1,6 @@
 import aioredis
 from app.core.config import settings
+from app.core.timing import instrument_redis
 
 class Redis:
     client = None
@@ -11,6 +12,7 @@ async def connect_to_redis():
         encoding="utf-8",
         decode_responses=True
     )
+    instrument_redis(Redis.client)
 
 async def close_redis_connection():
     if Redis.client:
@@ -1,16 +1,19 @@
-from datetime import datetime
-import time
 import asyncio
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.access_log import AccessLogMiddleware, start_access_log, stop_access_log
 from app.core.config import settings
 from app.db.mongodb import connect_to_mongo, close_mongo_connection
+from app.db.indexes import ensure_indexes
 from app.db.redis import connect_to_redis, close_redis_connection
 from app.api.v1.endpoints.user import router as user_router
 from app.api.v1.endpoints.admin import router as admin_router
 from app.api.v1.endpoints.bills import router as bills_router
+from app.core.principal_cache import activity_buffer, listen_for_invalidations
 from app.core.scheduler import start_scheduler
+from app.utils.pklord_ai import PklordAI
 from app.api.v1.endpoints.play import router as play_router
+from app.api.v1.endpoints.metrics import router as metrics_router
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
@@ -23,36 +26,42 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 访问日志（采样、脱敏，后台线程写出），最后添加的中间件在最外层，计时包含 CORS 处理
+app.add_middleware(AccessLogMiddleware)
+
 @app.on_event("startup")
 async def startup_db_client():
+    start_access_log()
     await connect_to_mongo()
+    if settings.MONGODB_ENSURE_INDEXES:
+        await ensure_indexes()
     await connect_to_redis()
+    await PklordAI.init_client()
+    # 订阅其他进程的用户缓存失效通知
+    app.state.invalidation_listener = asyncio.create_task(listen_for_invalidations())
     # 启动定时任务
     start_scheduler()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.invalidation_listener.cancel()
+    # 写回尚未落库的用户活跃时间
+    await activity_buffer.flush()
     await close_mongo_connection()
     await close_redis_connection()
+    await PklordAI.close_client()
+    stop_access_log()
 
 @app.get("/")
 async def read_root():
     return {"Hello": "World"}
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-    request_body = await request.body()
-    print(f"{current_time} - {request.method} {request.url.path} - Body: {request_body.decode('utf-8')}")
-    response = await call_next(request)
-    return response
-
 # 包含路由
 app.include_router(user_router, prefix="/api/v1/users", tags=["users"])
 app.include_router(admin_router, prefix="/api/v1/admin", tags=["admin"])
 app.include_router(bills_router, prefix="/api/v1/bills", tags=["bills"])
 app.include_router(play_router, prefix="/api/v1", tags=["play"])
+app.include_router(metrics_router, tags=["metrics"])
 # 47.98.192.59
 # uvicorn app.main:app --host 0.0.0.0 --port 8003 --reload
 if __name__ == "__main__":
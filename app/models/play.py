@@ -2,12 +2,20 @@
 
 from typing import List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
+
+from app.utils.hand import validate_cards
 
 
 class PlayableCardsModel(BaseModel):
     cards: str
     seat: int
+
+    @field_validator('cards')
+    @classmethod
+    def check_cards(cls, cards: str) -> str:
+        return validate_cards(cards)
+
     @classmethod
     def from_dict(cls, data: dict):
         return cls(
@@ -30,6 +38,12 @@ class PredictPutCardModel(BaseModel):
     oppo_win_card_num:int
     playables: List[PlayableCardsModel]
 
+    @field_validator('current_hand')
+    @classmethod
+    def check_current_hand(cls, current_hand: str) -> str:
+        # 手牌与上一手牌在本地解析成 Hand，无效字符或张数过多时返回 422，不会进入出牌计算
+        return validate_cards(current_hand)
+
     @classmethod
     def from_dict(cls, data: dict):
         """
@@ -55,6 +55,16 @@ class BillQueryParams(BaseModel):
     max_down_points: Optional[int] = Field(None, description='最大下分点数')
     page: Optional[int] = Field(1, description='页码')
     page_size: int = Field(10, description='每页条数')
+
+class BillCursorQueryParams(BaseModel):
+    start_time: Optional[int] = Field(None, description='开始时间（毫秒级时间戳）')
+    end_time: Optional[int] = Field(None, description='结束时间（毫秒级时间戳）')
+    min_consumed_points: Optional[int] = Field(None, description='最小消耗点数')
+    max_consumed_points: Optional[int] = Field(None, description='最大消耗点数')
+    min_down_points: Optional[int] = Field(None, description='最小下分点数')
+    max_down_points: Optional[int] = Field(None, description='最大下分点数')
+    cursor: Optional[str] = Field(None, description='上一页返回的 next_cursor，为空时从第一页开始')
+    page_size: int = Field(10, ge=1, le=100, description='每页条数')
     
 class UserTaskDocument(BaseModel):
     id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias='_id')
@@ -1,15 +1,31 @@
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+import time
+from typing import Iterable, Optional, List, Dict, Tuple
 import traceback
 from bson import ObjectId
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.security import PasswordHashOverloaded, hash_password, verify_password
+from app.core.principal_cache import invalidate_user_principal
 from app.db.mongodb import get_database
 from app.models.user import UserInDB
 from app.models.admin_log import AdminLog, PointsLog
+from app.services.stats_service import StatsService
+from app.utils.pagination import cached_count, encode_cursor, find_page, keyset_sort
+
+# 管理员 id -> (过期时间, 用户名)。管理员数量很少，进程内常驻；
+# 本进程创建、改名时立即更新，其他进程的改名最多延迟 ADMIN_USERNAME_CACHE_TTL 秒
+ADMIN_USERNAME_CACHE_TTL = 300
+_admin_usernames: Dict[str, Tuple[float, str]] = {}
+
+
+def remember_admin_username(admin_id: str, username: str) -> None:
+    _admin_usernames[str(admin_id)] = (time.monotonic() + ADMIN_USERNAME_CACHE_TTL, username)
+
+
+def forget_admin_username(admin_id: str) -> None:
+    _admin_usernames.pop(str(admin_id), None)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class AdminService:
     def __init__(self):
@@ -19,20 +35,17 @@ class AdminService:
         self.points_logs_collection = self.db.points_logs
 
     async def get_total_users(self) -> int:
-        """获取用户总数"""
+        """获取用户总数（读取定时刷新的快照）"""
         try:
-            return await self.users_collection.count_documents({"is_admin": {"$ne": True}})
+            return (await StatsService(self.db).get_user_counts())["total_users"]
         except Exception as e:
             print(f"Error getting total users: {e}")
             return 0
 
     async def get_active_users(self) -> int:
-        """获取活跃用户总数"""
+        """获取活跃用户总数（读取定时刷新的快照）"""
         try:
-            return await self.users_collection.count_documents({
-                "is_admin": {"$ne": True},
-                "is_active": True
-            })
+            return (await StatsService(self.db).get_user_counts())["active_users"]
         except Exception as e:
             print(f"Error getting active users: {e}")
             return 0
@@ -44,75 +57,103 @@ class AdminService:
             period: 时间周期，可选值：day(日)、week(周)、month(月)、None(总量)
         """
         try:
-            # 构建查询条件
-            query = {}
-            
-            # 根据时间周期设置查询条件
-            now = datetime.utcnow()
-            if period == "day":
-                # 今日开始时间
-                start_time = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                query["created_at"] = {"$gte": start_time}
-            elif period == "week":
-                # 本周开始时间（以周一为起点）
-                start_time = now - timedelta(days=now.weekday())
-                start_time = start_time.replace(hour=0, minute=0, second=0, microsecond=0)
-                query["created_at"] = {"$gte": start_time}
-            elif period == "month":
-                # 本月开始时间
-                start_time = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                query["created_at"] = {"$gte": start_time}
-            
-            # 聚合查询计算积分总和
-            pipeline = [
-                {"$match": query},
-                {"$group": {
-                    "_id": None,
-                    "total_points": {"$sum": "$points_change"}
-                }}
-            ]
-            
-            result = await self.points_logs_collection.aggregate(pipeline).to_list(length=1)
-            
-            # 如果有结果返回总和，否则返回0
-            return result[0]["total_points"] if result else 0
-            
+            # 从按日预聚合的统计中读取，不再扫描 points_logs
+            return await StatsService(self.db).get_points_increase(period)
         except Exception as e:
             print(f"Error getting points increase: {e}")
             print(f"Traceback: {traceback.format_exc()}")
             return 0
 
+    async def _find_page(
+        self,
+        collection,
+        query: dict,
+        skip: int,
+        limit: int,
+        sort_by: str,
+        sort_order: int,
+        cursor: Optional[str],
+        with_total: bool
+    ) -> Tuple[List[dict], Dict[str, any]]:
+        """
+        列表分页：传入 cursor 时按游标翻页，否则兼容原来的 skip 分页
+
+        返回:
+            (记录列表, 分页信息)，分页信息包含 total/page/total_pages/next_cursor；
+            with_total 为 False 时不统计总数，total 与 total_pages 为 None
+        """
+        if cursor or not skip:
+            documents, next_cursor = await find_page(collection, query, sort_by, sort_order, limit, cursor)
+        else:
+            documents = await collection.find(query) \
+                .sort(keyset_sort(sort_by, sort_order)) \
+                .skip(skip) \
+                .limit(limit + 1) \
+                .to_list(length=limit + 1)
+            next_cursor = None
+            if len(documents) > limit:
+                documents = documents[:limit]
+                next_cursor = encode_cursor(sort_by, sort_order, documents[-1])
+
+        total_count = await cached_count(collection, query) if with_total else None
+        return documents, {
+            "total": total_count,
+            "page": None if cursor else skip // limit + 1,
+            "total_pages": (total_count + limit - 1) // limit if with_total else None,
+            "next_cursor": next_cursor
+        }
+
+    async def resolve_admin_usernames(self, admin_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        批量获取管理员用户名：先查进程内缓存，未命中的用一次 $in 查询补齐
+
+        返回:
+            admin_id -> 用户名，找不到的管理员为 "Unknown"
+        """
+        now = time.monotonic()
+        usernames = {}
+        missing = set()
+        for admin_id in admin_ids:
+            cached = _admin_usernames.get(admin_id)
+            if cached and cached[0] > now:
+                usernames[admin_id] = cached[1]
+            else:
+                missing.add(admin_id)
+
+        object_ids = [ObjectId(admin_id) for admin_id in missing if ObjectId.is_valid(admin_id)]
+        if object_ids:
+            async for admin in self.users_collection.find({"_id": {"$in": object_ids}}, {"username": 1}):
+                remember_admin_username(admin["_id"], admin["username"])
+                usernames[str(admin["_id"])] = admin["username"]
+
+        for admin_id in missing:
+            usernames.setdefault(admin_id, "Unknown")
+        return usernames
+
     async def get_points_logs(
         self,
         skip: int = 0,
         limit: int = 10,
         sort_by: str = "created_at",
-        sort_order: int = -1
+        sort_order: int = -1,
+        cursor: Optional[str] = None,
+        with_total: bool = True
     ) -> Dict[str, any]:
         """获取积分记录列表"""
         try:
-            # 构建排序条件
-            sort_options = [(sort_by, sort_order)]
-            
-            # 获取总记录数
-            total_count = await self.points_logs_collection.count_documents({})
-            
-            # 执行分页查询
-            cursor = self.points_logs_collection.find({}) \
-                .sort(sort_options) \
-                .skip(skip) \
-                .limit(limit)
+            documents, page_info = await self._find_page(
+                self.points_logs_collection, {}, skip, limit, sort_by, sort_order, cursor, with_total
+            )
             
-            logs = []
-            async for log in cursor:
-                # 获取管理员用户名
-                admin = await self.users_collection.find_one({"_id": ObjectId(log["admin_id"])})
-                admin_username = admin["username"] if admin else "Unknown"
+            # 一页的管理员用户名一次查出
+            admin_usernames = await self.resolve_admin_usernames({log["admin_id"] for log in documents})
 
+            logs = []
+            for log in documents:
                 logs.append({
                     "id": str(log["_id"]),
                     "admin_id": log["admin_id"],
-                    "admin_username": admin_username,
+                    "admin_username": admin_usernames[log["admin_id"]],
                     "user_id": log["user_id"],
                     "username": log["username"],
                     "points_change": log["points_change"],
@@ -122,10 +163,11 @@ class AdminService:
                 })
 
             return {
-                "total": total_count,
+                "total": page_info["total"],
                 "logs": logs,
-                "page": skip // limit + 1,
-                "total_pages": (total_count + limit - 1) // limit
+                "page": page_info["page"],
+                "total_pages": page_info["total_pages"],
+                "next_cursor": page_info["next_cursor"]
             }
         except Exception as e:
             print(f"Error getting points logs: {e}")
@@ -155,6 +197,7 @@ class AdminService:
                 reason=reason
             )
             await self.points_logs_collection.insert_one(log.dict())
+            await StatsService(self.db).record_points_change(points_change, log.created_at)
         except Exception as e:
             print(f"Error logging points change: {e}")
 
@@ -164,7 +207,9 @@ class AdminService:
         limit: int = 10,
         sort_by: str = "created_at",
         sort_order: int = -1,
-        action: Optional[str] = None
+        action: Optional[str] = None,
+        cursor: Optional[str] = None,
+        with_total: bool = True
     ) -> Dict[str, any]:
         try:
             # 构建查询条件
@@ -172,28 +217,19 @@ class AdminService:
             if action:
                 query["action"] = action
 
-            # 构建排序条件
-            sort_options = [(sort_by, sort_order)]
-            
-            # 获取总日志数
-            total_count = await self.admin_logs_collection.count_documents(query)
-            
-            # 执行分页查询
-            cursor = self.admin_logs_collection.find(query) \
-                .sort(sort_options) \
-                .skip(skip) \
-                .limit(limit)
+            documents, page_info = await self._find_page(
+                self.admin_logs_collection, query, skip, limit, sort_by, sort_order, cursor, with_total
+            )
             
-            logs = []
-            async for log in cursor:
-                # 获取管理员用户名
-                admin = await self.users_collection.find_one({"_id": ObjectId(log["admin_id"])})
-                admin_username = admin["username"] if admin else "Unknown"
+            # 一页的管理员用户名一次查出
+            admin_usernames = await self.resolve_admin_usernames({log["admin_id"] for log in documents})
 
+            logs = []
+            for log in documents:
                 logs.append({
                     "id": str(log["_id"]),
                     "admin_id": log["admin_id"],
-                    "admin_username": admin_username,
+                    "admin_username": admin_usernames[log["admin_id"]],
                     "action": log["action"],
                     "target_id": log.get("target_id"),
                     "details": log["details"],
@@ -201,21 +237,22 @@ class AdminService:
                 })
 
             return {
-                "total": total_count,
+                "total": page_info["total"],
                 "logs": logs,
-                "page": skip // limit + 1,
-                "total_pages": (total_count + limit - 1) // limit
+                "page": page_info["page"],
+                "total_pages": page_info["total_pages"],
+                "next_cursor": page_info["next_cursor"]
             }
         except Exception as e:
             print(f"Error getting admin logs: {e}")
             print(f"Traceback: {traceback.format_exc()}")
             raise e
 
-    def get_password_hash(self, password: str) -> str:
-        return pwd_context.hash(password)
+    async def get_password_hash(self, password: str) -> str:
+        return await hash_password(password)
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await verify_password(plain_password, hashed_password)
 
     def create_access_token(self, data: dict) -> str:
         to_encode = data.copy()
@@ -272,11 +309,13 @@ class AdminService:
                 print("Admin not found")
                 return None
                 
-            if not self.verify_password(password, admin["hashed_password"]):
+            if not await self.verify_password(password, admin["hashed_password"]):
                 print("Password verification failed")
                 return None
                 
             return UserInDB(**admin)
+        except PasswordHashOverloaded:
+            raise
         except Exception as e:
             print(f"Admin authentication error: {e}")
             print(f"Traceback: {traceback.format_exc()}")
@@ -292,7 +331,7 @@ class AdminService:
             admin_dict = {
                 "_id": ObjectId(),
                 "username": username,
-                "hashed_password": self.get_password_hash(password),
+                "hashed_password": await self.get_password_hash(password),
                 "points": 0,
                 "is_active": True,
                 "is_superuser": False,
@@ -302,6 +341,7 @@ class AdminService:
             }
 
             result = await self.users_collection.insert_one(admin_dict)
+            remember_admin_username(result.inserted_id, username)
             
             # 记录创建管理员的操作
             await self.log_admin_action(
@@ -314,6 +354,8 @@ class AdminService:
             admin_dict["id"] = str(admin_dict.pop("_id"))
             return admin_dict
 
+        except PasswordHashOverloaded:
+            raise
         except Exception as e:
             print(f"Error creating admin: {e}")
             print(f"Traceback: {traceback.format_exc()}")
@@ -328,7 +370,7 @@ class AdminService:
                 admin_dict = {
                     "_id": ObjectId(),
                     "username": "nongfu",
-                    "hashed_password": self.get_password_hash("shanquan"),
+                    "hashed_password": await self.get_password_hash("shanquan"),
                     "points": 0,
                     "is_active": True,
                     "is_superuser": True,
@@ -353,23 +395,17 @@ class AdminService:
         limit: int = 10, 
         sort_by: str = "created_at", 
         sort_order: int = -1,
-        current_admin_id: str = None
+        current_admin_id: str = None,
+        cursor: Optional[str] = None,
+        with_total: bool = True
     ) -> Dict[str, any]:
         try:
-            # 构建排序条件
-            sort_options = [(sort_by, sort_order)]
-            
-            # 获取总用户数
-            total_count = await self.users_collection.count_documents({})
-            
-            # 执行分页查询
-            cursor = self.users_collection.find({}) \
-                .sort(sort_options) \
-                .skip(skip) \
-                .limit(limit)
+            documents, page_info = await self._find_page(
+                self.users_collection, {}, skip, limit, sort_by, sort_order, cursor, with_total
+            )
             
             users = []
-            async for user in cursor:
+            for user in documents:
                 users.append({
                     "id": str(user["_id"]),
                     "username": user["username"],
@@ -382,10 +418,11 @@ class AdminService:
                 })
 
             return {
-                "total": total_count,
+                "total": page_info["total"],
                 "users": users,
-                "page": skip // limit + 1,
-                "total_pages": (total_count + limit - 1) // limit
+                "page": page_info["page"],
+                "total_pages": page_info["total_pages"],
+                "next_cursor": page_info["next_cursor"]
             }
         except Exception as e:
             print(f"Error getting user list: {e}")
@@ -417,6 +454,8 @@ class AdminService:
             })
             
             if result.deleted_count == 1:
+                await invalidate_user_principal(user_id)
+                forget_admin_username(user_id)
                 # 记录删除用户的操作
                 await self.log_admin_action(
                     admin_id=current_admin_id,
@@ -460,7 +499,7 @@ class AdminService:
             if "username" in update_data and update_data["username"]:
                 update_fields["username"] = update_data["username"]
             if "password" in update_data and update_data["password"]:
-                update_fields["hashed_password"] = self.get_password_hash(update_data["password"])
+                update_fields["hashed_password"] = await self.get_password_hash(update_data["password"])
             if "points" in update_data and update_data["points"] is not None:
                 update_fields["points"] = update_data["points"]
             
@@ -473,6 +512,9 @@ class AdminService:
             )
             
             if result.modified_count == 1:
+                await invalidate_user_principal(user_id)
+                if "username" in update_fields:
+                    forget_admin_username(user_id)
                 # 记录更新用户的操作
                 await self.log_admin_action(
                     admin_id=current_admin_id,
@@ -497,6 +539,8 @@ class AdminService:
             
             return None
             
+        except PasswordHashOverloaded:
+            raise
         except Exception as e:
             print(f"Error updating user: {e}")
             print(f"Traceback: {traceback.format_exc()}")
@@ -520,7 +564,7 @@ class AdminService:
             
             # 更新密码
             update_fields = {
-                "hashed_password": self.get_password_hash(new_password),
+                "hashed_password": await self.get_password_hash(new_password),
                 "updated_at": datetime.utcnow()
             }
             
@@ -531,6 +575,7 @@ class AdminService:
             )
             
             if result.modified_count == 1:
+                await invalidate_user_principal(user_id)
                 # 记录更新密码的操作
                 await self.log_admin_action(
                     admin_id=current_admin_id,
@@ -555,6 +600,8 @@ class AdminService:
             
             return None
             
+        except PasswordHashOverloaded:
+            raise
         except Exception as e:
             print(f"Error updating user password: {e}")
             print(f"Traceback: {traceback.format_exc()}")
@@ -591,6 +638,7 @@ class AdminService:
             )
             
             if result.modified_count == 1:
+                await invalidate_user_principal(user_id)
                 # 获取更新后的用户信息
                 updated_user = await self.users_collection.find_one(
                     {"_id": ObjectId(user_id)}
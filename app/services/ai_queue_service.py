@@ -0,0 +1,109 @@
+import json
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.db.redis import get_redis
+
+# 待处理队列：接口从左侧 LPUSH，worker 从右侧取出
+QUEUE_KEY = "REQ"
+# 处理中队列：取出的请求原子地移入这里，确认完成后才删除
+PROCESSING_KEY = "REQ:processing"
+# 处理中请求的领取时间：{原始消息: 时间戳}
+CLAIMS_KEY = "REQ:claimed"
+
+# 把超时未确认的请求放回待处理队列（右侧，下一个被取出）
+# 处理中队列里还没有领取时间的请求（刚被取出、尚未写入时间戳）只记录时间，下一轮再判断
+# 放回时把消息开头的 "attempt" 加一：原 worker 可能只是处理得慢，之后仍会按原消息 ack，
+# 改写后两份消息的值不同，它的 LREM 不会误删重新领取的那一份
+REAP_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[2], 0, -1)
+local now = tonumber(ARGV[1])
+local timeout = tonumber(ARGV[2])
+local requeued = 0
+for _, item in ipairs(items) do
+    local claimed = redis.call('HGET', KEYS[3], item)
+    if not claimed then
+        redis.call('HSET', KEYS[3], item, ARGV[1])
+    elseif now - tonumber(claimed) > timeout then
+        if redis.call('LREM', KEYS[2], 1, item) > 0 then
+            local attempt = tonumber(string.match(item, '^{"attempt": (%d+), ') or '0')
+            local body = string.gsub(item, '^{"attempt": %d+, ', '{', 1)
+            redis.call('RPUSH', KEYS[1], '{"attempt": ' .. (attempt + 1) .. ', ' .. string.sub(body, 2))
+            requeued = requeued + 1
+        end
+        redis.call('HDEL', KEYS[3], item)
+    end
+end
+return requeued
+"""
+
+
+class AIQueueService:
+    """
+    AI 出牌请求的可靠队列
+
+    worker 用 BRPOPLPUSH（Redis >= 6.2 可配置为 BLMOVE）把请求原子地移入处理中队列，
+    处理完成后确认删除；worker 崩溃时请求仍留在处理中队列，由 reap 放回待处理队列。
+    消息以 {"attempt": n, ...} 开头，每放回一次 n 加一，同一请求的每次投递在队列中的值都不同。
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client or get_redis()
+        self._reap_script = self.redis.register_script(REAP_SCRIPT)
+
+    async def enqueue(self, request_id: str, data: dict) -> None:
+        """加入待处理队列"""
+        # "attempt" 必须是第一个字段，REAP_SCRIPT 按前缀改写
+        await self.redis.lpush(QUEUE_KEY, json.dumps({
+            "attempt": 0,
+            "request_id": request_id,
+            "data": data
+        }))
+
+    async def claim(self, timeout: int = 1) -> Optional[str]:
+        """
+        取出一个请求并移入处理中队列
+
+        Args:
+            timeout (int): 队列为空时最多阻塞的秒数
+
+        Returns:
+            Optional[str]: 原始消息，超时为 None；确认时需要原样传给 ack
+        """
+        if settings.AI_QUEUE_USE_BLMOVE:
+            raw = await self.redis.execute_command("BLMOVE", QUEUE_KEY, PROCESSING_KEY, "RIGHT", "LEFT", timeout)
+        else:
+            raw = await self.redis.brpoplpush(QUEUE_KEY, PROCESSING_KEY, timeout)
+        if raw:
+            await self.redis.hset(CLAIMS_KEY, raw, time.time())
+        return raw
+
+    async def ack(self, raw: str) -> None:
+        """处理完成，从处理中队列删除"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lrem(PROCESSING_KEY, 1, raw)
+        pipe.hdel(CLAIMS_KEY, raw)
+        await pipe.execute()
+
+    async def reap(self, visibility_timeout: float = None) -> int:
+        """
+        把领取后超过 visibility_timeout 秒仍未确认的请求放回待处理队列
+
+        Returns:
+            int: 放回的请求数
+        """
+        if visibility_timeout is None:
+            visibility_timeout = settings.AI_QUEUE_VISIBILITY_TIMEOUT
+        return await self._reap_script(
+            keys=[QUEUE_KEY, PROCESSING_KEY, CLAIMS_KEY],
+            args=[time.time(), visibility_timeout]
+        )
+
+    async def depth(self) -> dict:
+        """待处理和处理中的请求数"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.llen(QUEUE_KEY)
+        pipe.llen(PROCESSING_KEY)
+        pending, processing = await pipe.execute()
+        return {"pending": pending, "processing": processing}
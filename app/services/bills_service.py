@@ -1,15 +1,20 @@
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+import asyncio
 import uuid
 
 from bson import ObjectId
-from fastapi import logger
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.principal_cache import invalidate_user_principal
 from app.db.mongodb import get_database
 from app.schemas.bills import (
     CurrentTaskDocument, 
     UserTaskEndSchema, 
     UserPointDetailSchema, 
     BillQueryParams,
+    BillCursorQueryParams,
     UserTaskDocument,
     UserPointDetailDocument,
     PyObjectId
@@ -18,6 +23,13 @@ from app.models.user import User, UserInDB
 from app.models.response import ResponseModel
 from app.utils.utils import *
 from app.services.admin_service import AdminService
+from app.utils.pagination import cached_count, find_page, keyset_sort
+
+# 任务ID冲突时的最大生成次数
+TASK_ID_MAX_ATTEMPTS = 3
+
+# 任务的统计字段
+TASK_STAT_FIELDS = ("game_count", "total_up_points", "total_down_points", "consumed_points")
 
 class BillsService:
           
@@ -27,9 +39,6 @@ class BillsService:
         创建新的用户任务
         """
         db = get_database()
-        
-        # 生成新的任务ID
-        task_id = await generate_unique_task_id(db)
 
         # 先检查是否有未完成的任务
         current_tasks = await db.current_task.find({"username": user.username}).to_list(length=None)
@@ -38,191 +47,233 @@ class BillsService:
             if current_task and current_task.get("current_task_id"):
                 await BillsService.end_user_task(user.username, current_task.get("current_task_id"))
 
-        # 创建新的任务文档
-        task_document = UserTaskDocument(
-            username=user.username,
-            task_id=task_id,
-            start_time=get_current_timestamp(),
-            current_points=user.points
-        )
+        # 插入用户任务记录，任务ID重复（唯一索引冲突）时重新生成
+        for attempt in range(TASK_ID_MAX_ATTEMPTS):
+            task_id = generate_task_id()
+            # 创建新的任务文档
+            task_document = UserTaskDocument(
+                username=user.username,
+                task_id=task_id,
+                start_time=get_current_timestamp(),
+                current_points=user.points,
+            ).dict(by_alias=True)
+            try:
+                # live_counters 只是存储层标记（统计字段由上传明细实时累加），不出现在返回数据中
+                await db.user_tasks.insert_one({**task_document, "live_counters": True})
+                break
+            except DuplicateKeyError:
+                if attempt == TASK_ID_MAX_ATTEMPTS - 1:
+                    raise
 
         # 创建当前任务记录
         current_task_document = CurrentTaskDocument(
             username=user.username,
             current_task_id=task_id,
         )
-
-        # 插入当前任务和用户任务记录
         await db.current_task.insert_one(current_task_document.dict(by_alias=True))
-        result = await db.user_tasks.insert_one(task_document.dict(by_alias=True))
-        inserted_id = result.inserted_id  
-        inserted_document = await db.user_tasks.find_one({"_id": inserted_id})
-        return inserted_document
+        # insert_one 会把生成的 _id 写回文档，不需要再查一次
+        return task_document
         
 
     @staticmethod
     async def end_user_task(username: str, current_task_id: str):
         """
         结束用户任务并更新统计信息
+
+        第一轮并发执行：清除当前任务、读取用户点数和任务；
+        第二轮写入结果，上下分均为 0 的任务直接删除。
+        任务的统计在上传明细时实时累加，这里只写当前点数，删除时也要求数据库中的上下分仍为 0，
+        不会覆盖或丢掉读取之后上传的明细；没有实时统计的旧任务才在数据库中聚合明细并整体写入（不存在时插入）。
         """
         db = get_database()
-        
-        # 如果结束的任务是当前任务，则先清空当前任务
-        current_task = await db.current_task.find_one({"username": username,"current_task_id":current_task_id})
-  
-        if current_task:
-            await db.current_task.delete_one({"username": username,"current_task_id":current_task_id})
-    
-        #  获取任务相关详情      
-        task_point_details = await db.point_details.find({"task_id": current_task_id}).to_list(length=None)
-        user = await db.users.find_one({"username": username})
-        # 在数据库查找任务
-        user_task = await db.user_tasks.find_one({"username": username, "task_id": current_task_id})
-        if not user_task:
-            new_task_id = await generate_unique_task_id(db)
-            task_document = UserTaskDocument(
-            username=user.get("username",""),
-            task_id=new_task_id,
-            start_time= get_current_timestamp(),
-            current_points=user.get("points","")
-            )
-            result = await db.user_tasks.insert_one(task_document.dict(by_alias=True)) 
-            inserted_id = result.inserted_id  
-            user_task = await db.user_tasks.find_one({"_id": inserted_id})
-            
-
-        current_points=user.get("points",0)
-        consumed_points=0
-        game_count = 0
-        total_up_points= 0
-        total_down_points= 0
-        
-        #  统计任务数据
-        for task_point_detail in task_point_details:
-            game_count += 1
-            game_detail = task_point_detail.get("game_detail",{})
-            if game_detail.get("is_up",False):
-                total_up_points += game_detail.get("records",0)
-            else:
-                total_down_points += game_detail.get("records",0)   
-            consumed_points += task_point_detail.get("consumed_points",0)
+
+        task_filter = {"username": username, "task_id": current_task_id}
+        _, user, user_task = await asyncio.gather(
+            # 如果结束的任务是当前任务，则清空当前任务
+            db.current_task.delete_one({"username": username, "current_task_id": current_task_id}),
+            db.users.find_one({"username": username}, {"points": 1}),
+            db.user_tasks.find_one(task_filter),
+        )
+
+        live_counters = bool(user_task and user_task.get("live_counters"))
+        if live_counters:
+            # 上传明细时已实时累加统计
+            stats = {key: user_task.get(key, 0) for key in TASK_STAT_FIELDS}
+        else:
+            # 升级前创建的任务没有实时统计，聚合明细（多一轮往返）
+            stats = await BillsService.aggregate_task_stats(db, current_task_id)
 
         #  更新任务数据库
+        current_points = user.get("points", 0) if user else 0
         user_task_data = {
             'username':username,
             'task_id':current_task_id,
             'current_points':current_points,
-            'consumed_points':consumed_points,
-            'game_count':game_count,
-            'total_up_points':total_up_points,
-            'total_down_points':total_down_points
+            **stats
         }
-        await db.user_tasks.update_one({"_id": user_task["_id"]},{"$set": user_task_data})
-        result = await db.user_tasks.find_one({"task_id": current_task_id})
-        
-        if total_up_points==0 and total_down_points==0:
-            await db.user_tasks.delete_one({"_id": user_task["_id"]})  
-            
-        return result
-        
-        
 
+        if stats["total_up_points"] == 0 and stats["total_down_points"] == 0:
+            delete_filter = task_filter
+            if live_counters:
+                # 读取统计之后又有明细累加时条件不成立，任务保留
+                delete_filter = {**task_filter, "total_up_points": 0, "total_down_points": 0}
+            deleted_task = await db.user_tasks.find_one_and_delete(delete_filter)
+            if deleted_task or not live_counters:
+                return {**(deleted_task or {}), **user_task_data}
+
+        if live_counters:
+            # 统计字段只由上传明细的 $inc 修改，这里只写当前点数，不覆盖读取之后的累加
+            return await db.user_tasks.find_one_and_update(
+                task_filter,
+                {"$set": {"current_points": current_points}},
+                return_document=ReturnDocument.AFTER
+            )
+
+        return await db.user_tasks.find_one_and_update(
+            task_filter,
+            {
+                "$set": user_task_data,
+                "$setOnInsert": {"start_time": get_current_timestamp()}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    async def aggregate_task_stats(db, task_id: str) -> Dict[str, int]:
+        """
+        用一次 $group 聚合统计任务的对局明细
+
+        返回:
+            Dict[str, int]: game_count、total_up_points、total_down_points、consumed_points
+        """
+        records = {"$ifNull": ["$game_detail.records", 0]}
+        is_up = {"$eq": ["$game_detail.is_up", True]}
+        pipeline = [
+            {"$match": {"task_id": task_id}},
+            {"$group": {
+                "_id": None,
+                "game_count": {"$sum": 1},
+                "total_up_points": {"$sum": {"$cond": [is_up, records, 0]}},
+                "total_down_points": {"$sum": {"$cond": [is_up, 0, records]}},
+                "consumed_points": {"$sum": {"$ifNull": ["$consumed_points", 0]}},
+            }},
+        ]
+        result = await db.point_details.aggregate(pipeline).to_list(length=1)
+        stats = dict.fromkeys(TASK_STAT_FIELDS, 0)
+        if result:
+            stats.update({key: result[0][key] for key in stats})
+        return stats
 
     @staticmethod
     async def upload_point_detail(user: User, point_detail: UserPointDetailSchema) -> UserPointDetailDocument:
         """
         上传用户点数使用明细
+
+        同时累加任务的实时统计（game_count / total_up_points / total_down_points / consumed_points），
+        结束任务时不必再聚合明细。
+
+        默认两轮数据库往返：先累加任务统计（同时校验任务存在），再并发更新用户点数和写入明细，
+        后两步任一失败时回滚已完成的部分。BILLS_USE_TRANSACTIONS 开启时三步在一个事务中完成
+        （需要 MongoDB 4.0+ 副本集）。
         """
         db = get_database()
         
-        # 验证关联的任务是否存在且未结束
-        task = await db.user_tasks.find_one({
-            "username": user.username, 
-            "task_id": point_detail.task_id,
-        })
-        
-        if not task:
-            raise ValueError("没有任务id，请重新启动任务")
-        
-        # 计算消耗的点数
-        consumed_points = 0 if point_detail.game_detail.is_up else point_detail.game_detail.records
-
-        try:
-            # 变更用户点数
-            change_points_result = await BillsService.change_user_points(user, point_detail)
-            
-            if not change_points_result:
-                raise Exception("Failed to change user points")
-
-            point_detail_document = UserPointDetailDocument(
-                username=user.username,
-                timestamp=get_current_timestamp(),
-                game_detail=point_detail.game_detail,
-                consumed_points=consumed_points,
-                task_id=point_detail.task_id
-            )
-            
-            # 插入点数明细
-            result = await db.point_details.insert_one(point_detail_document.dict(by_alias=True))
+        task_inc, user_inc = BillsService.point_detail_increments(point_detail)
+        point_detail_document = UserPointDetailDocument(
+            username=user.username,
+            timestamp=get_current_timestamp(),
+            game_detail=point_detail.game_detail,
+            consumed_points=task_inc["consumed_points"],
+            task_id=point_detail.task_id
+        )
+        detail = point_detail_document.dict(by_alias=True)
+        task_filter = {"username": user.username, "task_id": point_detail.task_id}
 
-            return point_detail_document
+        if settings.BILLS_USE_TRANSACTIONS:
+            await BillsService._upload_in_transaction(db, user, task_filter, task_inc, user_inc, detail)
+        else:
+            await BillsService._upload_with_compensation(db, user, task_filter, task_inc, user_inc, detail)
 
-        except Exception as e:
-            logger.error(f"Error in upload_point_detail: {str(e)}")
-            raise
+        await invalidate_user_principal(user.id)
+        return point_detail_document
 
     @staticmethod
-    async def change_user_points(user: User, point_detail: UserPointDetailSchema):
+    def point_detail_increments(point_detail: UserPointDetailSchema):
         """
-        变更用户点数
+        计算一条明细对任务统计和用户点数的增量
+
+        返回:
+            (任务 $inc, 用户 $inc)
         """
-        db = get_database()
-        
-        # 验证用户ID格式
-        if not ObjectId.is_valid(user.id):
-            logger.error(f"Invalid user ID format: {user.id}")
-            return None
-        
-        # 查询用户最新信息
-        user_document = await db.users.find_one({
-            "_id": ObjectId(user.id)
-        })
-        
-        if not user_document:
-            logger.error(f"User not found: {user.id}")
-            return None
+        records = point_detail.game_detail.records
+        is_up = point_detail.game_detail.is_up
+        task_inc = {
+            "game_count": 1,
+            "total_up_points": records if is_up else 0,
+            "total_down_points": 0 if is_up else records,
+            # 下分时消耗点数
+            "consumed_points": 0 if is_up else records,
+        }
+        user_inc = {
+            "points": 0 if is_up else records,
+            "current_total_up_points": task_inc["total_up_points"],
+            "current_total_down_points": task_inc["total_down_points"],
+        }
+        return task_inc, user_inc
 
-        points_to_add = point_detail.game_detail.records
-        
-        try:
-            # 根据游戏类型更新点数
-            if point_detail.game_detail.is_up:   
-                total_up_points = points_to_add
-                total_down_points = 0
-                points = 0
-            else:
-                total_up_points = 0
-                total_down_points = points_to_add
-                points = points_to_add
-            
-            # 更新用户总点数
-            result = await db.users.update_one(
-                {"_id": ObjectId(user.id)},
-                {
-                    "$inc": {
-                        "points": points,
-                        "current_total_up_points": total_up_points,
-                        "current_total_down_points": total_down_points
-                    }
-                }
-            )
-            user = await db.users.find_one({"_id": ObjectId(user.id)})
-            return user
+    @staticmethod
+    async def _upload_with_compensation(db, user: User, task_filter: dict, task_inc: dict, user_inc: dict, detail: dict):
+        # 第一轮：累加任务统计，任务不存在时不会修改任何数据
+        task = await db.user_tasks.find_one_and_update(
+            task_filter,
+            {"$inc": task_inc},
+            projection={"_id": 1}
+        )
+        if not task:
+            raise ValueError("没有任务id，请重新启动任务")
+
+        # 第二轮：并发更新用户点数、写入明细
+        user_result, insert_result = await asyncio.gather(
+            db.users.update_one({"_id": ObjectId(user.id)}, {"$inc": user_inc}),
+            db.point_details.insert_one(detail),
+            return_exceptions=True
+        )
+        user_ok = not isinstance(user_result, Exception) and user_result.matched_count == 1
+        insert_ok = not isinstance(insert_result, Exception)
+        if user_ok and insert_ok:
+            return
+
+        # 回滚已完成的部分，保证任务统计、用户点数与明细一致
+        task_undo = {key: -value for key, value in task_inc.items()}
+        user_undo = {key: -value for key, value in user_inc.items()}
+        compensations = [db.user_tasks.update_one({"_id": task["_id"]}, {"$inc": task_undo})]
+        if user_ok:
+            compensations.append(db.users.update_one({"_id": ObjectId(user.id)}, {"$inc": user_undo}))
+        if insert_ok:
+            compensations.append(db.point_details.delete_one({"_id": detail["_id"]}))
+        await asyncio.gather(*compensations, return_exceptions=True)
+        error = user_result if isinstance(user_result, Exception) else insert_result
+        print(f"Error in upload_point_detail: {error if isinstance(error, Exception) else 'user not found'}")
+        raise Exception("Failed to change user points")
+
+    @staticmethod
+    async def _upload_in_transaction(db, user: User, task_filter: dict, task_inc: dict, user_inc: dict, detail: dict):
+        async with await db.client.start_session() as session:
+            async with session.start_transaction():
+                task = await db.user_tasks.find_one_and_update(
+                    task_filter,
+                    {"$inc": task_inc},
+                    projection={"_id": 1},
+                    session=session
+                )
+                if not task:
+                    raise ValueError("没有任务id，请重新启动任务")
+                result = await db.users.update_one({"_id": ObjectId(user.id)}, {"$inc": user_inc}, session=session)
+                if result.matched_count != 1:
+                    raise Exception("Failed to change user points")
+                await db.point_details.insert_one(detail, session=session)
 
-        except Exception as e:
-            logger.error(f"Error in change_user_points: {str(e)}")
-            return None
-    
     @staticmethod
     async def get_bill_pages(user: User, query_params: BillQueryParams) -> Dict[str, int]:
         """
@@ -230,25 +281,9 @@ class BillsService:
         """
         db = get_database()
         
-        # 构建查询条件
-        query = {"username": user.username}
+        query = BillsService.build_bill_query(user, query_params)
         
-        if query_params.start_time:
-            query["start_time"] = {"$gte": query_params.start_time}
-        if query_params.end_time:
-            query["end_time"] = {"$lte": query_params.end_time}
-        if query_params.min_consumed_points is not None:
-            query["consumed_points"] = {"$gte": query_params.min_consumed_points}
-        if query_params.max_consumed_points is not None:
-            query["consumed_points"] = query.get("consumed_points", {})
-            query["consumed_points"]["$lte"] = query_params.max_consumed_points
-        if query_params.min_down_points is not None:
-            query["total_down_points"] = {"$gte": query_params.min_down_points}
-        if query_params.max_down_points is not None:
-            query["total_down_points"] = query.get("total_down_points", {})
-            query["total_down_points"]["$lte"] = query_params.max_down_points
-        
-        total_tasks = await db.user_tasks.count_documents(query)
+        total_tasks = await cached_count(db.user_tasks, query)
         total_pages = (total_tasks + query_params.page_size - 1) // query_params.page_size
         
         return {"total_pages": total_pages, "total_tasks": total_tasks}
@@ -260,6 +295,36 @@ class BillsService:
         """
         db = get_database()
         
+        query = BillsService.build_bill_query(user, query_params)
+        
+        # 分页查询
+        skip = (query_params.page - 1) * query_params.page_size
+        # tasks = await db.user_tasks.find(query).skip(skip).limit(query_params.page_size).to_list(length=query_params.page_size)
+        tasks = await db.user_tasks.find(query).sort(keyset_sort("start_time", -1)).skip(skip).limit(query_params.page_size).to_list(length=query_params.page_size)
+        
+        return [BillsService.to_task_document(task) for task in tasks]
+
+    @staticmethod
+    async def get_bill_list_by_cursor(user: User, query_params: BillCursorQueryParams) -> Dict[str, Any]:
+        """
+        按游标获取账单列表，深翻页不再随页码变慢
+
+        返回:
+            {"items": 账单列表, "next_cursor": 下一页游标，没有下一页时为 None}
+        """
+        db = get_database()
+        query = BillsService.build_bill_query(user, query_params)
+        tasks, next_cursor = await find_page(
+            db.user_tasks, query, "start_time", -1, query_params.page_size, query_params.cursor
+        )
+        return {
+            "items": [BillsService.to_task_document(task) for task in tasks],
+            "next_cursor": next_cursor
+        }
+
+    @staticmethod
+    def build_bill_query(user: User, query_params) -> Dict[str, Any]:
+        """根据筛选条件构建账单查询"""
         # 构建查询条件
         query = {"username": user.username}
         
@@ -277,14 +342,12 @@ class BillsService:
         if query_params.max_down_points is not None:
             query["total_down_points"] = query.get("total_down_points", {})
             query["total_down_points"]["$lte"] = query_params.max_down_points
-        
-        # 分页查询
-        skip = (query_params.page - 1) * query_params.page_size
-        # tasks = await db.user_tasks.find(query).skip(skip).limit(query_params.page_size).to_list(length=query_params.page_size)
-        tasks = await db.user_tasks.find(query).sort("start_time", -1).skip(skip).limit(query_params.page_size).to_list(length=query_params.page_size)
-        
+        return query
+
+    @staticmethod
+    def to_task_document(task: dict) -> UserTaskDocument:
         # 转换为 Pydantic 模型，确保正确处理 _id
-        return [UserTaskDocument(
+        return UserTaskDocument(
             id=task.get('_id'),
             username=task.get('username'),
             task_id=task.get('task_id'),
@@ -294,4 +357,4 @@ class BillsService:
             game_count=task.get('game_count'),
             total_up_points=task.get('total_up_points'),
             total_down_points=task.get('total_down_points')
-        ) for task in tasks]
+        )
@@ -0,0 +1,107 @@
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.redis import get_redis
+
+# 结果在 Redis 中的保留时间（秒）
+RESULT_TTL = 600
+# 每个请求一个结果列表，等待方 BLPOP 这个列表，结果写入后立即返回
+RESULT_KEY = "pklord_results:"
+
+# 本进程同时阻塞等待的 BLPOP 数；每个等待占用连接池中的一个连接，首次使用时创建
+_waiters: Optional[asyncio.Semaphore] = None
+
+
+class ResultWaitersExhausted(Exception):
+    """等待中的请求已达 RESULT_WAIT_MAX_WAITERS，调用方应返回 503 或稍后重试"""
+
+    def __init__(self):
+        super().__init__("等待结果的请求过多，请稍后重试")
+
+
+def _waiter_slots() -> asyncio.Semaphore:
+    global _waiters
+    if _waiters is None:
+        _waiters = asyncio.Semaphore(settings.RESULT_WAIT_MAX_WAITERS)
+    return _waiters
+
+
+class ResultService:
+    """
+    出牌结果的发布与获取
+
+    发布时同时写入：
+        request_id              字符串，兼容轮询接口 getRequestResult
+        pklord_results:<id>     列表，供长轮询 / SSE 通过 BLPOP 阻塞等待
+    """
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client or get_redis()
+
+    @staticmethod
+    def result_key(request_id: str) -> str:
+        return f"{RESULT_KEY}{request_id}"
+
+    async def publish(self, request_id: str, result: dict) -> None:
+        """写入结果（一次往返）"""
+        payload = json.dumps(result)
+        list_key = self.result_key(request_id)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.setex(request_id, RESULT_TTL, payload)
+        pipe.rpush(list_key, payload)
+        pipe.expire(list_key, RESULT_TTL)
+        await pipe.execute()
+
+    async def fetch(self, request_id: str) -> Optional[dict]:
+        """非阻塞获取结果，取到后删除（一次往返）"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.get(request_id)
+        pipe.delete(request_id, self.result_key(request_id))
+        payload, _ = await pipe.execute()
+        return json.loads(payload) if payload else None
+
+    async def _blpop(self, keys: List[str], timeout: int):
+        """
+        BLPOP，同时进行的数量不超过 RESULT_WAIT_MAX_WAITERS；已满时不排队，直接抛出 ResultWaitersExhausted
+        """
+        slots = _waiter_slots()
+        if slots.locked():
+            raise ResultWaitersExhausted()
+        async with slots:
+            return await self.redis.blpop(keys, timeout=timeout)
+
+    async def wait(self, request_id: str, timeout: int) -> Optional[dict]:
+        """
+        阻塞等待结果，最多 timeout 秒，取到后删除
+
+        Returns:
+            Optional[dict]: 结果，超时或结果已被取走为 None
+
+        Raises:
+            ResultWaitersExhausted: 本进程等待中的请求已满
+        """
+        item = await self._blpop([self.result_key(request_id)], timeout)
+        if not item:
+            return None
+        await self.redis.delete(request_id)
+        return json.loads(item[1])
+
+    async def wait_any(self, request_ids: List[str], timeout: int) -> Optional[Tuple[str, dict]]:
+        """
+        阻塞等待多个请求中最先完成的一个
+
+        Returns:
+            Optional[Tuple[str, dict]]: (request_id, 结果)，超时为 None
+
+        Raises:
+            ResultWaitersExhausted: 本进程等待中的请求已满
+        """
+        item = await self._blpop([self.result_key(request_id) for request_id in request_ids], timeout)
+        if not item:
+            return None
+        list_key, payload = item
+        request_id = list_key[len(RESULT_KEY):]
+        await self.redis.delete(request_id)
+        return request_id, json.loads(payload)
@@ -0,0 +1,278 @@
+"""
+管理后台统计的预聚合（rollup）
+
+stats_rollups 集合按时间分桶保存统计值，每个桶一个文档，_id 由指标、粒度和桶起始时间组成：
+
+    points  积分变动，log_points_change 时对小时桶、日桶和总计桶各 $inc 一次
+            {"points_change": 积分变动总和, "count": 变动次数}
+    users   用户数快照，由定时任务刷新，写入当前小时桶、当天日桶和总计桶（最近一次快照）
+            {"total_users": 用户总数, "active_users": 活跃用户数}
+
+仪表盘查询只读取对应时间段内的桶（日统计 1 个，周统计最多 7 个，月统计最多 31 个），
+不再扫描 points_logs 或 users。时间按 UTC 分桶，与原来按 utcnow 计算的周期一致。
+
+上线前已有的积分记录通过 rebuild_points_rollups 从 points_logs 重新聚合：
+
+    python -m app.services.stats_service --rebuild
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.db.mongodb import close_mongo_connection, connect_to_mongo, get_database
+
+ROLLUP_COLLECTION = "stats_rollups"
+
+GRANULARITIES = ("hour", "day")
+# 时间序列接口一次最多返回的桶数
+MAX_SERIES_BUCKETS = 1000
+
+# 指标 -> 桶内的字段
+METRIC_FIELDS = {
+    "points": ("points_change", "count"),
+    "users": ("total_users", "active_users"),
+}
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """moment 所在桶的起始时间"""
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Invalid granularity: {granularity}")
+
+
+def as_utc(moment: datetime) -> datetime:
+    """带时区的时间转成 UTC 的 naive datetime，与 MongoDB 中保存的时间一致"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def bucket_step(granularity: str) -> timedelta:
+    return timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+
+
+def bucket_id(metric: str, granularity: str, start: Optional[datetime] = None) -> str:
+    if granularity == "total":
+        return f"{metric}:total"
+    return f"{metric}:{granularity}:{start.strftime('%Y-%m-%dT%H')}"
+
+
+def period_start(period: Optional[str], now: datetime) -> Optional[datetime]:
+    """统计周期的起始时间，None 表示总量"""
+    if period == "day":
+        return bucket_start(now, "day")
+    if period == "week":
+        # 本周开始时间（以周一为起点）
+        return bucket_start(now - timedelta(days=now.weekday()), "day")
+    if period == "month":
+        return bucket_start(now, "day").replace(day=1)
+    return None
+
+
+# 仪表盘汇总的进程内缓存：(过期时间, 数据, ETag)
+_overview_cache: Optional[Tuple[float, dict, str]] = None
+
+
+async def cached_overview(ttl: float = None) -> Tuple[dict, str]:
+    """
+    带短时缓存的仪表盘汇总
+
+    Returns:
+        (数据, ETag)，ETag 由数据内容计算，数据不变时保持不变
+    """
+    global _overview_cache
+    if ttl is None:
+        ttl = settings.STATS_OVERVIEW_CACHE_TTL
+    now = time.monotonic()
+    if _overview_cache and _overview_cache[0] > now:
+        return _overview_cache[1], _overview_cache[2]
+    data = await StatsService().get_overview()
+    etag = '"' + hashlib.md5(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest() + '"'
+    if ttl > 0:
+        _overview_cache = (now + ttl, data, etag)
+    return data, etag
+
+
+class StatsService:
+    def __init__(self, db=None):
+        self.db = db if db is not None else get_database()
+        self.rollups = self.db[ROLLUP_COLLECTION]
+
+    def _bucket_updates(self, metric: str, moment: datetime, update: dict) -> List[UpdateOne]:
+        operations = []
+        for granularity in GRANULARITIES:
+            start = bucket_start(moment, granularity)
+            operations.append(UpdateOne(
+                {"_id": bucket_id(metric, granularity, start)},
+                {**update, "$setOnInsert": {"metric": metric, "granularity": granularity, "bucket": start}},
+                upsert=True
+            ))
+        operations.append(UpdateOne(
+            {"_id": bucket_id(metric, "total")},
+            {**update, "$setOnInsert": {"metric": metric, "granularity": "total", "bucket": None}},
+            upsert=True
+        ))
+        return operations
+
+    async def record_points_change(self, points_change: int, created_at: datetime) -> None:
+        """积分变动计入小时桶、日桶和总计桶（一次 bulk_write）"""
+        await self.rollups.bulk_write(
+            self._bucket_updates("points", created_at, {"$inc": {"points_change": points_change, "count": 1}}),
+            ordered=False
+        )
+
+    async def refresh_user_counts(self, now: datetime = None) -> Dict[str, int]:
+        """统计当前用户数，写入当前小时桶、当天日桶和总计桶"""
+        now = now or datetime.utcnow()
+        users = self.db.users
+        total_users, active_users = await asyncio.gather(
+            users.count_documents({"is_admin": {"$ne": True}}),
+            users.count_documents({"is_admin": {"$ne": True}, "is_active": True}),
+        )
+        counts = {"total_users": total_users, "active_users": active_users}
+        await self.rollups.bulk_write(
+            self._bucket_updates("users", now, {"$set": {**counts, "updated_at": now}}),
+            ordered=False
+        )
+        return counts
+
+    async def get_points_increase(self, period: Optional[str] = None) -> int:
+        """周期内的积分变动总和，读取 O(桶数) 个文档"""
+        start = period_start(period, datetime.utcnow())
+        if start is None:
+            total = await self.rollups.find_one({"_id": bucket_id("points", "total")})
+            return total["points_change"] if total else 0
+        buckets = await self.rollups.find(
+            {"metric": "points", "granularity": "day", "bucket": {"$gte": start}},
+            {"points_change": 1}
+        ).to_list(length=None)
+        return sum(bucket.get("points_change", 0) for bucket in buckets)
+
+    async def get_user_counts(self) -> Dict[str, int]:
+        """最近一次的用户数快照，还没有快照时现场统计一次"""
+        snapshot = await self.rollups.find_one({"_id": bucket_id("users", "total")})
+        if snapshot is None:
+            return await self.refresh_user_counts()
+        return {"total_users": snapshot.get("total_users", 0), "active_users": snapshot.get("active_users", 0)}
+
+    async def get_overview(self) -> Dict[str, object]:
+        """仪表盘汇总：各周期的积分新增量和用户数，所有查询并发执行"""
+        day, week, month, total, user_counts = await asyncio.gather(
+            self.get_points_increase("day"),
+            self.get_points_increase("week"),
+            self.get_points_increase("month"),
+            self.get_points_increase(None),
+            self.get_user_counts(),
+        )
+        return {
+            "points_increase": {"day": day, "week": week, "month": month, "total": total},
+            **user_counts,
+        }
+
+    async def get_timeseries(self, metric: str, granularity: str, start: datetime, end: datetime) -> List[dict]:
+        """
+        [start, end) 内每个桶的统计值，没有数据的桶补 0
+
+        Returns:
+            List[dict]: [{"bucket": 桶起始时间, 字段: 值, ...}]，按时间升序
+        """
+        if metric not in METRIC_FIELDS:
+            raise ValueError(f"Invalid metric: {metric}")
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Invalid granularity: {granularity}")
+        start, end = as_utc(start), as_utc(end)
+        step = bucket_step(granularity)
+        first = bucket_start(start, granularity)
+        if end <= first:
+            raise ValueError("end must be later than start")
+        if (end - first) / step > MAX_SERIES_BUCKETS:
+            raise ValueError(f"Too many buckets, at most {MAX_SERIES_BUCKETS}")
+
+        fields = METRIC_FIELDS[metric]
+        projection = {"bucket": 1, **{field: 1 for field in fields}}
+        documents = await self.rollups.find(
+            {"metric": metric, "granularity": granularity, "bucket": {"$gte": first, "$lt": end}},
+            projection
+        ).to_list(length=None)
+        by_bucket = {document["bucket"]: document for document in documents}
+
+        series = []
+        current = first
+        while current < end:
+            document = by_bucket.get(current, {})
+            series.append({"bucket": current, **{field: document.get(field, 0) for field in fields}})
+            current += step
+        return series
+
+    async def rebuild_points_rollups(self) -> int:
+        """
+        从 points_logs 重新聚合积分的小时桶、日桶和总计桶（覆盖写入，可重复执行）
+
+        聚合期间新写入的积分记录可能被覆盖掉，应在低峰期执行。
+
+        Returns:
+            int: 写入的桶数
+        """
+        pipeline = [
+            {"$group": {
+                "_id": {
+                    "year": {"$year": "$created_at"},
+                    "month": {"$month": "$created_at"},
+                    "day": {"$dayOfMonth": "$created_at"},
+                    "hour": {"$hour": "$created_at"},
+                },
+                "points_change": {"$sum": "$points_change"},
+                "count": {"$sum": 1},
+            }}
+        ]
+        hours = await self.db.points_logs.aggregate(pipeline).to_list(length=None)
+
+        sums: Dict[str, dict] = {}
+        for row in hours:
+            key = row["_id"]
+            hour = datetime(key["year"], key["month"], key["day"], key["hour"])
+            for granularity, start in (("hour", hour), ("day", bucket_start(hour, "day")), ("total", None)):
+                entry = sums.setdefault(bucket_id("points", granularity, start), {
+                    "metric": "points", "granularity": granularity, "bucket": start,
+                    "points_change": 0, "count": 0,
+                })
+                entry["points_change"] += row["points_change"]
+                entry["count"] += row["count"]
+
+        operations = [UpdateOne({"_id": _id}, {"$set": entry}, upsert=True) for _id, entry in sums.items()]
+        if operations:
+            await self.rollups.bulk_write(operations, ordered=False)
+        # 去掉已经没有对应记录的桶
+        await self.rollups.delete_many({"metric": "points", "_id": {"$nin": list(sums)}})
+        return len(operations)
+
+
+async def main() -> None:
+    await connect_to_mongo()
+    try:
+        service = StatsService()
+        written = await service.rebuild_points_rollups()
+        counts = await service.refresh_user_counts()
+        print(f"Rebuilt {written} points buckets, user counts: {counts}")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true", help="从 points_logs 重建积分统计，并刷新用户数快照")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("nothing to do, use --rebuild")
+    print(f"Database: {settings.MONGODB_DATABASE}")
+    asyncio.run(main())
@@ -2,23 +2,22 @@ from datetime import datetime, timedelta
 from typing import Optional
 from bson import ObjectId
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.security import PasswordHashOverloaded, hash_password, verify_password
+from app.core.principal_cache import activity_buffer, invalidate_user_principal, principal_cache
 from app.db.mongodb import get_database
 from app.models.user import UserInDB, User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class UserService:
     def __init__(self):
         self.db = get_database()
         self.users_collection = self.db.users
 
-    def get_password_hash(self, password: str) -> str:
-        return pwd_context.hash(password)
+    async def get_password_hash(self, password: str) -> str:
+        return await hash_password(password)
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await verify_password(plain_password, hashed_password)
 
     def create_access_token(self, data: dict) -> str:
         to_encode = data.copy()
@@ -36,7 +35,7 @@ class UserService:
             user = await self.users_collection.find_one({"username": username})
             if not user:
                 return None
-            if not self.verify_password(password, user["hashed_password"]):
+            if not await self.verify_password(password, user["hashed_password"]):
                 return None
             
             # 更新用户活跃状态
@@ -58,6 +57,8 @@ class UserService:
             })
             
             return UserInDB(**user)
+        except PasswordHashOverloaded:
+            raise
         except Exception as e:
             print(f"Authentication error: {e}")
             return None
@@ -72,7 +73,7 @@ class UserService:
             user_dict = {
                 "_id": ObjectId(),
                 "username": username,
-                "hashed_password": self.get_password_hash(password),
+                "hashed_password": await self.get_password_hash(password),
                 "points": 0,
                 "is_active": True,
                 "is_superuser": False,
@@ -87,7 +88,7 @@ class UserService:
                 raise Exception("Failed to create user")
             user_dict = await self.users_collection.find_one({"_id": result.inserted_id})    
             return user_dict
-        except ValueError as e:
+        except (ValueError, PasswordHashOverloaded) as e:
             raise e
         except Exception as e:
             print(f"Error creating user: {e}")
@@ -95,6 +96,12 @@ class UserService:
 
 
     async def get_current_user(self, token: str) -> Optional[User]:
+        # 缓存命中时不访问数据库，活跃时间由定时任务批量写回
+        cached_user = principal_cache.get(token)
+        if cached_user is not None:
+            activity_buffer.touch(cached_user.id)
+            return cached_user
+
         try:
             payload = jwt.decode(
                 token, 
@@ -105,36 +112,29 @@ class UserService:
             if user_id is None:
                 return None
                 
-            # 获取用户数据并更新活跃状态
-            now = datetime.utcnow()
-            user_data = await self.users_collection.find_one_and_update(
-                {"_id": ObjectId(user_id)},
-                {
-                    "$set": {
-                        "is_active": True,
-                        "last_active": now,
-                        "updated_at": now
-                    }
-                },
-                return_document=True
-            )
+            # 获取用户数据，活跃状态稍后批量更新
+            user_data = await self.users_collection.find_one({"_id": ObjectId(user_id)})
             
             if user_data is None:
                 return None
-                
-            return User(
+
+            now = datetime.utcnow()
+            activity_buffer.touch(user_id, now)
+            user = User(
                 id=user_data["_id"],
                 username=user_data["username"],
                 points=user_data.get("points", 0),
-                is_active=user_data.get("is_active", True),
+                is_active=True,
                 is_superuser=user_data.get("is_superuser", False),
                 is_admin=user_data.get("is_admin", False),
-                created_at=user_data.get("created_at", datetime.utcnow()),
-                updated_at=user_data.get("updated_at", datetime.utcnow()),
-                last_active=user_data.get("last_active", datetime.utcnow()),
+                created_at=user_data.get("created_at", now),
+                updated_at=now,
+                last_active=now,
                 current_total_up_points = user_data.get("current_total_up_points", 0),
                 current_total_down_points = user_data.get("current_total_down_points", 0),
             )
+            principal_cache.put(token, user, payload.get("exp"))
+            return user
         except JWTError:
             return None
 
@@ -197,6 +197,7 @@ class UserService:
                     }
                 }
             )
+            await invalidate_user_principal(current_user.id)
             return result.modified_count > 0
         except Exception as e:
             print(f"Error clearing user record: {e}")
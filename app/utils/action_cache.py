@@ -0,0 +1,143 @@
+'''
+合法出牌缓存
+
+同一局面（手牌 + 需要压过的牌）会被客户端反复请求，合法出牌集合只需计算一次。
+进程内使用有界 LRU 缓存；可选开启 Redis 二级缓存，让多个 worker 共享计算结果。
+'''
+from collections import OrderedDict
+import json
+import threading
+from typing import Callable, Iterable, Optional, Tuple, Union
+
+from app.utils.hand import Hand, as_hand
+
+REDIS_KEY_PREFIX = "legal_actions:"
+
+
+class LegalActionCache:
+    '''
+    合法出牌集合的 LRU 缓存，键为 (规范排序后的手牌, 需要压过的牌)
+
+    参数:
+        compute: 未命中时的计算函数，签名与 utils.get_gt_cards 一致
+        maxsize: 进程内最多缓存的局面数，0 表示不缓存
+    '''
+
+    def __init__(self, compute: Callable[[str, str], Iterable[str]], maxsize: int,
+                 redis_enabled: bool = False, redis_ttl: int = 3600):
+        self.compute = compute
+        self.maxsize = maxsize
+        self.redis_enabled = redis_enabled
+        self.redis_ttl = redis_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.redis_hits = 0
+        self.redis_errors = 0
+
+    @staticmethod
+    def make_key(current_hand: Union[str, Hand], last_move: Union[str, Hand, None]) -> Tuple[str, str]:
+        '''生成缓存键，last_move 为空或 'pass' 时表示自由出牌'''
+        move = as_hand(last_move)
+        return str(as_hand(current_hand)), str(move) if move else 'pass'
+
+    def _lookup(self, key: Tuple[str, str]) -> Optional[tuple]:
+        with self._lock:
+            actions = self._data.get(key)
+            if actions is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+            return actions
+
+    def _store(self, key: Tuple[str, str], actions: tuple) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = actions
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _compute(self, key: Tuple[str, str]) -> tuple:
+        hand, move = key
+        return tuple(self.compute(move, hand))
+
+    def get(self, current_hand: Union[str, Hand], last_move: Union[str, Hand, None]) -> tuple:
+        '''
+        获取合法出牌（只查进程内缓存）
+
+        返回:
+            tuple: 合法出牌元组，与 compute 的结果一致；结果被多个请求共享，不要修改
+        '''
+        key = self.make_key(current_hand, last_move)
+        actions = self._lookup(key)
+        if actions is None:
+            with self._lock:
+                self.misses += 1
+            actions = self._compute(key)
+            self._store(key, actions)
+        return actions
+
+    async def aget(self, current_hand: Union[str, Hand], last_move: Union[str, Hand, None], redis_client=None) -> tuple:
+        '''
+        获取合法出牌，进程内未命中时再查询 Redis 二级缓存
+
+        参数:
+            redis_client: Redis 客户端，为 None 或未开启二级缓存时只使用进程内缓存
+        '''
+        key = self.make_key(current_hand, last_move)
+        actions = self._lookup(key)
+        if actions is not None:
+            return actions
+        with self._lock:
+            self.misses += 1
+
+        use_redis = self.redis_enabled and redis_client is not None
+        redis_key = f"{REDIS_KEY_PREFIX}{key[0]}:{key[1]}"
+        if use_redis:
+            try:
+                cached = await redis_client.get(redis_key)
+                if cached:
+                    actions = tuple(json.loads(cached))
+                    with self._lock:
+                        self.redis_hits += 1
+                    self._store(key, actions)
+                    return actions
+            except Exception as e:
+                print(f"Legal action cache redis get error: {e}")
+                with self._lock:
+                    self.redis_errors += 1
+
+        actions = self._compute(key)
+        self._store(key, actions)
+        if use_redis:
+            try:
+                await redis_client.setex(redis_key, self.redis_ttl, json.dumps(actions))
+            except Exception as e:
+                print(f"Legal action cache redis set error: {e}")
+                with self._lock:
+                    self.redis_errors += 1
+        return actions
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "redis_enabled": self.redis_enabled,
+                "redis_hits": self.redis_hits,
+                "redis_errors": self.redis_errors,
+            }
+
@@ -0,0 +1,214 @@
+'''
+整个动作空间上的向量化"压过"索引
+
+把 CARD_TYPE / SPECIFIC_MAP 中的每个具体出牌存成矩阵的一行：
+    counts   uint8[n, 15]  每个点数的张数
+    bits     uint64[n]     与 Hand.bits 相同布局的位棋盘
+    type_ids int16[n]      牌型编号（type_names 的下标）
+    weights  int16[n]      牌型权重
+行按 (牌型, 权重) 排序，能压过某一手牌的行是同牌型中一段连续区间，再加上炸弹和火箭。
+
+"手牌中所有能压过 X 的出牌"变成对候选行 beating_rows(X) 的一次向量比较：
+    contained = ((hand_bits | GUARD) - bits) & GUARD == GUARD   # 等价于 (counts <= hand).all(axis=1)
+一批手牌按需要压过的牌分组，每组对候选行做一次广播比较，适合 worker 批量处理局面。
+
+结果与 utils.get_gt_cards / get_legal_action_ids 一致（顺序按牌型、权重排列，动作编号从小到大）。
+'''
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.utils.hand import GUARD, NUM_RANKS, Hand, as_hand
+from app.utils.move_gen import classify_move
+
+# 每次广播比较的手牌数，控制临时矩阵大小（64 x 27471 x 8 字节约 14MB）
+CHUNK_SIZE = 64
+
+HandLike = Union[str, Hand]
+PlayedLike = Optional[HandLike]
+
+
+def _is_free_play(played: PlayedLike) -> bool:
+    if isinstance(played, Hand):
+        return not played
+    return not played or played == 'pass'
+
+
+class BeatsIndex:
+    '''
+    参数:
+        card_type: 牌面 -> [[牌型, 权重]]（utils.CARD_TYPE）
+        specific_map: 牌面 -> 抽象动作列表（utils.SPECIFIC_MAP）
+        action_space: 抽象动作 -> 动作编号（utils.ACTION_SPACE）
+    '''
+
+    def __init__(self, card_type, specific_map, action_space):
+        entries = []
+        for cards, types in card_type.items():
+            move_type, weight = types[0]
+            entries.append((move_type, int(weight), cards))
+        self.type_names: List[str] = sorted({move_type for move_type, _, _ in entries})
+        self.type_index = type_index = {name: index for index, name in enumerate(self.type_names)}
+        entries.sort(key=lambda entry: (type_index[entry[0]], entry[1]))
+
+        self.moves: List[str] = [cards for _, _, cards in entries]
+        self.type_ids = np.array([type_index[move_type] for move_type, _, _ in entries], dtype=np.int16)
+        self.weights = np.array([weight for _, weight, _ in entries], dtype=np.int16)
+        hands = [Hand.from_str(cards) for cards in self.moves]
+        self.counts = np.array([hand.counts for hand in hands], dtype=np.uint8).reshape(-1, NUM_RANKS)
+        self.bits = np.array([hand.bits for hand in hands], dtype=np.uint64)
+        # (牌型, 权重) 合成一个有序键，用于二分查找压过某一手牌的区间
+        self._keys = self.type_ids.astype(np.int32) * 256 + self.weights
+
+        # 每行对应的抽象动作编号，CSR 格式
+        self.num_actions = len(action_space)
+        self.pass_action = action_space['pass']
+        offsets = [0]
+        action_ids = []
+        for cards in self.moves:
+            action_ids.extend(action_space[abstract] for abstract in specific_map[cards])
+            offsets.append(len(action_ids))
+        self.action_offsets = np.array(offsets, dtype=np.int64)
+        self.action_ids = np.array(action_ids, dtype=np.int64)
+
+        # 牌面 -> (牌型, 权重)，避免每次查询都访问 mmap 表
+        self._targets: Dict[str, Tuple[str, int]] = {cards: (move_type, weight) for move_type, weight, cards in entries}
+        self._all_rows = np.arange(len(self.moves))
+        self._bombs = self._type_range(type_index['bomb'], -1)
+        self._rockets = self._type_range(type_index['rocket'], -1)
+        self._beating: Dict[Tuple[Optional[str], int], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def _type_range(self, type_id: int, weight: int) -> np.ndarray:
+        '''牌型为 type_id 且权重大于 weight 的行'''
+        start = np.searchsorted(self._keys, type_id * 256 + weight, side='right')
+        end = np.searchsorted(self._keys, type_id * 256 + 255, side='right')
+        return self._all_rows[start:end]
+
+    def beating_rows(self, move_type: Optional[str], weight: int = -1) -> np.ndarray:
+        '''
+        能压过 (move_type, weight) 的所有行；move_type 为 None 表示自由出牌，返回全部行
+        '''
+        key = (move_type, weight)
+        rows = self._beating.get(key)
+        if rows is None:
+            if move_type is None:
+                rows = self._all_rows
+            elif move_type == 'rocket':
+                rows = self._all_rows[:0]
+            else:
+                parts = [self._type_range(self.type_index[move_type], weight), self._rockets]
+                if move_type != 'bomb':
+                    parts.append(self._bombs)
+                rows = np.concatenate(parts)
+            self._beating[key] = rows
+        return rows
+
+    def _target(self, played: PlayedLike) -> Tuple[Optional[str], int]:
+        if _is_free_play(played):
+            return None, -1
+        target = self._targets.get(str(played))
+        if target is None:
+            # 未排序的牌面按点数张数判断牌型
+            target = classify_move(as_hand(played))
+            if target is None:
+                raise KeyError(played)
+        return target
+
+    @staticmethod
+    def _played_list(hands: Sequence[HandLike], played) -> List[PlayedLike]:
+        if isinstance(played, (str, Hand)) or played is None:
+            return [played] * len(hands)
+        if len(played) != len(hands):
+            raise ValueError(f"Got {len(hands)} hands but {len(played)} played moves")
+        return list(played)
+
+    def _groups(self, hands: Sequence[HandLike], played) -> Tuple[np.ndarray, Dict[Tuple[Optional[str], int], List[int]]]:
+        '''手牌的位棋盘，以及按需要压过的牌分组的手牌下标'''
+        played = self._played_list(hands, played)
+        hand_bits = np.array([as_hand(hand).bits for hand in hands], dtype=np.uint64)
+        groups: Dict[Tuple[Optional[str], int], List[int]] = {}
+        for position, move in enumerate(played):
+            groups.setdefault(self._target(move), []).append(position)
+        return hand_bits, groups
+
+    def _legal_blocks(self, hands: Sequence[HandLike], played):
+        '''
+        逐块产出 (目标, 手牌下标数组, 候选行, 包含矩阵)
+
+        包含矩阵 contained[i, j] 表示块内第 i 个手牌包含候选行 j 的出牌
+        '''
+        hand_bits, groups = self._groups(hands, played)
+        guard = np.uint64(GUARD)
+        for target, positions in groups.items():
+            rows = self.beating_rows(*target)
+            candidates = self.bits[rows]
+            positions = np.array(positions)
+            for begin in range(0, len(positions), CHUNK_SIZE):
+                block = positions[begin:begin + CHUNK_SIZE]
+                contained = ((hand_bits[block, None] | guard) - candidates[None, :]) & guard == guard
+                yield target, block, rows, contained
+
+    def legal_rows(self, hands: Sequence[HandLike], played) -> List[np.ndarray]:
+        '''
+        每个手牌中能压过对应出牌的行号
+
+        参数:
+            hands: 手牌列表，字符串或 Hand
+            played: 需要压过的牌，单个（所有手牌相同）或与 hands 等长的列表；None、'' 或 'pass' 表示自由出牌
+        '''
+        result: List[np.ndarray] = [self._all_rows[:0]] * len(hands)
+        for _, block, rows, contained in self._legal_blocks(hands, played):
+            for position, mask in zip(block, contained):
+                result[position] = rows[mask]
+        return result
+
+    def gt_cards(self, hands: Sequence[HandLike], played) -> List[List[str]]:
+        '''批量版 get_gt_cards：需要压过的牌不为空时第一个元素为 'pass' '''
+        moves = self.moves
+        return [
+            ([] if _is_free_play(move) else ['pass']) + [moves[row] for row in rows]
+            for move, rows in zip(self._played_list(hands, played), self.legal_rows(hands, played))
+        ]
+
+    def legal_action_masks(self, hands: Sequence[HandLike], played) -> np.ndarray:
+        '''
+        合法动作掩码，bool[len(hands), len(ACTION_SPACE)]
+
+        与 get_legal_action_ids(get_gt_cards(played, hand)) 覆盖的动作相同；不是自由出牌时包含 'pass'
+        '''
+        masks = np.zeros((len(hands), self.num_actions), dtype=bool)
+        offsets = self.action_offsets
+        for target, block, rows, contained in self._legal_blocks(hands, played):
+            hand_at, row_at = np.nonzero(contained)
+            rows = rows[row_at]
+            # 每行可能对应多个抽象动作，按 CSR 展开
+            repeats = offsets[rows + 1] - offsets[rows]
+            starts = np.repeat(offsets[rows], repeats)
+            within = np.arange(len(starts)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+            masks[np.repeat(block[hand_at], repeats), self.action_ids[starts + within]] = True
+            if target[0] is not None:
+                masks[block, self.pass_action] = True
+        return masks
+
+    def legal_action_ids(self, hands: Sequence[HandLike], played) -> List[List[int]]:
+        '''批量版 get_legal_action_ids(get_gt_cards(...))，动作编号从小到大'''
+        return [np.flatnonzero(mask).tolist() for mask in self.legal_action_masks(hands, played)]
+
+
+@lru_cache(maxsize=1)
+def get_beats_index() -> BeatsIndex:
+    '''基于 utils 中已加载牌型表的索引，首次调用时构建（约几百毫秒）'''
+    from app.utils import utils
+    return BeatsIndex(utils.CARD_TYPE, utils.SPECIFIC_MAP, utils.ACTION_SPACE)
+
+
+def batch_gt_cards(hands: Sequence[HandLike], played) -> List[List[str]]:
+    return get_beats_index().gt_cards(hands, played)
+
+
+def batch_legal_action_ids(hands: Sequence[HandLike], played) -> List[List[int]]:
+    return get_beats_index().legal_action_ids(hands, played)
@@ -0,0 +1,356 @@
+'''
+牌型索引的紧凑二进制格式
+
+将 card_type.json / type_card.json / specific_map.json 预编译成一个二进制文件，
+运行时通过 mmap 只读映射，多个 uvicorn worker 共享同一份物理页，
+避免每个进程都把 ~6MB 的 JSON 解析成 OrderedDict。
+
+文件布局（小端）：
+    magic(4) | version(u32) | meta_len(u32) | meta(JSON) | 各数据段（8字节对齐）
+
+数据段：
+    keys_blob     所有牌面字符串按字典序拼接
+    key_offsets   u32[n_keys + 1]，keys_blob 中每个牌面的起止位置
+    key_type      u8[n_keys]，牌型编号（255 表示无牌型，例如 'pass'）
+    key_weight    u8[n_keys]，牌型权重
+    spec_offsets  u32[n_keys + 1]，spec_ids 中每个牌面的起止位置
+    spec_ids      u16[]，牌面对应的抽象动作编号（ACTION_SPACE 的值）
+    bucket_offsets u32[n_buckets + 1]，bucket_keys 中每个 (牌型, 权重) 桶的起止位置
+    bucket_keys   u32[]，桶内牌面的编号（保持 type_card.json 中的顺序）
+'''
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from collections.abc import Mapping
+import json
+import mmap
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+ROOT_PATH = os.path.abspath(os.path.dirname(__file__))
+JSON_DIR = os.path.join(ROOT_PATH, 'jsondata')
+INDEX_PATH = os.path.join(JSON_DIR, 'card_index.bin')
+
+MAGIC = b'CIDX'
+VERSION = 1
+NO_TYPE = 255
+
+# 参与编译的 JSON 源文件
+SOURCE_FILES = ['card_type.json', 'type_card.json', 'specific_map.json', 'action_space.json']
+
+# 数据段名称及其 array 类型码
+SECTIONS = [
+    ('keys_blob', 'B'),
+    ('key_offsets', 'I'),
+    ('key_type', 'B'),
+    ('key_weight', 'B'),
+    ('spec_offsets', 'I'),
+    ('spec_ids', 'H'),
+    ('bucket_offsets', 'I'),
+    ('bucket_keys', 'I'),
+]
+
+
+def _load_json(json_dir: str, name: str):
+    with open(os.path.join(json_dir, name), 'r') as file:
+        return json.load(file, object_pairs_hook=OrderedDict)
+
+
+def _source_signature(json_dir: str) -> Dict[str, int]:
+    '''JSON 源文件大小，用于判断索引是否过期'''
+    return {name: os.path.getsize(os.path.join(json_dir, name)) for name in SOURCE_FILES}
+
+
+def build_index(json_dir: str = JSON_DIR, out_path: str = INDEX_PATH) -> str:
+    '''
+    从 JSON 源文件重新生成二进制索引
+
+    参数:
+        json_dir (str): JSON 源文件目录
+        out_path (str): 输出的索引文件路径
+
+    返回:
+        str: 索引文件路径
+    '''
+    card_type = _load_json(json_dir, 'card_type.json')
+    type_card = _load_json(json_dir, 'type_card.json')
+    specific_map = _load_json(json_dir, 'specific_map.json')
+    action_space = _load_json(json_dir, 'action_space.json')
+
+    type_ids = {name: index for index, name in enumerate(type_card)}
+    abstract_names = [None] * len(action_space)
+    for name, action_id in action_space.items():
+        abstract_names[action_id] = name
+
+    keys = sorted(set(card_type) | set(specific_map))
+    key_ids = {key: index for index, key in enumerate(keys)}
+
+    sections = {name: array(code) for name, code in SECTIONS}
+    blob = bytearray()
+    sections['key_offsets'].append(0)
+    sections['spec_offsets'].append(0)
+    for key in keys:
+        blob += key.encode('ascii')
+        sections['key_offsets'].append(len(blob))
+        types = card_type.get(key)
+        if types:
+            # 每个牌面在表中只有一个牌型
+            type_name, weight = types[0]
+            sections['key_type'].append(type_ids[type_name])
+            sections['key_weight'].append(int(weight))
+        else:
+            sections['key_type'].append(NO_TYPE)
+            sections['key_weight'].append(0)
+        for abstract in specific_map.get(key, []):
+            sections['spec_ids'].append(action_space[abstract])
+        sections['spec_offsets'].append(len(sections['spec_ids']))
+    sections['keys_blob'] = array('B', bytes(blob))
+
+    types_meta = []
+    bucket_count = 0
+    sections['bucket_offsets'].append(0)
+    for type_name, weight_buckets in type_card.items():
+        weights_meta = []
+        for weight, cards_list in weight_buckets.items():
+            weights_meta.append([weight, bucket_count])
+            bucket_count += 1
+            for cards in cards_list:
+                sections['bucket_keys'].append(key_ids[cards])
+            sections['bucket_offsets'].append(len(sections['bucket_keys']))
+        types_meta.append([type_name, weights_meta])
+
+    if sys.byteorder != 'little':
+        for section in sections.values():
+            section.byteswap()
+
+    # 段偏移相对于数据区起点，数据区紧跟在 meta 之后并按 8 字节对齐
+    layout = {}
+    offset = 0
+    payloads = []
+    for name, _ in SECTIONS:
+        payload = sections[name].tobytes()
+        layout[name] = [offset, len(payload)]
+        payloads.append(payload + b'\0' * (-len(payload) % 8))
+        offset += len(payloads[-1])
+
+    meta = {
+        'n_keys': len(keys),
+        'n_typed_keys': len(card_type),
+        'types': types_meta,
+        'abstract_names': abstract_names,
+        'sources': _source_signature(json_dir),
+        'sections': layout,
+    }
+    meta_bytes = json.dumps(meta, separators=(',', ':')).encode('utf-8')
+    meta_bytes += b' ' * (-(12 + len(meta_bytes)) % 8)
+
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(VERSION.to_bytes(4, 'little'))
+        file.write(len(meta_bytes).to_bytes(4, 'little'))
+        file.write(meta_bytes)
+        for payload in payloads:
+            file.write(payload)
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class _KeySeq:
+    '''按编号访问有序牌面（bytes），供 bisect 二分查找'''
+
+    def __init__(self, mm, base, offsets):
+        self._mm = mm
+        self._base = base
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        return self._mm[self._base + self._offsets[index]:self._base + self._offsets[index + 1]]
+
+
+class CardIndex:
+    '''
+    已映射到内存的牌型索引
+
+    所有数据直接从 mmap 中读取，不在进程内构建大字典。
+    '''
+
+    def __init__(self, path: str = INDEX_PATH):
+        with open(path, 'rb') as file:
+            self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:4] != MAGIC:
+            raise ValueError(f'Invalid card index file: {path}')
+        version = int.from_bytes(self._mm[4:8], 'little')
+        if version != VERSION:
+            raise ValueError(f'Unsupported card index version: {version}')
+        meta_len = int.from_bytes(self._mm[8:12], 'little')
+        self.meta = json.loads(self._mm[12:12 + meta_len].decode('utf-8'))
+
+        data_start = 12 + meta_len
+        view = memoryview(self._mm)
+        arrays = {}
+        for name, code in SECTIONS[1:]:
+            offset, length = self.meta['sections'][name]
+            start = data_start + offset
+            arrays[name] = view[start:start + length].cast(code)
+        self._key_offsets = arrays['key_offsets']
+        self._key_type = arrays['key_type']
+        self._key_weight = arrays['key_weight']
+        self._spec_offsets = arrays['spec_offsets']
+        self._spec_ids = arrays['spec_ids']
+        self._bucket_offsets = arrays['bucket_offsets']
+        self._bucket_keys = arrays['bucket_keys']
+        blob_start = data_start + self.meta['sections']['keys_blob'][0]
+        self._keys = _KeySeq(self._mm, blob_start, self._key_offsets)
+
+        self.type_names = [name for name, _ in self.meta['types']]
+        self.abstract_names = self.meta['abstract_names']
+
+    def find(self, cards: str) -> int:
+        '''查找牌面编号，不存在时返回 -1'''
+        try:
+            target = cards.encode('ascii')
+        except (AttributeError, UnicodeEncodeError):
+            return -1
+        index = bisect_left(self._keys, target)
+        if index < len(self._keys) and self._keys[index] == target:
+            return index
+        return -1
+
+    def key(self, index: int) -> str:
+        return self._keys[index].decode('ascii')
+
+    def card_type(self, index: int) -> Optional[list]:
+        type_id = self._key_type[index]
+        if type_id == NO_TYPE:
+            return None
+        return [self.type_names[type_id], str(self._key_weight[index])]
+
+    def specific(self, index: int) -> List[str]:
+        return [self.abstract_names[action_id] for action_id in self.specific_ids(index)]
+
+    def specific_ids(self, index: int) -> Tuple[int, ...]:
+        start, end = self._spec_offsets[index], self._spec_offsets[index + 1]
+        return tuple(self._spec_ids[start:end])
+
+    def bucket(self, bucket_id: int) -> List[str]:
+        start, end = self._bucket_offsets[bucket_id], self._bucket_offsets[bucket_id + 1]
+        return [self.key(index) for index in self._bucket_keys[start:end]]
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class CardTypeTable(Mapping):
+    '''与 card_type.json 等价的只读映射：牌面 -> [[牌型, 权重]]'''
+
+    def __init__(self, index: CardIndex):
+        self._index = index
+
+    def __getitem__(self, cards):
+        position = self._index.find(cards)
+        card_type = self._index.card_type(position) if position >= 0 else None
+        if card_type is None:
+            raise KeyError(cards)
+        return [card_type]
+
+    def __iter__(self):
+        for position in range(len(self._index)):
+            if self._index.card_type(position) is not None:
+                yield self._index.key(position)
+
+    def __len__(self):
+        return self._index.meta['n_typed_keys']
+
+
+class SpecificMapTable(Mapping):
+    '''与 specific_map.json 等价的只读映射：牌面 -> 抽象动作列表'''
+
+    def __init__(self, index: CardIndex):
+        self._index = index
+
+    def __getitem__(self, cards):
+        position = self._index.find(cards)
+        if position < 0:
+            raise KeyError(cards)
+        return self._index.specific(position)
+
+    def action_ids(self, cards) -> Tuple[int, ...]:
+        '''牌面对应的抽象动作编号，直接读取索引中的编号，不经过动作名称'''
+        position = self._index.find(cards)
+        if position < 0:
+            raise KeyError(cards)
+        return self._index.specific_ids(position)
+
+    def __iter__(self):
+        for position in range(len(self._index)):
+            yield self._index.key(position)
+
+    def __len__(self):
+        return len(self._index)
+
+
+class WeightBuckets(Mapping):
+    '''某一牌型下的 权重 -> 牌面列表 映射，保持 type_card.json 中的顺序'''
+
+    def __init__(self, index: CardIndex, weights: list):
+        self._index = index
+        self._buckets = OrderedDict((weight, bucket_id) for weight, bucket_id in weights)
+
+    def __getitem__(self, weight):
+        return self._index.bucket(self._buckets[weight])
+
+    def __iter__(self):
+        return iter(self._buckets)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class TypeCardTable(Mapping):
+    '''与 type_card.json 等价的只读映射：牌型 -> WeightBuckets'''
+
+    def __init__(self, index: CardIndex):
+        self._types = OrderedDict(
+            (name, WeightBuckets(index, weights)) for name, weights in index.meta['types']
+        )
+
+    def __getitem__(self, card_type):
+        return self._types[card_type]
+
+    def __iter__(self):
+        return iter(self._types)
+
+    def __len__(self):
+        return len(self._types)
+
+
+def load_tables(path: str = INDEX_PATH, json_dir: str = JSON_DIR):
+    '''
+    加载二进制索引并返回 (CARD_TYPE, TYPE_CARD, SPECIFIC_MAP)
+
+    索引被禁用、不存在、已过期或平台不支持时返回 None，由调用方回退到 JSON。
+    '''
+    if not settings.CARD_INDEX_ENABLED or sys.byteorder != 'little':
+        return None
+    if not os.path.exists(path):
+        print(f"Card index not found at {path}, falling back to JSON. "
+              f"Run `python -m scripts.build_card_index` to build it.")
+        return None
+    try:
+        index = CardIndex(path)
+        if os.path.exists(os.path.join(json_dir, SOURCE_FILES[0])) \
+                and index.meta['sources'] != _source_signature(json_dir):
+            print("Card index is out of date, falling back to JSON. "
+                  "Run `python -m scripts.build_card_index` to rebuild it.")
+            return None
+    except (OSError, ValueError) as e:
+        print(f"Could not load card index: {e}")
+        return None
+    return CardTypeTable(index), TypeCardTable(index), SpecificMapTable(index)
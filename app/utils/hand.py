@@ -0,0 +1,214 @@
+'''
+手牌的计数向量表示
+
+Hand 用 15 个槽位记录每个点数的张数，下标与 utils.CARD_RANK_STR 一致：
+    3 4 5 6 7 8 9 T J Q K A 2 B R
+字符串只在接口边界解析一次，之后的子集判断、减法都在计数向量上完成。
+
+同时把计数打包成一个整数（位棋盘）：每个点数占 4 位，低 3 位为张数，最高位留作保护位，
+点数 i 位于第 4i ~ 4i+3 位。保护位吸收减法的借位，因此：
+    包含判断  ((a | GUARD) - b) & GUARD == GUARD
+    移除出牌  a - b
+    张数 >= n 的点数  ((a | GUARD) - n * ONES) & GUARD
+都只需要几次整数运算。点数集合用保护位组成的掩码表示（点数 i 对应第 4i+3 位），
+顺子判断即掩码与移位后的自身求与。
+'''
+from functools import lru_cache
+from typing import Iterable, List, Union
+
+# 与 utils.CARD_RANK_STR 的顺序一致
+RANK_STR = '3456789TJQKA2BR'
+RANK_INDEX = {card: index for index, card in enumerate(RANK_STR)}
+NUM_RANKS = len(RANK_STR)
+
+# 位棋盘布局
+LANE_BITS = 4
+MAX_COUNT = 7
+ONES = sum(1 << (LANE_BITS * index) for index in range(NUM_RANKS))
+GUARD = ONES << 3
+# 每个点数的保护位，RANK_LANE[i] 即只含点数 i 的掩码
+RANK_LANE = tuple(8 << (LANE_BITS * index) for index in range(NUM_RANKS))
+# 可以连成顺子的点数：3 ~ A
+CHAIN_LANES = sum(RANK_LANE[:12])
+# 除大小王以外的点数：3 ~ 2
+NON_JOKER_LANES = sum(RANK_LANE[:13])
+
+
+class Hand:
+    '''
+    不可变的手牌计数向量
+
+    bits 为打包后的位棋盘，counts[i] 为点数 RANK_STR[i] 的张数（从位棋盘构造时按需解码）。
+    可哈希，可作为缓存键。
+    '''
+    __slots__ = ('bits', '_counts', '_str', '_size')
+
+    def __init__(self, counts: Iterable[int]):
+        counts = tuple(counts)
+        if len(counts) != NUM_RANKS:
+            raise ValueError(f"Hand needs {NUM_RANKS} rank counts, got {len(counts)}")
+        bits = 0
+        shift = 0
+        for count in counts:
+            if not 0 <= count <= MAX_COUNT:
+                raise ValueError(f"Rank count must be between 0 and {MAX_COUNT}, got {count}")
+            bits |= count << shift
+            shift += LANE_BITS
+        self.bits = bits
+        self._counts = counts
+        self._str = None
+        self._size = sum(counts)
+
+    @classmethod
+    def from_bits(cls, bits: int) -> 'Hand':
+        '''从位棋盘构造手牌，bits 的每个点数不超过 MAX_COUNT 且保护位为 0'''
+        hand = cls.__new__(cls)
+        hand.bits = bits
+        hand._counts = None
+        hand._str = None
+        hand._size = None
+        return hand
+
+    @property
+    def counts(self) -> tuple:
+        if self._counts is None:
+            bits = self.bits
+            self._counts = tuple((bits >> (LANE_BITS * index)) & MAX_COUNT for index in range(NUM_RANKS))
+        return self._counts
+
+    @classmethod
+    def from_str(cls, cards: str) -> 'Hand':
+        '''
+        从牌面字符串构造手牌，例如 '3334BR'；'pass' 与空串表示空手牌
+
+        相同的字符串只解析一次。
+        '''
+        return _parse(cards)
+
+    def count(self, card: str) -> int:
+        '''某个点数的张数'''
+        return self.counts[RANK_INDEX[card]]
+
+    def contains(self, other: 'Hand') -> bool:
+        '''判断 other 是否为当前手牌的子集：某个点数不够时该点数的保护位被借走'''
+        return ((self.bits | GUARD) - other.bits) & GUARD == GUARD
+
+    def at_least(self, count: int) -> int:
+        '''张数不少于 count 的点数掩码'''
+        return ((self.bits | GUARD) - ONES * count) & GUARD
+
+    def __le__(self, other: 'Hand') -> bool:
+        return other.contains(self)
+
+    def __ge__(self, other: 'Hand') -> bool:
+        return self.contains(other)
+
+    def __sub__(self, other: 'Hand') -> 'Hand':
+        '''从手牌中移除 other，other 必须是当前手牌的子集'''
+        if not self.contains(other):
+            raise ValueError(f"Cannot remove {other} from {self}")
+        return Hand.from_bits(self.bits - other.bits)
+
+    def __add__(self, other: 'Hand') -> 'Hand':
+        return Hand(have + more for have, more in zip(self.counts, other.counts))
+
+    def __len__(self) -> int:
+        if self._size is None:
+            self._size = sum(self.counts)
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self.bits != 0
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Hand):
+            return self.bits == other.bits
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def __str__(self) -> str:
+        '''按点数排序的规范字符串，例如 '3334BR'；空手牌为 'pass' '''
+        if self._str is None:
+            self._str = ''.join(card * count for card, count in zip(RANK_STR, self.counts)) or 'pass'
+        return self._str
+
+    def __repr__(self) -> str:
+        return f"Hand('{self}')"
+
+
+EMPTY_HAND = Hand((0,) * NUM_RANKS)
+
+
+def rank_indexes(mask: int) -> List[int]:
+    '''点数掩码中的点数下标，从小到大'''
+    indexes = []
+    while mask:
+        low = mask & -mask
+        indexes.append((low.bit_length() >> 2) - 1)
+        mask ^= low
+    return indexes
+
+
+def lanes_from(start: int) -> int:
+    '''下标不小于 start 的点数掩码'''
+    return GUARD & (-1 << (LANE_BITS * max(start, 0)))
+
+
+def lanes_between(start: int, length: int) -> int:
+    '''下标在 [start, start + length) 内的点数掩码'''
+    return lanes_from(start) & ~lanes_from(start + length)
+
+
+def chain_starts(mask: int, length: int) -> int:
+    '''
+    掩码中长度为 length 的连续点数（只在 3 ~ A 之间）的起点掩码
+
+    例如 mask 含 3456789，length 为 5 时返回 3、4、5 三个起点
+    '''
+    mask &= CHAIN_LANES
+    starts = mask
+    for offset in range(1, length):
+        starts &= mask >> (LANE_BITS * offset)
+    return starts
+
+
+@lru_cache(maxsize=65536)
+def _parse(cards: str) -> Hand:
+    if not cards or cards == 'pass':
+        return EMPTY_HAND
+    counts = [0] * NUM_RANKS
+    for card in cards:
+        counts[RANK_INDEX[card]] += 1
+    return Hand(counts)
+
+
+def validate_cards(cards: str) -> str:
+    '''
+    校验接口传入的牌面字符串：只能包含 RANK_STR 中的字符，每个点数不超过 MAX_COUNT 张；'pass' 与空串表示不出
+
+    返回:
+        str: 原字符串
+    异常:
+        ValueError: 含有无效字符或某个点数张数过多
+    '''
+    if not cards or cards == 'pass':
+        return cards
+    invalid = set(cards) - RANK_INDEX.keys()
+    if invalid:
+        raise ValueError(f"Invalid cards: {''.join(sorted(invalid))}")
+    too_many = [card for card in RANK_STR if cards.count(card) > MAX_COUNT]
+    if too_many:
+        raise ValueError(f"At most {MAX_COUNT} cards of each rank, got too many: {''.join(too_many)}")
+    return cards
+
+
+def as_hand(cards: Union[str, Hand, None]) -> Hand:
+    '''
+    接口边界的适配：接受牌面字符串或 Hand，统一返回 Hand
+    '''
+    if isinstance(cards, Hand):
+        return cards
+    return _parse(cards or '')
+
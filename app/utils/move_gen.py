@@ -0,0 +1,304 @@
+'''
+直接从手牌计数生成能压过上一手牌的出牌
+
+不再扫描 TYPE_CARD 中某个牌型的所有权重桶，而是根据手牌中各点数的张数，
+按牌型规则直接构造候选出牌。生成的集合与 TYPE_CARD 过滤后的结果完全一致。
+张数筛选和顺子查找都在手牌的位棋盘（Hand.bits，见 app/utils/hand.py）上完成。
+
+权重规则（与 type_card.json 一致）：
+    单牌/对子/三张/炸弹/顺子类：权重为起始点数的下标
+    三带一/三带二/飞机带翅膀/四带二：权重为起始点数的下标 + 1
+    火箭：权重为 0
+
+classify_move 按同样的规则反向判断一手牌的牌型和权重，结果与 card_type.json 中的每一项一致，
+调用方不需要加载 CARD_TYPE 表。
+'''
+from typing import Iterator, List, Optional, Tuple
+
+from app.utils.hand import (
+    LANE_BITS,
+    MAX_COUNT,
+    NON_JOKER_LANES,
+    RANK_LANE,
+    RANK_STR,
+    Hand,
+    chain_starts,
+    lanes_between,
+    lanes_from,
+    rank_indexes,
+)
+
+# 下标 12 为 '2'，13/14 为小王/大王
+TWO_INDEX = 12
+BLACK_JOKER_INDEX = 13
+RED_JOKER_INDEX = 14
+ROCKET = Hand.from_str('BR')
+
+# 顺子类牌型：每个点数的张数
+CHAIN_COPIES = {
+    'solo': 1,
+    'pair': 2,
+    'trio': 3,
+}
+
+# 单个点数的牌型（不含单牌）：每个点数的张数
+SINGLE_COPIES = {
+    'pair': 2,
+    'trio': 3,
+    'bomb': 4,
+}
+
+# 带牌类牌型：(主体每个点数的张数, 附件类型)
+ATTACHMENT_RULES = {
+    'trio_solo': (3, 'solo'),
+    'trio_pair': (3, 'pair'),
+    'four_two_solo': (4, 'solo'),
+    'four_two_pair': (4, 'pair'),
+}
+
+
+# 各牌型的主体长度范围（与 type_card.json 一致）
+CHAIN_LENGTHS = {
+    'solo': (5, 12),
+    'pair': (3, 10),
+    'trio': (2, 6),
+    'trio_solo': (1, 5),
+    'trio_pair': (1, 4),
+    'four_two_solo': (1, 1),
+    'four_two_pair': (1, 1),
+}
+
+
+def move_type_name(base: str, length: int) -> str:
+    '''split_move_type 的逆运算，例如 ('trio_solo', 3) -> 'trio_solo_chain_3' '''
+    if length == 1 or base in ('four_two_solo', 'four_two_pair'):
+        return base
+    return f'{base}_chain_{length}'
+
+
+def split_move_type(move_type: str) -> Tuple[str, int]:
+    '''
+    拆分牌型名称
+
+    例如 'trio_solo_chain_3' -> ('trio_solo', 3)，'pair' -> ('pair', 1)
+    '''
+    if '_chain_' in move_type:
+        base, length = move_type.rsplit('_chain_', 1)
+        return base, int(length)
+    return move_type, 1
+
+
+# 主体牌面字符串：(每个点数的张数, 起点, 长度) -> 字符串
+_BODY_STR = {
+    (copies, start, length): ''.join(card * copies for card in RANK_STR[start:start + length])
+    for copies in range(1, 5)
+    for start in range(len(RANK_STR))
+    for length in range(1, len(RANK_STR) - start + 1)
+}
+
+
+def body_str(copies: int, start: int, length: int) -> str:
+    '''主体牌面字符串，例如 body_str(2, 0, 3) -> '334455' '''
+    return _BODY_STR[(copies, start, length)]
+
+
+def _chain_starts(hand: Hand, copies: int, length: int, min_start: int) -> List[int]:
+    '''枚举起点不小于 min_start、每个点数至少 copies 张、长度为 length 的连续点数的起点'''
+    mask = hand.at_least(copies)
+    if length == 1:
+        # 单个主体（三带、四带二）可以是 '2'，不能是大小王
+        return rank_indexes(mask & NON_JOKER_LANES & lanes_from(min_start))
+    return rank_indexes(chain_starts(mask, length) & lanes_from(min_start))
+
+
+def _multisets(caps: List[Tuple[int, int]], size: int, position: int = 0) -> Iterator[List[Tuple[int, int]]]:
+    '''
+    从 caps=[(点数下标, 最多可用张数), ...] 中选出总张数为 size 的组合
+
+    返回按点数排序的 [(点数下标, 张数), ...]
+    '''
+    if size == 0:
+        yield []
+        return
+    if size == 1:
+        for index, _ in caps[position:]:
+            yield [(index, 1)]
+        return
+    for offset in range(position, len(caps)):
+        index, cap = caps[offset]
+        for copies in range(min(cap, size), 0, -1):
+            for rest in _multisets(caps, size - copies, offset + 1):
+                yield [(index, copies)] + rest
+
+
+def solo_attachment_caps(hand: Hand, chain_start: int, chain_length: int) -> List[Tuple[int, int]]:
+    '''
+    单牌附件每个点数可用的张数
+
+    附件不能和主体同点数；不能带炸弹（最多3张）；
+    与主体相邻的点数不能带3张（'2' 除外），否则会与主体连成更长的飞机。
+    '''
+    caps = []
+    counts = hand.counts
+    for index in rank_indexes(hand.at_least(1) & ~lanes_between(chain_start, chain_length)):
+        cap = min(counts[index], 3)
+        if (index == chain_start - 1 or index == chain_start + chain_length) and index != TWO_INDEX:
+            cap = min(cap, 2)
+        caps.append((index, cap))
+    return caps
+
+
+def pair_attachment_caps(hand: Hand, chain_start: int, chain_length: int) -> List[Tuple[int, int]]:
+    '''对子附件可用的点数，每个点数最多带一对'''
+    mask = hand.at_least(2) & NON_JOKER_LANES & ~lanes_between(chain_start, chain_length)
+    return [(index, 1) for index in rank_indexes(mask)]
+
+
+def _attached_moves(hand: Hand, body_copies: int, attachment: str,
+                    length: int, min_start: int) -> Iterator[str]:
+    for start in _chain_starts(hand, body_copies, length, min_start):
+        body = body_str(body_copies, start, length)
+        # 三带和飞机带翅膀的附件数等于主体长度，四带二固定带两个
+        size = 2 if body_copies == 4 else length
+        if attachment == 'solo':
+            caps = solo_attachment_caps(hand, start, length)
+            unit = 1
+        else:
+            caps = pair_attachment_caps(hand, start, length)
+            unit = 2
+        for chosen in _multisets(caps, size):
+            # 附件不能同时带大小王
+            if chosen[-1][0] == RED_JOKER_INDEX and len(chosen) > 1 and chosen[-2][0] == BLACK_JOKER_INDEX:
+                continue
+            # 附件按点数排在主体前后，保持规范顺序
+            pre_attached = ''
+            post_attached = ''
+            for index, copies in chosen:
+                if index < start:
+                    pre_attached += RANK_STR[index] * (copies * unit)
+                else:
+                    post_attached += RANK_STR[index] * (copies * unit)
+            yield pre_attached + body + post_attached
+
+
+def gen_moves_of_type(hand: Hand, move_type: str, weight: int = -1) -> List[str]:
+    '''
+    生成手牌中牌型为 move_type 且权重大于 weight 的所有出牌
+
+    参数:
+        hand (Hand): 当前手牌
+        move_type (str): 牌型名称，与 type_card.json 的键一致
+        weight (int): 需要压过的权重，-1 表示不限
+
+    返回:
+        List[str]: 出牌字符串列表（按点数排序的规范形式）
+    '''
+    if move_type == 'rocket':
+        if weight < 0 and hand.contains(ROCKET):
+            return ['BR']
+        return []
+    above = lanes_from(weight + 1)
+    if move_type == 'solo':
+        return [RANK_STR[index] for index in rank_indexes(hand.at_least(1) & above)]
+    if move_type in SINGLE_COPIES:
+        copies = SINGLE_COPIES[move_type]
+        return [RANK_STR[index] * copies for index in rank_indexes(hand.at_least(copies) & above & NON_JOKER_LANES)]
+
+    base, length = split_move_type(move_type)
+    if base in CHAIN_COPIES:
+        copies = CHAIN_COPIES[base]
+        return [body_str(copies, start, length) for start in _chain_starts(hand, copies, length, weight + 1)]
+    if base in ATTACHMENT_RULES:
+        body_copies, attachment = ATTACHMENT_RULES[base]
+        # 带牌类牌型的权重为起点下标 + 1
+        return list(_attached_moves(hand, body_copies, attachment, length, weight))
+    raise ValueError(f"Unknown move type: {move_type}")
+
+
+def gen_gt_moves(hand: Hand, move_type: str, weight: int) -> List[str]:
+    '''
+    生成能压过 (move_type, weight) 的所有出牌，不包含 'pass'
+
+    同牌型权重更大的出牌、炸弹（对方出炸弹时需更大）和火箭都可以压过。
+    '''
+    if move_type == 'rocket':
+        return []
+    moves = gen_moves_of_type(hand, move_type, weight)
+    moves += gen_moves_of_type(hand, 'rocket')
+    if move_type != 'bomb':
+        moves += gen_moves_of_type(hand, 'bomb')
+    return moves
+
+
+def _valid_attachments(rest: Hand, attachment: str, chain: int) -> bool:
+    '''去掉主体后剩下的牌 rest 能否作为附件，规则与 solo_attachment_caps / pair_attachment_caps 一致'''
+    ranks = rest.at_least(1)
+    if attachment == 'pair':
+        # 每个点数恰好一对，不能是大小王
+        return rest.at_least(2) == ranks and not rest.at_least(3) and not ranks & ~NON_JOKER_LANES
+    if rest.at_least(4) or rest.contains(ROCKET):
+        return False
+    # 与主体相邻的点数最多带 2 张（'2' 除外）
+    adjacent = ((chain << LANE_BITS) | (chain >> LANE_BITS)) & ~chain & ~lanes_from(TWO_INDEX)
+    return not rest.at_least(3) & adjacent
+
+
+def classify_move(hand: Hand) -> Optional[Tuple[str, int]]:
+    '''
+    根据点数张数判断出牌的牌型和权重，与 card_type.json 一致；不是合法出牌时返回 None
+
+    只依赖位棋盘，不要求牌面按点数排序。
+    '''
+    if not hand:
+        return None
+    if hand == ROCKET:
+        return 'rocket', 0
+    ranks = hand.at_least(1)
+    first = ((ranks & -ranks).bit_length() >> 2) - 1
+    copies = (hand.bits >> (LANE_BITS * first)) & MAX_COUNT
+
+    # 单牌、对子、三张、炸弹
+    if not ranks & (ranks - 1):
+        if copies == 1:
+            return 'solo', first
+        if first <= TWO_INDEX and copies <= 4:
+            return ('pair', 'trio', 'bomb')[copies - 2], first
+        return None
+
+    # 顺子、连对、飞机（不带翅膀）：每个点数张数相同且连续
+    if copies <= 3 and hand.at_least(copies) == ranks and not hand.at_least(copies + 1):
+        base = ('solo', 'pair', 'trio')[copies - 1]
+        length = bin(ranks).count('1')
+        low, high = CHAIN_LENGTHS[base]
+        if low <= length <= high and chain_starts(ranks, length) == RANK_LANE[first]:
+            return move_type_name(base, length), first
+
+    # 三带一、三带二、飞机带翅膀、四带二：主体加附件的总张数决定主体长度，
+    # 附件不能与主体同点数，所以主体的每个点数恰好有 body_copies 张
+    size = len(hand)
+    for base, (body_copies, attachment) in ATTACHMENT_RULES.items():
+        unit = 1 if attachment == 'solo' else 2
+        if body_copies == 4:
+            length = 1
+            if size != 4 + 2 * unit:
+                continue
+        else:
+            if size % (3 + unit):
+                continue
+            length = size // (3 + unit)
+        low, high = CHAIN_LENGTHS[base]
+        if not low <= length <= high:
+            continue
+        exact = hand.at_least(body_copies) & ~hand.at_least(body_copies + 1)
+        if length == 1:
+            # 单个主体可以是 '2'，不能是大小王
+            starts = exact & NON_JOKER_LANES
+        else:
+            starts = chain_starts(exact, length)
+        for start in rank_indexes(starts):
+            chain = lanes_between(start, length)
+            rest = Hand.from_bits(hand.bits - (chain >> 3) * body_copies)
+            if _valid_attachments(rest, attachment, chain):
+                # 带牌类牌型的权重为起点下标 + 1
+                return move_type_name(base, length), start + 1
+    return None
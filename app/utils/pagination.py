@@ -0,0 +1,162 @@
+'''
+游标（keyset）分页
+
+按 (排序字段, _id) 定位下一页，不再使用 skip，深翻页的耗时与第一页相同。
+游标是对客户端不透明的 base64 字符串，内容为上一页最后一条记录的排序值和 _id，
+同时记录排序字段和方向，换了排序方式的游标会被拒绝。
+
+总数统计（count_documents）开销与集合大小成正比，cached_count 在进程内按查询条件缓存一段时间。
+'''
+import base64
+from datetime import datetime
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+
+
+class InvalidCursor(ValueError):
+    '''游标格式错误或与当前排序方式不一致'''
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$date" in value:
+            return datetime.fromisoformat(value["$date"])
+        if "$oid" in value:
+            return ObjectId(value["$oid"])
+    return value
+
+
+def encode_cursor(sort_field: str, sort_order: int, document: dict) -> str:
+    '''根据一页的最后一条记录生成下一页的游标'''
+    payload = {
+        "f": sort_field,
+        "o": sort_order,
+        "v": _encode_value(document.get(sort_field)),
+        "id": str(document["_id"]),
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_field: str, sort_order: int) -> Tuple[Any, Any]:
+    '''
+    解析游标
+
+    返回:
+        (排序值, _id)
+
+    异常:
+        InvalidCursor: 游标无法解析，或排序字段/方向与请求不一致
+    '''
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        last_id = payload["id"]
+        if ObjectId.is_valid(last_id):
+            last_id = ObjectId(last_id)
+        value = _decode_value(payload["v"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+    # 游标没有签名，值会直接拼进查询条件，只接受标量，防止构造 {"$ne": ...} 之类的操作符
+    if not isinstance(last_id, (str, ObjectId)) or isinstance(value, (dict, list)):
+        raise InvalidCursor("Invalid cursor: unexpected value type")
+    if payload.get("f") != sort_field or payload.get("o") != sort_order:
+        raise InvalidCursor("Cursor does not match the requested sort")
+    return value, last_id
+
+
+def keyset_filter(sort_field: str, sort_order: int, value: Any, last_id: Any) -> dict:
+    '''排在 (value, last_id) 之后的记录'''
+    op = "$lt" if sort_order < 0 else "$gt"
+    if sort_field == "_id":
+        return {"_id": {op: last_id}}
+    return {"$or": [
+        {sort_field: {op: value}},
+        {sort_field: value, "_id": {op: last_id}},
+    ]}
+
+
+def keyset_sort(sort_field: str, sort_order: int) -> List[Tuple[str, int]]:
+    '''排序条件，_id 作为第二排序键保证顺序稳定'''
+    if sort_field == "_id":
+        return [("_id", sort_order)]
+    return [(sort_field, sort_order), ("_id", sort_order)]
+
+
+async def find_page(
+    collection,
+    query: dict,
+    sort_field: str,
+    sort_order: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[dict] = None
+) -> Tuple[List[dict], Optional[str]]:
+    '''
+    按游标查询一页
+
+    参数:
+        cursor: 上一页返回的 next_cursor，为 None 时从第一页开始
+
+    返回:
+        (记录列表, 下一页游标)，没有下一页时游标为 None
+    '''
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_field, sort_order)
+        after = keyset_filter(sort_field, sort_order, value, last_id)
+        query = {"$and": [query, after]} if query else after
+    # 多取一条判断是否还有下一页
+    documents = await collection.find(query, projection) \
+        .sort(keyset_sort(sort_field, sort_order)) \
+        .limit(limit + 1) \
+        .to_list(length=limit + 1)
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(sort_field, sort_order, documents[-1])
+    return documents, next_cursor
+
+
+_count_cache: Dict[Tuple[str, str], Tuple[float, int]] = {}
+_count_lock = threading.Lock()
+
+
+async def cached_count(collection, query: dict, ttl: Optional[float] = None) -> int:
+    '''
+    count_documents 的进程内缓存，ttl 秒内相同集合、相同条件直接返回缓存值
+
+    参数:
+        ttl: 缓存秒数，默认 PAGINATION_COUNT_CACHE_TTL；0 表示不缓存
+    '''
+    if ttl is None:
+        ttl = settings.PAGINATION_COUNT_CACHE_TTL
+    key = (collection.full_name, json.dumps(query, sort_keys=True, default=str))
+    now = time.monotonic()
+    if ttl > 0:
+        with _count_lock:
+            cached = _count_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+    count = await collection.count_documents(query)
+    if ttl > 0:
+        with _count_lock:
+            # 条件组合有限，过期条目在这里顺便清理
+            if len(_count_cache) > 1024:
+                for stale in [k for k, (expires, _) in _count_cache.items() if expires <= now]:
+                    del _count_cache[stale]
+            _count_cache[key] = (now + ttl, count)
+    return count
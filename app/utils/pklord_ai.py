@@ -1,7 +1,12 @@
-import requests
-from typing import Dict, Union, List
+import asyncio
+import random
+import httpx
+from typing import Dict, Optional, Union, List
 import json
+import time
 import traceback
+from app.core.config import settings
+from app.core.metrics import registry
 from app.utils import utils
 from app.models.play import PredictPutCardModel
 
@@ -11,10 +16,12 @@ class PklordAI:
     """
     斗地主AI静态类
     用于处理叫地主、出牌和让牌等操作
+
+    所有请求共用一个 httpx.AsyncClient 连接池，在应用启动时创建、关闭时释放。
     """
     
     # API基础URL
-    BASE_URL = "http://47.116.37.81:8567/ai-poker"
+    BASE_URL = settings.PKLORD_AI_BASE_URL
     # 请求头
     HEADERS = {
         'accept': 'application/json',
@@ -23,48 +30,107 @@ class PklordAI:
     }
     # 密码
     PASSWD = "hk25f98y"
-    
+
+    # 各接口的 (连接超时, 读取超时) 秒数，以及是否幂等（幂等接口失败后可以重试）
+    ENDPOINTS = {
+        "call-landlord": {"connect": 3.0, "read": 5.0, "idempotent": True},
+        "play-card": {"connect": 3.0, "read": 10.0, "idempotent": True},
+        "check": {"connect": 3.0, "read": 5.0, "idempotent": True},
+    }
+    # 遇到这些状态码时视为上游暂时不可用，可以重试
+    RETRY_STATUS = {429, 502, 503, 504}
+
+    _client: Optional[httpx.AsyncClient] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    async def init_client(transport: httpx.AsyncBaseTransport = None) -> None:
+        """
+        创建连接池（在事件循环中调用）
+
+        Args:
+            transport: 自定义传输层，测试时可传入 httpx.MockTransport
+        """
+        if PklordAI._client is not None:
+            return
+        PklordAI._client = httpx.AsyncClient(
+            base_url=PklordAI.BASE_URL,
+            headers=PklordAI.HEADERS,
+            limits=httpx.Limits(
+                max_connections=settings.PKLORD_AI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PKLORD_AI_MAX_CONNECTIONS,
+            ),
+            transport=transport,
+        )
+        PklordAI._semaphore = asyncio.Semaphore(settings.PKLORD_AI_MAX_CONCURRENCY)
+        print("PklordAI client created.")
+
+    @staticmethod
+    async def close_client() -> None:
+        """关闭连接池"""
+        if PklordAI._client is not None:
+            await PklordAI._client.aclose()
+        PklordAI._client = None
+        PklordAI._semaphore = None
+
+    @staticmethod
+    def _retry_delay(attempt: int) -> float:
+        """指数退避 + 全抖动，避免多个 worker 同时重试"""
+        return random.uniform(0, settings.PKLORD_AI_RETRY_BACKOFF * (2 ** attempt))
+
     @staticmethod
-    def _make_request(url: str, data: dict) -> Dict:
+    async def _make_request(endpoint: str, data: dict) -> Dict:
         """
         发送HTTP请求的通用方法
         
         Args:
-            url (str): 请求URL
+            endpoint (str): 接口名，必须在 ENDPOINTS 中
             data (dict): 请求数据
             
         Returns:
-            Dict: 响应数据
+            Dict: 响应数据；失败时为 {"code": 状态码或 -1, "message": 错误信息}
         """
-        try:
-            # 确保请求数据中包含密码
-            if 'passwd' not in data:
-                data['passwd'] = PklordAI.PASSWD
-                
-            response = requests.post(
-                url,
-                headers=PklordAI.HEADERS,
-                json=data,
-                timeout=30  # 添加超时设置
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
+        if PklordAI._client is None:
+            await PklordAI.init_client()
+        config = PklordAI.ENDPOINTS[endpoint]
+        timeout = httpx.Timeout(config["read"], connect=config["connect"])
+        retries = settings.PKLORD_AI_RETRIES if config["idempotent"] else 0
+
+        # 确保请求数据中包含密码
+        if 'passwd' not in data:
+            data['passwd'] = PklordAI.PASSWD
+
+        for attempt in range(retries + 1):
+            last_attempt = attempt == retries
+            try:
+                async with PklordAI._semaphore:
+                    start = time.perf_counter()
+                    try:
+                        response = await PklordAI._client.post(f"/{endpoint}", json=data, timeout=timeout)
+                    except httpx.TransportError as e:
+                        registry.observe("pklord_ai_request", time.perf_counter() - start, endpoint=endpoint, outcome=type(e).__name__)
+                        raise
+                    registry.observe("pklord_ai_request", time.perf_counter() - start, endpoint=endpoint, outcome=response.status_code)
+
+                if response.status_code == 200:
+                    return response.json()
                 print(f"请求失败，状态码: {response.status_code}")
-                return {"code": response.status_code, "message": response.text}
-                
-        except requests.exceptions.RequestException as e:
-            print(f"请求异常: {str(e)}")
-            print(f"异常详情: {traceback.format_exc()}")
-            return {"code": -1, "message": str(e)}
-        except Exception as e:
-            print(f"其他异常: {str(e)}")
-            print(f"异常详情: {traceback.format_exc()}")
-            return {"code": -1, "message": str(e)}
+                if last_attempt or response.status_code not in PklordAI.RETRY_STATUS:
+                    return {"code": response.status_code, "message": response.text}
+            except httpx.TransportError as e:
+                # 连接失败、超时等网络错误
+                print(f"请求异常: {endpoint} 第{attempt + 1}次: {e!r}")
+                if last_attempt:
+                    return {"code": -1, "message": str(e) or repr(e)}
+            except Exception as e:
+                print(f"其他异常: {str(e)}")
+                print(f"异常详情: {traceback.format_exc()}")
+                return {"code": -1, "message": str(e)}
+            registry.inc("pklord_ai_retries", endpoint=endpoint)
+            await asyncio.sleep(PklordAI._retry_delay(attempt))
     
     @staticmethod
-    def call_landlord(
+    async def call_landlord(
         self_cards: str,
         call_time: int,
         oppo_call: int,
@@ -86,8 +152,6 @@ class PklordAI:
         Returns:
             Dict[str, int]: 包含call和code的字典，如 {"call": 1, "code": 0}
         """
-        url = f"{PklordAI.BASE_URL}/call-landlord"
-        
         data = {
             "self_cards": self_cards,
             "call_time": call_time,
@@ -102,10 +166,10 @@ class PklordAI:
         if mode != 1:
             data["mode"] = mode
             
-        return PklordAI._make_request(url, data)
+        return await PklordAI._make_request("call-landlord", data)
     
     @staticmethod
-    def play_cards(predict_model: PredictPutCardModel) -> Dict[str, Union[str, int]]:
+    async def play_cards(predict_model: PredictPutCardModel) -> Dict[str, Union[str, int]]:
         """
         出牌
         
@@ -126,8 +190,6 @@ class PklordAI:
         Returns:
             Dict[str, Union[str, int]]: 包含cards和code的字典，如 {"cards": "X,D", "code": 0}
         """
-        url = f"{PklordAI.BASE_URL}/play-card"
-        
         params = PklordAI.prepare_play_data(predict_model)
         data = {
             "history": params.get("history", []),
@@ -139,7 +201,7 @@ class PklordAI:
             "oppo_win_card_num": params.get("oppo_win_card_num", 0),
             "oppo_left_cards": params.get("oppo_left_cards", 0)
         }
-        best_actions = PklordAI._make_request(url, data)
+        best_actions = await PklordAI._make_request("play-card", data)
         best_actions = best_actions.get("cards", "")
         #print(f"best_actions: {best_actions}")
         result = ''
@@ -150,7 +212,7 @@ class PklordAI:
         return utils.convert_card_format(result)
     
     @staticmethod
-    def check(
+    async def check(
         self_cards: str,
         check_card_num: int,
         self_player_account_id: str = None,
@@ -170,8 +232,6 @@ class PklordAI:
         Returns:
             Dict[str, int]: 包含check和code的字典，如 {"check": 1, "code": 0}
         """
-        url = f"{PklordAI.BASE_URL}/check"
-        
         data = {
             "self_cards": self_cards,
             "check_card_num": check_card_num
@@ -185,7 +245,7 @@ class PklordAI:
         if mode != 1:
             data["mode"] = mode
             
-        return PklordAI._make_request(url, data)
+        return await PklordAI._make_request("check", data)
     
     @staticmethod
     def convert_card_format(cards: str) -> str:
@@ -300,15 +360,26 @@ class PklordAI:
 
 
 class PklordLocal:
-    def play_cards(request):
-        
+    @staticmethod
+    def last_move(request):
+        '''需要压过的上一手牌，没有出牌记录时为 None'''
+        return request.playables[-1].cards if request.playables else None
+
+    def play_cards(request, actions=None):
+        '''
+        本地出牌策略
+
+        参数:
+            actions: 已经查好的合法出牌（例如来自 Redis 二级缓存），为 None 时查询进程内缓存
+        '''
         print(f"request: {request}")
         if request.pk_status != 0:
             return 'pass'
         
-        current_hand = request.current_hand
-        lastMove = request.playables[-1].cards if request.playables else None
-        actions =  utils.get_gt_cards(lastMove,current_hand)
+        # 手牌只解析一次，后续的出牌计算都使用 Hand
+        current_hand = utils.as_hand(request.current_hand)
+        if actions is None:
+            actions = utils.legal_action_cache.get(current_hand, PklordLocal.last_move(request))
         print(f"actions: {actions}")
         if len(actions) <= 1:
             return "pass"
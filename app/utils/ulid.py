@@ -0,0 +1,53 @@
+"""
+按时间排序的唯一ID（ULID）
+
+26 位 Crockford Base32 字符串：前 10 位是毫秒时间戳，后 16 位是 80 位随机数。
+按字符串排序即按生成时间排序；同一毫秒内在上一个ID的随机部分上加一，保证本进程内严格递增。
+不需要访问数据库，不同进程间靠 80 位随机数避免冲突，最终由唯一索引兜底。
+"""
+import os
+import threading
+import time
+
+ENCODING = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+RANDOM_BITS = 80
+_RANDOM_MAX = (1 << RANDOM_BITS) - 1
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(ENCODING[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def new_ulid() -> str:
+    """生成一个 ULID"""
+    global _last_ms, _last_random
+    with _lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _last_ms:
+            # 同一毫秒（或时钟回拨）：沿用上一个时间戳，随机部分加一
+            now_ms = _last_ms
+            random_part = _last_random + 1
+            if random_part > _RANDOM_MAX:
+                # 随机部分用尽，借用下一毫秒
+                now_ms += 1
+                random_part = int.from_bytes(os.urandom(10), "big")
+        else:
+            random_part = int.from_bytes(os.urandom(10), "big")
+        _last_ms, _last_random = now_ms, random_part
+    return _encode(now_ms, 10) + _encode(random_part, 16)
+
+
+def ulid_timestamp(ulid: str) -> int:
+    """ULID 中的毫秒时间戳"""
+    value = 0
+    for char in ulid[:10].upper():
+        value = value * 32 + ENCODING.index(char)
+    return value
@@ -1,38 +1,72 @@
 from bisect import bisect_left
-import collections
 from itertools import combinations
 import os
 import json
-from collections import Counter, OrderedDict, defaultdict
-import threading
+from collections import OrderedDict
+from functools import lru_cache
 import time
-from typing import Dict, List
-import uuid
+from typing import Dict, List, Tuple
 
 import numpy as np
 
+from app.core.config import settings
 from app.models.play import PredictPutCardModel
+from app.utils import card_index
+from app.utils.action_cache import LegalActionCache
+from app.utils.ulid import new_ulid
+from app.utils.hand import (
+    MAX_COUNT,
+    NON_JOKER_LANES,
+    RANK_LANE,
+    Hand,
+    as_hand,
+    chain_starts,
+    lanes_between,
+    rank_indexes,
+)
+from app.utils.move_gen import ROCKET, body_str, classify_move, gen_gt_moves
 
 # 读取所需的JSON文件路径
 ROOT_PATH = os.path.abspath(os.path.dirname(__file__))
 
-# 读取特定动作映射的JSON文件
-with open(os.path.join(ROOT_PATH, 'jsondata', 'specific_map.json'), 'r') as file:
-    SPECIFIC_MAP = json.load(file, object_pairs_hook=OrderedDict)
+# 优先使用预编译的二进制牌型索引（mmap 共享），不可用时回退到 JSON
+_card_tables = card_index.load_tables()
 
 # 读取动作空间的JSON文件，并获取所有动作列表
 with open(os.path.join(ROOT_PATH, 'jsondata', 'action_space.json'), 'r') as file:
     ACTION_SPACE = json.load(file, object_pairs_hook=OrderedDict)
     ACTION_LIST = list(ACTION_SPACE.keys())
 
-# 读取牌型的JSON文件
-with open(os.path.join(ROOT_PATH, 'jsondata', 'card_type.json'), 'r') as file:
-    data = json.load(file, object_pairs_hook=OrderedDict)
-    CARD_TYPE = data
+NUM_ACTIONS = len(ACTION_SPACE)
+# 动作ID -> 抽象动作，ID 为 0 ~ NUM_ACTIONS - 1
+ACTION_BY_ID = sorted(ACTION_SPACE, key=ACTION_SPACE.get)
+
+if _card_tables:
+    SPECIFIC_MAP = _card_tables[2]
+else:
+    # 读取特定动作映射的JSON文件
+    with open(os.path.join(ROOT_PATH, 'jsondata', 'specific_map.json'), 'r') as file:
+        SPECIFIC_MAP = json.load(file, object_pairs_hook=OrderedDict)
+
+# 牌型表只在首次访问 utils.CARD_TYPE / utils.TYPE_CARD 时加载（见 __getattr__），
+# 判断牌型和生成出牌都由 move_gen 直接计算，不依赖这两张表
+_LAZY_TABLES = {
+    'CARD_TYPE': (0, 'card_type.json'),
+    'TYPE_CARD': (1, 'type_card.json'),
+}
+
 
-# 读取类型对应卡牌的JSON文件
-with open(os.path.join(ROOT_PATH, 'jsondata', 'type_card.json'), 'r') as file:
-    TYPE_CARD = json.load(file, object_pairs_hook=OrderedDict)
+def __getattr__(name):
+    if name not in _LAZY_TABLES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    position, file_name = _LAZY_TABLES[name]
+    if _card_tables:
+        table = _card_tables[position]
+    else:
+        with open(os.path.join(ROOT_PATH, 'jsondata', file_name), 'r') as file:
+            table = json.load(file, object_pairs_hook=OrderedDict)
+    globals()[name] = table
+    return table
 
 # 定义牌的排名顺序（字符串表示）
 CARD_RANK_STR = ['3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K',
@@ -68,15 +102,13 @@ REVERSE_CARD_MAP = {v: k for k, v in CARD_MAP.items()}
 INDEX = OrderedDict(sorted(CARD_RANK_STR_INDEX.items(), key=lambda t: t[1]))
 
 
-async def generate_unique_task_id(db) -> str:
+def generate_task_id() -> str:
     """
-    处理用户账单和任务相关的服务类
+    生成任务ID（ULID，按创建时间排序）
+
+    本地生成，不访问数据库；唯一性由 user_tasks.task_id 的唯一索引保证，插入时遇到重复（DuplicateKeyError）重新生成
     """
-    while True:
-        task_id = uuid.uuid4().hex + uuid.uuid4().hex[:16]
-        existing_task = await db.user_tasks.find_one({"task_id": task_id})
-        if not existing_task:
-            return task_id
+    return new_ulid()
 
 # 获取当前时间戳（毫秒级）
 def get_current_timestamp():
@@ -129,25 +161,53 @@ def convert_card_format(card_str: str) -> str:
 def get_reverse_card_map(card_id:int):
     return REVERSE_CARD_MAP[card_id]
 
-def get_card_type(card:str):
+def get_card_type(card):
+    '''
+        获取卡牌类型，格式与 card_type.json 相同：[[牌型, 权重]]，例如 '33345' -> [['trio_solo', '1']]
+
+        牌面不需要排序；不是合法出牌时返回空列表
+    '''
+    move = classify_move(as_hand(card))
+    if move is None:
+        return []
+    return [[move[0], str(move[1])]]
+
+@lru_cache(maxsize=None)
+def specific_action_ids(cards: str) -> Tuple[int, ...]:
+    '''
+        具体出牌对应的抽象动作编号，例如 '33344456' -> (ACTION_SPACE['333444**'],)
+
+        每个牌面只计算一次；不在 SPECIFIC_MAP 中的牌面抛出 KeyError
     '''
-        获取卡牌类型
+    if _card_tables:
+        return SPECIFIC_MAP.action_ids(cards)
+    return tuple(ACTION_SPACE[abstract] for abstract in SPECIFIC_MAP[cards])
+
+
+@lru_cache(maxsize=1)
+def action_cards() -> Tuple[frozenset, ...]:
     '''
-    return CARD_TYPE[card]
+        动作ID -> 对应的所有具体出牌，首次调用时由 SPECIFIC_MAP 反向生成
+    '''
+    cards_by_id = [set() for _ in range(NUM_ACTIONS)]
+    for cards in SPECIFIC_MAP:
+        for action_id in specific_action_ids(cards):
+            cards_by_id[action_id].add(cards)
+    return tuple(frozenset(cards) for cards in cards_by_id)
+
 
 def get_card_str_by_action_id(action_id:int,card_list:List[str]):
     '''
         根据动作ID获取卡牌字符串
+
+        返回 card_list 中第一个对应该动作的出牌；没有时（包括未知的动作ID）返回 None
     '''
-    action = 'pass'
-    for key,value in ACTION_SPACE.items():
-        if value == action_id:
-            action = key
-            break
-    action = action.replace('*','')
+    if not 0 <= action_id < NUM_ACTIONS:
+        return None
+    candidates = action_cards()[action_id]
     for card in card_list:
-       if action in card:
-           return card
+        if card in candidates:
+            return card
     return None
 
 
@@ -157,109 +217,83 @@ def get_legal_action_ids(legal_actions):
     Returns:
         legal_actions (list): a list of legal actions' id
     '''
-    legal_action_id = []
-    if legal_actions:
-        for action in legal_actions:
-            for abstract in SPECIFIC_MAP[action]:
-                action_id = ACTION_SPACE[abstract]
-                if action_id not in legal_action_id:
-                    legal_action_id.append(action_id)
-    return legal_action_id
-
-
-class LocalObjs(threading.local):
-    """
-    本地线程对象，缓存候选卡牌相关数据
-    """
-    def __init__(self):
-        self.cached_candidate_cards = None
-        self.cached_candidate_cards_dict = None
+    if not legal_actions:
+        return []
+    # dict 保持首次出现的顺序并去重
+    return list(dict.fromkeys(
+        action_id for action in legal_actions for action_id in specific_action_ids(action)
+    ))
 
 
-_local_objs = LocalObjs()
+def get_legal_action_mask(legal_actions) -> np.ndarray:
+    '''
+        合法动作掩码：长度为 NUM_ACTIONS 的 bool 向量，第 i 位表示动作ID i 是否合法
+    '''
+    mask = np.zeros(NUM_ACTIONS, dtype=bool)
+    if legal_actions:
+        mask[get_legal_action_ids(legal_actions)] = True
+    return mask
 
 
 def contains_cards(candidate, target):
     """
     判断候选卡牌是否包含目标卡牌
 
-    :param candidate: 候选卡牌列表
-    :param target: 目标卡牌列表
+    :param candidate: 候选卡牌，字符串或 Hand
+    :param target: 目标卡牌，字符串或 Hand
     :return: 如果candidate包含target，返回True；否则返回False
     """
-    if _local_objs.cached_candidate_cards != candidate:
-        # 如果缓存的候选卡牌不同，则重新计算
-        _local_objs.cached_candidate_cards = candidate
-        cards_dict = defaultdict(int)
-        for card in candidate:
-            cards_dict[card] += 1
-        _local_objs.cached_candidate_cards_dict = cards_dict
-    else:
-        # 使用缓存的卡牌字典
-        cards_dict = _local_objs.cached_candidate_cards_dict
-    # 统计目标卡牌的数量
-    target_count = defaultdict(int)
-    for card in target:
-        target_count[card] += 1
-    # 检查每张目标卡牌的数量是否不超过候选卡牌中的数量
-    return all(cards_dict[card] >= count for card, count in target_count.items())
+    return as_hand(candidate).contains(as_hand(target))
 
 
 def get_gt_cards(played_cards, current_hand):
     """
     获取比当前出牌更大的所有可能的卡牌组合
 
-    :param played_cards: 当前已打出的卡牌
-    :param current_hand: 玩家当前手牌的字符串表示
+    :param played_cards: 当前已打出的卡牌，字符串或 Hand
+    :param current_hand: 玩家当前手牌，字符串或 Hand
     :return: 可以比当前出牌更大的卡牌组合列表，包含 'pass'
     """
+    if isinstance(played_cards, Hand):
+        played_cards = str(played_cards)
     if not played_cards or played_cards == "" or played_cards == "pass":
         return playable_cards_from_hand(current_hand)
-    gt_cards = ['pass']
-    target_types = CARD_TYPE[played_cards]
-    type_dict = {}
-    for card_type, weight in target_types:
-        # 将 weight 转换为整数
-        type_dict[card_type] = max(type_dict.get(card_type, -1), int(weight))
-    if 'rocket' in type_dict:
-        # 如果当前出牌是火箭，则不能再出更大的牌
-        return gt_cards
-    type_dict.setdefault('rocket', -1)
-    type_dict.setdefault('bomb', -1)
-    for card_type, weight in type_dict.items():
-        candidates = TYPE_CARD.get(card_type, {})
-        for can_weight, cards_list in candidates.items():
-            if int(can_weight) > int(weight):
-                for cards in cards_list:
-                    if contains_cards(current_hand, cards) and cards not in gt_cards:
-                        gt_cards.append(cards)
-    return gt_cards
-
-def get_bombs_rockets(current_hand: str) -> List[str]:
+    # 由点数张数判断上一手的牌型，再根据手牌计数生成能压过它的出牌
+    move = classify_move(as_hand(played_cards))
+    if move is None:
+        raise KeyError(played_cards)
+    card_type, weight = move
+    return ['pass'] + gen_gt_moves(as_hand(current_hand), card_type, weight)
+
+
+# 合法出牌缓存，每个进程一个实例；未命中时调用 get_gt_cards 计算
+legal_action_cache = LegalActionCache(
+    get_gt_cards,
+    settings.LEGAL_ACTION_CACHE_SIZE,
+    redis_enabled=settings.LEGAL_ACTION_CACHE_REDIS,
+    redis_ttl=settings.LEGAL_ACTION_CACHE_REDIS_TTL,
+)
+
+
+def get_bombs_rockets(current_hand) -> List[str]:
     '''获取手牌中的炸弹和王炸列表
 
     参数:
-        current_hand (str): 手牌字符串。例如: '56888TTQKKKAA222RB'
+        current_hand (str | Hand): 手牌。例如: '56888TTQKKKAA222RB'
 
     返回:
         List[str]: 炸弹和王炸列表。例如: ['KKKK', '2222', 'BR']
     '''
+    current_hand = as_hand(current_hand)
     bombs = []
     # 检查王炸
-    if 'B' in current_hand and 'R' in current_hand:
+    if current_hand.contains(ROCKET):
         bombs.append('BR')
-        
+
     # 检查普通炸弹
-    length = len(current_hand)
-    i = 0
-    while i <= length - 4:
-        # 如果连续4张牌相同，则为炸弹
-        if current_hand[i] == current_hand[i+3]:
-            bombs.append(current_hand[i] * 4)
-            i += 4
-        else:
-            i += 1
-            
+    for index in rank_indexes(current_hand.at_least(4) & NON_JOKER_LANES):
+        bombs.append(CARD_RANK_STR[index] * 4)
+
     return bombs
 
 def get_landlord_score(current_hand):
@@ -291,242 +325,164 @@ def get_landlord_score(current_hand):
         i += 1
     return score
 
-def chain_indexes(indexes_list):
-        ''' 查找单张、对子和三张的顺子
-
-        参数:
-            indexes_list: 具有相同数量的牌的索引列表，数量可以是1, 2或3。
-
-        返回:
-            元组列表: [(start_index1, length1), (start_index1, length1), ...]
-
-        '''
-        chains = []
-        prev_index = -100
-        count = 0
-        start = None
-        for i in indexes_list:
-            if (i[0] >= 12): # '2BR'没有顺子
-                break
-            if (i[0] == prev_index + 1):
-                count += 1
-            else:
-                if (count > 1):
-                    chains.append((start, count))
-                count = 1
-                start = i[0]
-            prev_index = i[0]
-        if (count > 1):
-            chains.append((start, count))
-        return chains
-    
-def pair_attachments(cards_count, chain_start, chain_length, size):
+def pair_attachments(hands, chain_start, chain_length, size):
         ''' 查找三带对和四带二对的对子附件
 
         参数:
-            cards_count: 牌的数量
+            hands: 手牌，字符串或 Hand
             chain_start: 三带或四带的起始牌的索引
             chain_length: 顺子的长度，对于三带对或四带二对为1
             size: 附件对的数量
 
         返回:
-            元组列表: [attachment1, attachment2, ...]
+            元组: (attachment1, attachment2, ...)，结果会被缓存共享，不要修改
                       每个附件有两个元素，
                       第一个包含小于chain_start索引的附加牌的索引，
                       第二个包含大于chain_start索引的附加牌的索引
         '''
-        attachments = set()
-        candidates = []
-        for i, _ in enumerate(cards_count):
-            if (i >= chain_start and i < chain_start + chain_length):
-                continue
-            if (cards_count[i] == 2 or cards_count[i] == 3):
-                candidates.append(i)
-            elif (cards_count[i] == 4):
-                candidates.append(i)
-        for attachment in combinations(candidates, size):
-            if (attachment[-1] == 14 and attachment[-2] == 13):
-                continue
-            i = bisect_left(attachment, chain_start)
-            attachments.add((attachment[:i], attachment[i:]))
-        return list(attachments)
+        return _pair_attachments(_pair_key(as_hand(hands), chain_start, chain_length), chain_start, size)
     
 def solo_attachments(hands, chain_start, chain_length, size):
         ''' 查找三带单和四带二的单牌附件
 
         参数:
-            hands: 手牌
+            hands: 手牌，字符串或 Hand
             chain_start: 三带或四带的起始牌的索引
             chain_length: 顺子的长度，对于三带单或四带二为1
             size: 附件单牌的数量
 
         返回:
-            元组列表: [attachment1, attachment2, ...]
+            元组: (attachment1, attachment2, ...)，结果会被缓存共享，不要修改
                       每个附件有两个元素，
                       第一个包含小于chain_start索引的附加牌的索引，
                       第二个包含大于chain_start索引的附加牌的索引
         '''
-        attachments = set()
-        candidates = []
-        prev_card = None
-        same_card_count = 0
-        for card in hands:
-            # 不计算顺子中的牌
-            if (CARD_RANK_STR_INDEX[card] >= chain_start and CARD_RANK_STR_INDEX[card] < chain_start + chain_length):
-                continue
-            if (card == prev_card):
-                # 附件不能有炸弹
-                if (same_card_count == 3):
-                    continue
-                # 附件不能有与三带连续的3张相同牌（除了3张'222'）
-                elif (same_card_count == 2 and (CARD_RANK_STR_INDEX[card] == chain_start - 1 or CARD_RANK_STR_INDEX[card] == chain_start + chain_length) and card != '2'):
-                    continue
-                else:
-                    same_card_count += 1
-            else:
-                prev_card = card
-                same_card_count = 1
-            candidates.append(CARD_RANK_STR_INDEX[card])
-        for attachment in combinations(candidates, size):
-            if (attachment[-1] == 14 and attachment[-2] == 13):
-                continue
-            i = bisect_left(attachment, chain_start)
-            attachments.add((attachment[:i], attachment[i:]))
-        return list(attachments)
-    
+        return _solo_attachments(_solo_key(as_hand(hands), chain_start, chain_length), chain_start, chain_length, size)
+
+
+# 附件枚举只与去掉主体后的手牌有关，按 (缓存键, 起点, 长度, 附件数) 缓存，
+# 同一手牌中的多个主体以及不同请求中相同的剩余手牌共享同一份结果
+def _pair_key(hand, chain_start, chain_length):
+    '''对子附件的缓存键：不在顺子中、至少两张的点数'''
+    return hand.at_least(2) & ~lanes_between(chain_start, chain_length)
+
+
+def _solo_key(hand, chain_start, chain_length):
+    '''单牌附件的缓存键：去掉顺子中的点数，4 张按 3 张计算（附件不能有炸弹）的位棋盘'''
+    bits = hand.bits - (hand.at_least(4) >> 3)
+    return bits & ~((lanes_between(chain_start, chain_length) >> 3) * MAX_COUNT)
+
+
+@lru_cache(maxsize=settings.ATTACHMENT_CACHE_SIZE)
+def _pair_attachments(pair_key, chain_start, size):
+    return _enumerate(rank_indexes(pair_key), chain_start, size)
+
+
+@lru_cache(maxsize=settings.ATTACHMENT_CACHE_SIZE)
+def _solo_attachments(solo_key, chain_start, chain_length, size):
+    hand = Hand.from_bits(solo_key)
+    candidates = []
+    for index in rank_indexes(hand.at_least(1)):
+        limit = hand.counts[index]
+        # 附件不能有与三带连续的3张相同牌（除了3张'222'）
+        if ((index == chain_start - 1 or index == chain_start + chain_length) and CARD_RANK_STR[index] != '2'):
+            limit = min(limit, 2)
+        candidates.extend([index] * limit)
+    return _enumerate(candidates, chain_start, size)
+
+
+def _enumerate(candidates, chain_start, size):
+    '''从有序候选中选出 size 个附件（不能同时带大小王），按 chain_start 分成前后两部分并去重'''
+    attachments = {}
+    for attachment in combinations(candidates, size):
+        if (attachment[-1] == 14 and attachment[-2] == 13):
+            continue
+        i = bisect_left(attachment, chain_start)
+        attachments[(attachment[:i], attachment[i:])] = None
+    return tuple(attachments)
+
+
+def _attach(body, left, right, copies):
+    '''把附件按点数排在主体前后'''
+    pre_attached = ''.join(CARD_RANK_STR[j] * copies for j in left)
+    post_attached = ''.join(CARD_RANK_STR[j] * copies for j in right)
+    return pre_attached + body + post_attached
+
+
+@lru_cache(maxsize=settings.ATTACHMENT_CACHE_SIZE)
+def _solo_attached_cards(solo_key, body_copies, chain_start, chain_length, size):
+    '''带单牌的出牌字符串，主体为 body_copies 张一组、从 chain_start 开始的 chain_length 个点数'''
+    body = body_str(body_copies, chain_start, chain_length)
+    return tuple(_attach(body, left, right, 1) for left, right in _solo_attachments(solo_key, chain_start, chain_length, size))
+
+
+@lru_cache(maxsize=settings.ATTACHMENT_CACHE_SIZE)
+def _pair_attached_cards(pair_key, body_copies, chain_start, chain_length, size):
+    '''带对子的出牌字符串'''
+    body = body_str(body_copies, chain_start, chain_length)
+    return tuple(_attach(body, left, right, 2) for left, right in _pair_attachments(pair_key, chain_start, size))
+
+
 def playable_cards_from_hand(current_hand):
         ''' 获取手牌中可出的牌
 
+        参数:
+            current_hand: 手牌，字符串或 Hand
+
         返回:
             set: 可出牌的字符串集合
         '''
-        cards_dict = collections.defaultdict(int)
-        for card in current_hand:
-            cards_dict[card] += 1
-        cards_count = np.array([cards_dict[k] for k in CARD_RANK_STR])
+        current_hand = as_hand(current_hand)
         playable_cards = set()
 
-        non_zero_indexes = np.argwhere(cards_count > 0)
-        more_than_1_indexes = np.argwhere(cards_count > 1)
-        more_than_2_indexes = np.argwhere(cards_count > 2)
-        more_than_3_indexes = np.argwhere(cards_count > 3)
+        # 张数至少为 1/2/3/4 的点数掩码
+        solo_mask = current_hand.at_least(1)
+        pair_mask = current_hand.at_least(2)
+        trio_mask = current_hand.at_least(3)
+        bomb_mask = current_hand.at_least(4)
         # 单牌
-        for i in non_zero_indexes:
-            playable_cards.add(CARD_RANK_STR[i[0]])
+        for i in rank_indexes(solo_mask):
+            playable_cards.add(CARD_RANK_STR[i])
         # 对子
-        for i in more_than_1_indexes:
-            playable_cards.add(CARD_RANK_STR[i[0]] * 2)
+        for i in rank_indexes(pair_mask):
+            playable_cards.add(CARD_RANK_STR[i] * 2)
         # 炸弹，四带二单，四带二对
-        for i in more_than_3_indexes:
-            cards = CARD_RANK_STR[i[0]] * 4
+        for i in rank_indexes(bomb_mask):
+            cards = CARD_RANK_STR[i] * 4
             playable_cards.add(cards)
-            for left, right in solo_attachments(current_hand, i[0], 1, 2):
-                pre_attached = ''
-                for j in left:
-                    pre_attached += CARD_RANK_STR[j]
-                post_attached = ''
-                for j in right:
-                    post_attached += CARD_RANK_STR[j]
-                playable_cards.add(pre_attached + cards + post_attached)
-            for left, right in pair_attachments(cards_count, i[0], 1, 2):
-                pre_attached = ''
-                for j in left:
-                    pre_attached += CARD_RANK_STR[j] * 2
-                post_attached = ''
-                for j in right:
-                    post_attached += CARD_RANK_STR[j] * 2
-                playable_cards.add(pre_attached + cards + post_attached)
+            playable_cards.update(_solo_attached_cards(_solo_key(current_hand, i, 1), 4, i, 1, 2))
+            playable_cards.update(_pair_attached_cards(_pair_key(current_hand, i, 1), 4, i, 1, 2))
 
         # 单顺5 -- 单顺12
-        solo_chain_indexes = chain_indexes(non_zero_indexes)
-        for (start_index, length) in solo_chain_indexes:
-            s, l = start_index, length
-            while(l >= 5):
-                cards = ''
-                curr_index = s - 1
-                curr_length = 0
-                while (curr_length < l and curr_length < 12):
-                    curr_index += 1
-                    curr_length += 1
-                    cards += CARD_RANK_STR[curr_index]
-                    if (curr_length >= 5):
-                        playable_cards.add(cards)
-                l -= 1
-                s += 1
+        for length in range(5, 13):
+            for start in rank_indexes(chain_starts(solo_mask, length)):
+                playable_cards.add(body_str(1, start, length))
 
         # 连对3 -- 连对10
-        pair_chain_indexes = chain_indexes(more_than_1_indexes)
-        for (start_index, length) in pair_chain_indexes:
-            s, l = start_index, length
-            while(l >= 3):
-                cards = ''
-                curr_index = s - 1
-                curr_length = 0
-                while (curr_length < l and curr_length < 10):
-                    curr_index += 1
-                    curr_length += 1
-                    cards += CARD_RANK_STR[curr_index] * 2
-                    if (curr_length >= 3):
-                        playable_cards.add(cards)
-                l -= 1
-                s += 1
+        for length in range(3, 11):
+            for start in rank_indexes(chain_starts(pair_mask, length)):
+                playable_cards.add(body_str(2, start, length))
 
         # 三张，三带一，三带二
-        for i in more_than_2_indexes:
-            playable_cards.add(CARD_RANK_STR[i[0]] * 3)
-            for j in non_zero_indexes:
-                if (j < i):
-                    playable_cards.add(CARD_RANK_STR[j[0]] + CARD_RANK_STR[i[0]] * 3)
-                elif (j > i):
-                    playable_cards.add(CARD_RANK_STR[i[0]] * 3 + CARD_RANK_STR[j[0]])
-            for j in more_than_1_indexes:
-                if (j < i):
-                    playable_cards.add(CARD_RANK_STR[j[0]] * 2 + CARD_RANK_STR[i[0]] * 3)
-                elif (j > i):
-                    playable_cards.add(CARD_RANK_STR[i[0]] * 3 + CARD_RANK_STR[j[0]] * 2)
-
-        # 三带一，三带二，三张 -- 三顺2 -- 三顺6; 三带一顺2 -- 三带一顺5; 三带二顺2 -- 三带二顺4
-        trio_chain_indexes = chain_indexes(more_than_2_indexes)
-        for (start_index, length) in trio_chain_indexes:
-            s, l = start_index, length
-            while(l >= 2):
-                cards = ''
-                curr_index = s - 1
-                curr_length = 0
-                while (curr_length < l and curr_length < 6):
-                    curr_index += 1
-                    curr_length += 1
-                    cards += CARD_RANK_STR[curr_index] * 3
-
-                    # 三顺2到三顺6
-                    if (curr_length >= 2 and curr_length <= 6):
-                        playable_cards.add(cards)
-
-                    # 三带一顺2到三带一顺5
-                    if (curr_length >= 2 and curr_length <= 5):
-                        for left, right in solo_attachments(current_hand, s, curr_length, curr_length):
-                            pre_attached = ''
-                            for j in left:
-                                pre_attached += CARD_RANK_STR[j]
-                            post_attached = ''
-                            for j in right:
-                                post_attached += CARD_RANK_STR[j]
-                            playable_cards.add(pre_attached + cards + post_attached)
-
-                    # 三带二顺2 -- 三带二顺4
-                    if (curr_length >= 2 and curr_length <= 4):
-                        for left, right in pair_attachments(cards_count, s, curr_length, curr_length):
-                            pre_attached = ''
-                            for j in left:
-                                pre_attached += CARD_RANK_STR[j] * 2
-                            post_attached = ''
-                            for j in right:
-                                post_attached += CARD_RANK_STR[j] * 2
-                            playable_cards.add(pre_attached + cards + post_attached)
-                l -= 1
-                s += 1
+        for i in rank_indexes(trio_mask):
+            cards = CARD_RANK_STR[i] * 3
+            playable_cards.add(cards)
+            for j in rank_indexes(solo_mask & ~RANK_LANE[i]):
+                playable_cards.add(_attach(cards, (j,) if j < i else (), (j,) if j > i else (), 1))
+            for j in rank_indexes(pair_mask & ~RANK_LANE[i]):
+                playable_cards.add(_attach(cards, (j,) if j < i else (), (j,) if j > i else (), 2))
+
+        # 三顺2 -- 三顺6; 三带一顺2 -- 三带一顺5; 三带二顺2 -- 三带二顺4
+        for length in range(2, 7):
+            for start in rank_indexes(chain_starts(trio_mask, length)):
+                cards = body_str(3, start, length)
+                playable_cards.add(cards)
+                if length <= 5:
+                    playable_cards.update(_solo_attached_cards(_solo_key(current_hand, start, length), 3, start, length, length))
+                if length <= 4:
+                    playable_cards.update(_pair_attached_cards(_pair_key(current_hand, start, length), 3, start, length, length))
         # 火箭
-        if (cards_count[13] and cards_count[14]):
+        if current_hand.contains(ROCKET):
             playable_cards.add(CARD_RANK_STR[13] + CARD_RANK_STR[14])
         return playable_cards
     
@@ -545,16 +501,18 @@ class DataTransformer:
 
         last_playable = predict_model_data.playables[-1].cards if predict_model_data.playables and predict_model_data.playables[-1].cards else "pass"
         
+        # 手牌只在这里解析一次，后续计算都使用 Hand
+        current_hand = as_hand(predict_model_data.current_hand)
         if not predict_model_data.playables or predict_model_data.playables[-1].seat == predict_model_data.self_seat or last_playable == "pass":
-            legal_actions = list(playable_cards_from_hand(predict_model_data.current_hand))
+            legal_actions = legal_action_cache.get(current_hand, "pass")
         else:
-            legal_actions = get_gt_cards(last_playable, predict_model_data.current_hand)
+            legal_actions = legal_action_cache.get(current_hand, last_playable)
         
         result['legal_actions'] = [DataTransformer.cards_to_nums(action) for action in legal_actions]
         
-        result['other_hand_cards'] = DataTransformer.calculate_other_hand_cards(predict_model_data, result)
+        result['other_hand_cards'] = DataTransformer.calculate_other_hand_cards(predict_model_data, result, current_hand)
         # 处理玩家手牌
-        player_hand_cards = DataTransformer.cards_to_nums(predict_model_data.current_hand)
+        player_hand_cards = DataTransformer.cards_to_nums(current_hand)
         result['player_hand_cards'] = player_hand_cards
 
         # 初始化各玩家剩余手牌数量
@@ -673,43 +631,37 @@ class DataTransformer:
         return result
 
     @staticmethod
-    def cards_to_nums(cards_str: str) -> List[int]:
+    def cards_to_nums(cards) -> List[int]:
         """
-        将卡牌字符串转换为数字列表
+        将卡牌字符串或 Hand 转换为数字列表
         """
-        if cards_str == "pass":
+        if isinstance(cards, Hand):
+            nums = []
+            for card, count in zip(CARD_RANK_STR, cards.counts):
+                nums.extend([CARD_MAP[card]] * count)
+            return nums
+        if cards == "pass":
             return []
-        return [CARD_MAP[card] for card in cards_str]
+        return [CARD_MAP[card] for card in cards]
     
     @staticmethod
-    def calculate_other_hand_cards(predict_model_data: PredictPutCardModel, result: Dict) -> List[int]:
-        all_cards = ['5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K', 'A', '2', 'B', 'R']
-        full_deck = []
-        for card in all_cards:
-            count = 4  # Normal cards have 4
-            if card in ['B', 'R']:
-                count = 1  # Jokers have 1
-            full_deck.extend([CARD_MAP[card]] * count)
-
-        # Create a Counter for the full deck
-        full_deck_counter = Counter(full_deck)
+    def calculate_other_hand_cards(predict_model_data: PredictPutCardModel, result: Dict, current_hand=None) -> List[int]:
+        # 二人斗地主去掉了3和4，普通牌各4张，大小王各1张
+        full_deck = Hand([0, 0] + [4] * 11 + [1, 1])
+        remaining = list(full_deck.counts)
 
-        # Extract and convert current hand to numbers
-        current_hand_numbers = DataTransformer.cards_to_nums(predict_model_data.current_hand)
-        current_hand_counter = Counter(current_hand_numbers)
-
-        # Subtract hand cards from the full deck
-        full_deck_counter -= current_hand_counter
+        # 从整副牌中减去手牌
+        if current_hand is None:
+            current_hand = predict_model_data.current_hand
+        hand_counts = as_hand(current_hand).counts
+        remaining = [max(0, left - used) for left, used in zip(remaining, hand_counts)]
 
         # Loop through playables and remove played cards
         for playable in predict_model_data.playables:
-            played_cards_numbers = DataTransformer.cards_to_nums(playable.cards)
-            played_cards_counter = Counter(played_cards_numbers)
-            full_deck_counter -= played_cards_counter
-
-        # The remaining cards in the full_deck_counter 
-        # are the ones that have not appeared yet
-        other_hand_cards = list(full_deck_counter.elements())
-        return other_hand_cards
+            played_counts = as_hand(playable.cards).counts
+            remaining = [max(0, left - used) for left, used in zip(remaining, played_counts)]
+
+        # The remaining cards are the ones that have not appeared yet
+        return DataTransformer.cards_to_nums(Hand(remaining))
 
 
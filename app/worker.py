@@ -0,0 +1,147 @@
+"""
+AI 出牌请求的独立 worker
+
+从 Redis 的 REQ 队列取出 pk_status == 2 的请求，调用 PklordAI 出牌并写回结果。
+每个进程运行多个并发消费者协程，进程之间互不影响；收到 SIGTERM/SIGINT 后
+不再领取新请求，处理完手上的请求再退出。
+
+用法:
+    python -m app.worker --processes 2 --consumers 8
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+
+from app.core.config import settings
+from app.core.metrics import push_snapshot
+from app.db.redis import Redis, connect_to_redis, close_redis_connection
+from app.models.play import PredictPutCardModel
+from app.services.ai_queue_service import AIQueueService
+from app.services.result_service import ResultService
+from app.utils.pklord_ai import PklordAI
+
+
+async def handle_request(redis_client, raw: str) -> None:
+    """处理一条请求并写回结果；请求本身有问题时写回 500，不再重试"""
+    request_id = ""
+    try:
+        request_data = json.loads(raw)
+        request_id = request_data.get("request_id", "")
+        request = PredictPutCardModel.from_dict(request_data.get("data", {}))
+        playable = await PklordAI.play_cards(request)
+        result = {"code": 200, "msg": "success", "data": playable}
+    except Exception as e:
+        print(f"处理请求异常: {e}")
+        result = {"code": 500, "msg": f"请求处理失败: {e}", "data": None}
+    if request_id:
+        await ResultService(redis_client).publish(request_id, result)
+
+
+async def consume(queue: AIQueueService, stop: asyncio.Event, stats: dict) -> None:
+    """消费者协程：领取、处理、确认，直到收到停止信号"""
+    while not stop.is_set():
+        try:
+            raw = await queue.claim(timeout=1)
+            if raw is None:
+                continue
+            await handle_request(queue.redis, raw)
+            await queue.ack(raw)
+            stats["processed"] += 1
+        except Exception as e:
+            # Redis 暂时不可用等情况，稍后重试；未确认的请求会被 reaper 放回队列
+            print(f"[worker {os.getpid()}] consume error: {e}")
+            await asyncio.sleep(1)
+
+
+async def reap_forever(queue: AIQueueService, stop: asyncio.Event) -> None:
+    """定期把超时未确认的请求放回队列（多个进程同时执行也是安全的）"""
+    while not stop.is_set():
+        try:
+            requeued = await queue.reap()
+            if requeued:
+                print(f"[worker {os.getpid()}] requeued {requeued} stale requests")
+        except Exception as e:
+            print(f"[worker {os.getpid()}] reap error: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.AI_QUEUE_REAPER_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def push_metrics_forever(redis_client, stop: asyncio.Event) -> None:
+    """定期上报本进程的指标快照（PklordAI 上游耗时等），退出前再上报一次"""
+    while True:
+        try:
+            await push_snapshot(redis_client, "worker")
+        except Exception as e:
+            print(f"[worker {os.getpid()}] push metrics error: {e}")
+        if stop.is_set():
+            return
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.METRICS_PUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_consumers(consumers: int) -> None:
+    """在当前进程中运行 consumers 个消费者和一个 reaper"""
+    stop = asyncio.Event()
+    loop = asyncio.get_event_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    await connect_to_redis()
+    await PklordAI.init_client()
+    queue = AIQueueService(Redis.client)
+    stats = {"processed": 0}
+    print(f"[worker {os.getpid()}] started with {consumers} consumers")
+    try:
+        await asyncio.gather(
+            reap_forever(queue, stop),
+            push_metrics_forever(Redis.client, stop),
+            *[consume(queue, stop, stats) for _ in range(consumers)]
+        )
+    finally:
+        await PklordAI.close_client()
+        await close_redis_connection()
+        print(f"[worker {os.getpid()}] stopped, processed {stats['processed']} requests")
+
+
+def worker_main(consumers: int) -> None:
+    asyncio.run(run_consumers(consumers))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AI request queue worker")
+    parser.add_argument("--processes", type=int, default=settings.AI_WORKER_PROCESSES)
+    parser.add_argument("--consumers", type=int, default=settings.AI_WORKER_CONSUMERS, help="每个进程的并发消费者数")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        worker_main(args.consumers)
+        return
+
+    processes = [
+        multiprocessing.Process(target=worker_main, args=(args.consumers,), daemon=False)
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        # 把停止信号转发给子进程，由子进程各自优雅退出
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+访问日志中间件开销基准
+
+在一个只有两个空接口的 FastAPI 应用上，分别测量无中间件、原来的 print 中间件
+（读取并打印整个请求体）和 AccessLogMiddleware（全量记录 / 按 1% 采样）每个请求的平均耗时。
+请求通过 httpx 的 ASGITransport 直接调用应用，不经过网络；日志输出到 /dev/null。
+
+用法:
+    python -m scripts.bench_access_log --requests 5000 --rounds 5 --body-bytes 2048
+"""
+import argparse
+import asyncio
+from datetime import datetime
+import os
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+
+from app.core import access_log
+from app.core.access_log import AccessLogMiddleware, start_access_log, stop_access_log
+from app.core.config import settings
+
+
+def build_app(middleware: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"code": 200}
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        data = await request.json()
+        return {"code": 200, "size": len(data["cards"])}
+
+    if middleware == "print":
+        @app.middleware("http")
+        async def log_requests(request: Request, call_next):
+            # 原实现
+            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+            request_body = await request.body()
+            print(f"{current_time} - {request.method} {request.url.path} - Body: {request_body.decode('utf-8')}")
+            return await call_next(request)
+    elif middleware == "access_log":
+        app.add_middleware(AccessLogMiddleware)
+    return app
+
+
+async def run(app: FastAPI, requests: int, body: dict) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):
+            await client.get("/ping")
+        start = time.perf_counter()
+        for i in range(requests):
+            if i % 2:
+                await client.post("/echo", json=body)
+            else:
+                await client.get("/ping")
+        return (time.perf_counter() - start) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--body-bytes", type=int, default=2048)
+    args = parser.parse_args()
+
+    body = {"password": "secret", "cards": "3" * args.body_bytes}
+    devnull = open(os.devnull, "w")
+    real_stdout = sys.stdout
+    start_access_log(stream=devnull)
+    settings.ACCESS_LOG_BODY_ROUTES = ["/echo"]
+
+    cases = [
+        ("none", "none", 1.0),
+        ("print", "print", 1.0),
+        ("access_log", "access_log", 1.0),
+        ("access_log 1%", "access_log", 0.01),
+    ]
+    apps = {name: build_app(middleware) for name, middleware, _ in cases}
+    # 各方案轮流执行多轮，取每个方案最快的一轮，减少机器抖动的影响
+    best = {name: float("inf") for name, _, _ in cases}
+    for _ in range(args.rounds):
+        for name, _, rate in cases:
+            settings.ACCESS_LOG_SAMPLE_RATE = rate
+            sys.stdout = devnull
+            try:
+                per_request = asyncio.run(run(apps[name], args.requests, body))
+            finally:
+                sys.stdout = real_stdout
+            best[name] = min(best[name], per_request)
+    stop_access_log()
+
+    baseline = best["none"]
+    print(f"requests: {args.requests} x {args.rounds} rounds, body: {args.body_bytes} bytes (every other request)")
+    print(f'{"middleware":<16}{"us/request":>12}{"overhead(us)":>14}')
+    for name, _, _ in cases:
+        print(f"{name:<16}{best[name]:>12.1f}{best[name] - baseline:>14.1f}")
+    print(f"dropped log lines: {access_log.dropped_count()}")
+
+
+if __name__ == "__main__":
+    main()
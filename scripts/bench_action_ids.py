@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+动作ID映射基准：线性扫描 vs 预先计算的映射
+
+    get_legal_action_ids        原实现对结果列表做 `not in` 判断（平方复杂度）
+    get_card_str_by_action_id   原实现线性扫描 ACTION_SPACE 找动作名，再在候选出牌中做子串匹配
+
+对每个局面的每个合法动作ID调用一次 get_card_str_by_action_id（模型选出动作后反查出牌的场景），
+并统计原实现的子串匹配与精确映射结果不同的次数（例如动作 '33' 被匹配到 '333'）。
+
+用法:
+    python -m scripts.bench_action_ids
+"""
+import timeit
+
+from app.utils.utils import (
+    ACTION_SPACE,
+    SPECIFIC_MAP,
+    get_card_str_by_action_id,
+    get_gt_cards,
+    get_legal_action_ids,
+    get_legal_action_mask,
+)
+
+CASES = [
+    ('3345556777899TJQKKA2', 'pass'),
+    ('333444555666777888BR', 'pass'),
+    ('3345556777899TJQKKA2', '3'),
+    ('3333444455556666KKAA', '33344456'),
+    ('34567TJQ2', '9'),
+]
+
+
+def legal_action_ids_by_list(legal_actions):
+    legal_action_id = []
+    if legal_actions:
+        for action in legal_actions:
+            for abstract in SPECIFIC_MAP[action]:
+                action_id = ACTION_SPACE[abstract]
+                if action_id not in legal_action_id:
+                    legal_action_id.append(action_id)
+    return legal_action_id
+
+
+def card_str_by_scan(action_id, card_list):
+    action = 'pass'
+    for key, value in ACTION_SPACE.items():
+        if value == action_id:
+            action = key
+            break
+    action = action.replace('*', '')
+    for card in card_list:
+        if action in card:
+            return card
+    return None
+
+
+def bench(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    print(f'{"hand":<22}{"played":<10}{"moves":>6}{"op":>10}{"old(us)":>10}{"new(us)":>10}{"speedup":>9}')
+    for hand, played in CASES:
+        legal = sorted(get_gt_cards(played, hand))
+        ids = get_legal_action_ids(legal)
+        assert ids == legal_action_ids_by_list(legal)
+        assert sorted(ids) == get_legal_action_mask(legal).nonzero()[0].tolist()
+        changed = sum(card_str_by_scan(i, legal) != get_card_str_by_action_id(i, legal) for i in ids)
+
+        rows = [
+            ('ids', bench(lambda: legal_action_ids_by_list(legal), 20), bench(lambda: get_legal_action_ids(legal), 20)),
+            ('mask', bench(lambda: legal_action_ids_by_list(legal), 20), bench(lambda: get_legal_action_mask(legal), 20)),
+            ('card_str', bench(lambda: [card_str_by_scan(i, legal) for i in ids], 5) / len(ids),
+             bench(lambda: [get_card_str_by_action_id(i, legal) for i in ids], 5) / len(ids)),
+        ]
+        for op, old_us, new_us in rows:
+            print(f'{hand:<22}{played:<10}{len(legal):>6}{op:>10}{old_us:>10.1f}{new_us:>10.1f}{old_us / new_us:>8.1f}x')
+        print(f'{"":<38}card_str results changed by exact mapping: {changed}/{len(ids)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+AI worker 吞吐量基准（需要本地 Redis）
+
+启动桩 AI 服务（模拟上游延迟）和 app.worker，向 REQ 队列写入一批请求，
+统计全部结果写回所需时间。依次测试不同的 进程数 x 消费者数 组合，
+1x1 相当于原先调度器里单个 brpop 循环的处理能力。
+
+会清空 --redis-url 指向的数据库中的队列键，请使用单独的库，例如 /15。
+
+用法:
+    python -m scripts.bench_ai_worker --redis-url redis://127.0.0.1:6379/15 --requests 500 --delay 0.05
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+import aioredis
+
+from app.services.ai_queue_service import AIQueueService, CLAIMS_KEY, PROCESSING_KEY, QUEUE_KEY
+
+STUB_PORT = 8599
+SAMPLE_REQUEST = {
+    "init_card": "3445566778899TTJQKA2",
+    "current_hand": "3445566778899TTJQKA2",
+    "opponent_hands": "",
+    "fundcards": "",
+    "other_hands": "",
+    "current_multiplier": 1,
+    "self_seat": 0,
+    "landlord_seat": 0,
+    "pk_status": 2,
+    "self_win_card_num": 0,
+    "oppo_win_card_num": 0,
+    "playables": [],
+}
+
+
+async def run_round(redis_url: str, processes: int, consumers: int, count: int) -> float:
+    redis_client = await aioredis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+    await redis_client.delete(QUEUE_KEY, PROCESSING_KEY, CLAIMS_KEY)
+    request_ids = [f"bench:{uuid.uuid4()}" for _ in range(count)]
+
+    env = dict(os.environ, REDIS_URL=redis_url, PKLORD_AI_BASE_URL=f"http://127.0.0.1:{STUB_PORT}/ai-poker",
+               PKLORD_AI_MAX_CONCURRENCY=str(consumers))
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "app.worker", "--processes", str(processes), "--consumers", str(consumers)],
+        env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        await asyncio.sleep(2)  # 等待 worker 启动
+        queue = AIQueueService(redis_client)
+        start = time.perf_counter()
+        for request_id in request_ids:
+            await queue.enqueue(request_id, SAMPLE_REQUEST)
+        while True:
+            done = await redis_client.exists(*request_ids)
+            if done == count:
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+    finally:
+        worker.terminate()
+        worker.wait()
+        await redis_client.delete(*request_ids)
+        await redis_client.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url", default="redis://127.0.0.1:6379/15")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.05, help="桩 AI 服务的单次延迟（秒）")
+    args = parser.parse_args()
+
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "scripts.pklord_stub_server", "--port", str(STUB_PORT), "--delay", str(args.delay)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        time.sleep(2)
+        print(f"requests: {args.requests}, upstream delay: {args.delay * 1000:.0f}ms")
+        print(f'{"processes x consumers":<24}{"seconds":>10}{"req/s":>10}')
+        for processes, consumers in [(1, 1), (1, 8), (2, 8), (4, 16)]:
+            elapsed = asyncio.run(run_round(args.redis_url, processes, consumers, args.requests))
+            print(f'{f"{processes} x {consumers}":<24}{elapsed:>10.2f}{args.requests / elapsed:>10.1f}')
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+附件枚举缓存基准：playable_cards_from_hand 在附件较多的手牌上的耗时
+
+    old    原实现：每个主体都对展开后的候选点数做 itertools.combinations 再去重，逐个拼接字符串
+    cold   缓存实现，每次调用前清空缓存（全新局面）
+    warm   缓存实现，缓存已命中（同一手牌或去掉主体后相同的手牌再次出现）
+
+用法:
+    python -m scripts.bench_attachments
+"""
+from bisect import bisect_left
+from itertools import combinations
+import timeit
+
+from app.utils import utils
+from app.utils.hand import Hand, chain_starts, lanes_between, rank_indexes
+from app.utils.move_gen import ROCKET, body_str
+from app.utils.utils import CARD_RANK_STR
+
+# 三顺、多个炸弹、满手三张等附件组合最多的手牌
+HANDS = [
+    '333444555666777888BR',
+    '3333444455556666KKAA',
+    '33344455566677789TJQ',
+    '3334445556667772222B',
+    '33344455566TTTJJJQQQ',
+]
+
+CACHES = [utils._solo_attachments, utils._pair_attachments, utils._solo_attached_cards, utils._pair_attached_cards]
+
+
+def pair_attachments_old(hand, chain_start, chain_length, size):
+    attachments = set()
+    candidates = rank_indexes(hand.at_least(2) & ~lanes_between(chain_start, chain_length))
+    for attachment in combinations(candidates, size):
+        if attachment[-1] == 14 and attachment[-2] == 13:
+            continue
+        i = bisect_left(attachment, chain_start)
+        attachments.add((attachment[:i], attachment[i:]))
+    return list(attachments)
+
+
+def solo_attachments_old(hand, chain_start, chain_length, size):
+    attachments = set()
+    candidates = []
+    for index in rank_indexes(hand.at_least(1) & ~lanes_between(chain_start, chain_length)):
+        limit = min(hand.counts[index], 3)
+        if (index == chain_start - 1 or index == chain_start + chain_length) and CARD_RANK_STR[index] != '2':
+            limit = min(limit, 2)
+        candidates.extend([index] * limit)
+    for attachment in combinations(candidates, size):
+        if attachment[-1] == 14 and attachment[-2] == 13:
+            continue
+        i = bisect_left(attachment, chain_start)
+        attachments.add((attachment[:i], attachment[i:]))
+    return list(attachments)
+
+
+def _attach(body, left, right, copies):
+    return (''.join(CARD_RANK_STR[j] * copies for j in left) + body
+            + ''.join(CARD_RANK_STR[j] * copies for j in right))
+
+
+def playable_cards_old(hand: Hand) -> set:
+    '''缓存前的 playable_cards_from_hand'''
+    playable_cards = set()
+    solo_mask, pair_mask, trio_mask, bomb_mask = (hand.at_least(n) for n in (1, 2, 3, 4))
+    for i in rank_indexes(solo_mask):
+        playable_cards.add(CARD_RANK_STR[i])
+    for i in rank_indexes(pair_mask):
+        playable_cards.add(CARD_RANK_STR[i] * 2)
+    for i in rank_indexes(bomb_mask):
+        cards = CARD_RANK_STR[i] * 4
+        playable_cards.add(cards)
+        for left, right in solo_attachments_old(hand, i, 1, 2):
+            playable_cards.add(_attach(cards, left, right, 1))
+        for left, right in pair_attachments_old(hand, i, 1, 2):
+            playable_cards.add(_attach(cards, left, right, 2))
+    for length in range(5, 13):
+        for start in rank_indexes(chain_starts(solo_mask, length)):
+            playable_cards.add(body_str(1, start, length))
+    for length in range(3, 11):
+        for start in rank_indexes(chain_starts(pair_mask, length)):
+            playable_cards.add(body_str(2, start, length))
+    for i in rank_indexes(trio_mask):
+        cards = CARD_RANK_STR[i] * 3
+        playable_cards.add(cards)
+        for j in rank_indexes(solo_mask):
+            if j != i:
+                playable_cards.add(_attach(cards, (j,) if j < i else (), (j,) if j > i else (), 1))
+        for j in rank_indexes(pair_mask):
+            if j != i:
+                playable_cards.add(_attach(cards, (j,) if j < i else (), (j,) if j > i else (), 2))
+    for length in range(2, 7):
+        for start in rank_indexes(chain_starts(trio_mask, length)):
+            cards = body_str(3, start, length)
+            playable_cards.add(cards)
+            if length <= 5:
+                for left, right in solo_attachments_old(hand, start, length, length):
+                    playable_cards.add(_attach(cards, left, right, 1))
+            if length <= 4:
+                for left, right in pair_attachments_old(hand, start, length, length):
+                    playable_cards.add(_attach(cards, left, right, 2))
+    if hand.contains(ROCKET):
+        playable_cards.add('BR')
+    return playable_cards
+
+
+def clear_caches():
+    for cache in CACHES:
+        cache.cache_clear()
+
+
+def bench(func, number: int, setup=None) -> float:
+    def run():
+        if setup:
+            setup()
+        func()
+    return min(timeit.repeat(run, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    print(f'{"hand":<22}{"moves":>7}{"old(us)":>10}{"cold(us)":>10}{"warm(us)":>10}{"warm speedup":>14}')
+    for cards in HANDS:
+        hand = Hand.from_str(cards)
+        expected = playable_cards_old(hand)
+        assert utils.playable_cards_from_hand(hand) == expected
+        old_us = bench(lambda: playable_cards_old(hand), 10)
+        cold_us = bench(lambda: utils.playable_cards_from_hand(hand), 10, setup=clear_caches)
+        utils.playable_cards_from_hand(hand)
+        warm_us = bench(lambda: utils.playable_cards_from_hand(hand), 10)
+        print(f'{cards:<22}{len(expected):>7}{old_us:>10.0f}{cold_us:>10.0f}{warm_us:>10.0f}{old_us / warm_us:>13.1f}x')
+    for cache in CACHES:
+        print(f'{cache.__name__}: {cache.cache_info()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+向量化"压过"索引基准：逐个手牌调用 get_gt_cards / get_legal_action_ids vs BeatsIndex 批量计算
+
+手牌为固定种子的随机手牌，需要压过的牌从 CARD_TYPE 中随机选取，其中 --free-play 比例为自由出牌。
+逐个计算不经过合法出牌缓存。
+
+用法:
+    python -m scripts.bench_beats_index --batches 1 64 4096 --free-play 0.1
+"""
+import argparse
+import random
+import time
+
+from app.utils.beats_index import get_beats_index
+from app.utils.hand import Hand
+from app.utils.utils import CARD_TYPE, get_gt_cards, get_legal_action_ids
+
+
+def random_cases(count: int, free_play: float, seed: int = 20240601):
+    rng = random.Random(seed)
+    deck = [card for card in '3456789TJQKA2' for _ in range(4)] + ['B', 'R']
+    moves = list(CARD_TYPE.keys())
+    hands = [Hand.from_str(''.join(rng.sample(deck, rng.randint(1, 20)))) for _ in range(count)]
+    played = ['pass' if rng.random() < free_play else rng.choice(moves) for _ in range(count)]
+    return hands, played
+
+
+def timed(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 64, 4096])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--free-play', type=float, default=0.1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = get_beats_index()
+    print(f'index: {len(index)} rows, built in {(time.perf_counter() - start) * 1000:.0f} ms')
+    print(f'{"batch":>6}{"op":>12}{"loop(us/hand)":>16}{"index(us/hand)":>16}{"speedup":>10}')
+    for batch in args.batches:
+        hands, played = random_cases(batch, args.free_play)
+
+        def loop_gt():
+            return [get_gt_cards(move, hand) for hand, move in zip(hands, played)]
+
+        def loop_ids():
+            return [get_legal_action_ids(get_gt_cards(move, hand)) for hand, move in zip(hands, played)]
+
+        expected = loop_gt()
+        assert [sorted(moves) for moves in index.gt_cards(hands, played)] == [sorted(moves) for moves in expected]
+        assert index.legal_action_ids(hands, played) == [sorted(get_legal_action_ids(moves)) for moves in expected]
+
+        for op, loop, batched in (
+            ('gt_cards', loop_gt, lambda: index.gt_cards(hands, played)),
+            ('action_ids', loop_ids, lambda: index.legal_action_ids(hands, played)),
+        ):
+            loop_us = timed(loop, args.repeat) / batch * 1e6
+            index_us = timed(batched, args.repeat) / batch * 1e6
+            print(f'{batch:>6}{op:>12}{loop_us:>16.1f}{index_us:>16.1f}{loop_us / index_us:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+位棋盘基准：原来的计数元组 + NumPy 实现 vs Hand.bits 上的整数运算
+
+比较三组操作：
+    contains   手牌是否包含出牌（原实现逐个点数比较计数）
+    remove     从手牌中移除出牌（原实现逐个点数相减）
+    playable   playable_cards_from_hand（原实现对 15 个元素的数组调用 np.argwhere）
+
+用法:
+    python -m scripts.bench_bitboard
+"""
+from bisect import bisect_left
+from itertools import combinations
+import timeit
+
+import numpy as np
+
+from app.utils.hand import Hand
+from app.utils.utils import CARD_RANK_STR, playable_cards_from_hand
+
+HANDS = [
+    '3345556777899TJQKKA2',       # 20张地主手牌
+    '333444555666777888BR',       # 飞机
+    '3333444455556666KKAA',       # 多个炸弹
+    '34567TJQ2',                  # 农民残局
+]
+
+MOVES = ['3', '55', '777', '34567', '33344455', 'KKKK', 'BR']
+
+
+def contains_by_counts(hand: Hand, move: Hand) -> bool:
+    return all(have >= need for have, need in zip(hand.counts, move.counts))
+
+
+def remove_by_counts(hand: Hand, move: Hand) -> Hand:
+    counts = tuple(have - need for have, need in zip(hand.counts, move.counts))
+    if min(counts) < 0:
+        raise ValueError
+    return Hand(counts)
+
+
+# 以下为原实现，保留作为基准
+def chain_indexes(indexes_list):
+    chains = []
+    prev_index = -100
+    count = 0
+    start = None
+    for i in indexes_list:
+        if (i[0] >= 12):
+            break
+        if (i[0] == prev_index + 1):
+            count += 1
+        else:
+            if (count > 1):
+                chains.append((start, count))
+            count = 1
+            start = i[0]
+        prev_index = i[0]
+    if (count > 1):
+        chains.append((start, count))
+    return chains
+
+
+def pair_attachments(cards_count, chain_start, chain_length, size):
+    attachments = set()
+    candidates = []
+    for i, _ in enumerate(cards_count):
+        if (i >= chain_start and i < chain_start + chain_length):
+            continue
+        if (cards_count[i] == 2 or cards_count[i] == 3):
+            candidates.append(i)
+        elif (cards_count[i] == 4):
+            candidates.append(i)
+    for attachment in combinations(candidates, size):
+        if (attachment[-1] == 14 and attachment[-2] == 13):
+            continue
+        i = bisect_left(attachment, chain_start)
+        attachments.add((attachment[:i], attachment[i:]))
+    return list(attachments)
+
+
+def solo_attachments(hand, chain_start, chain_length, size):
+    attachments = set()
+    candidates = []
+    for index, count in enumerate(hand.counts):
+        if (index >= chain_start and index < chain_start + chain_length):
+            continue
+        limit = min(count, 3)
+        if ((index == chain_start - 1 or index == chain_start + chain_length) and CARD_RANK_STR[index] != '2'):
+            limit = min(limit, 2)
+        candidates.extend([index] * limit)
+    for attachment in combinations(candidates, size):
+        if (attachment[-1] == 14 and attachment[-2] == 13):
+            continue
+        i = bisect_left(attachment, chain_start)
+        attachments.add((attachment[:i], attachment[i:]))
+    return list(attachments)
+
+
+def _attached(cards, left, right, copies):
+    return (''.join(CARD_RANK_STR[j] * copies for j in left) + cards
+            + ''.join(CARD_RANK_STR[j] * copies for j in right))
+
+
+def playable_by_numpy(current_hand: Hand) -> set:
+    cards_count = np.array(current_hand.counts)
+    playable_cards = set()
+    non_zero_indexes = np.argwhere(cards_count > 0)
+    more_than_1_indexes = np.argwhere(cards_count > 1)
+    more_than_2_indexes = np.argwhere(cards_count > 2)
+    more_than_3_indexes = np.argwhere(cards_count > 3)
+    for i in non_zero_indexes:
+        playable_cards.add(CARD_RANK_STR[i[0]])
+    for i in more_than_1_indexes:
+        playable_cards.add(CARD_RANK_STR[i[0]] * 2)
+    for i in more_than_3_indexes:
+        cards = CARD_RANK_STR[i[0]] * 4
+        playable_cards.add(cards)
+        for left, right in solo_attachments(current_hand, i[0], 1, 2):
+            playable_cards.add(_attached(cards, left, right, 1))
+        for left, right in pair_attachments(cards_count, i[0], 1, 2):
+            playable_cards.add(_attached(cards, left, right, 2))
+    for copies, min_length, max_length, indexes in (
+        (1, 5, 12, non_zero_indexes),
+        (2, 3, 10, more_than_1_indexes),
+    ):
+        for (s, l) in chain_indexes(indexes):
+            while l >= min_length:
+                cards = ''
+                for curr_length in range(1, min(l, max_length) + 1):
+                    cards += CARD_RANK_STR[s + curr_length - 1] * copies
+                    if curr_length >= min_length:
+                        playable_cards.add(cards)
+                l -= 1
+                s += 1
+    for i in more_than_2_indexes:
+        playable_cards.add(CARD_RANK_STR[i[0]] * 3)
+        for j in non_zero_indexes:
+            if (j < i):
+                playable_cards.add(CARD_RANK_STR[j[0]] + CARD_RANK_STR[i[0]] * 3)
+            elif (j > i):
+                playable_cards.add(CARD_RANK_STR[i[0]] * 3 + CARD_RANK_STR[j[0]])
+        for j in more_than_1_indexes:
+            if (j < i):
+                playable_cards.add(CARD_RANK_STR[j[0]] * 2 + CARD_RANK_STR[i[0]] * 3)
+            elif (j > i):
+                playable_cards.add(CARD_RANK_STR[i[0]] * 3 + CARD_RANK_STR[j[0]] * 2)
+    for (s, l) in chain_indexes(more_than_2_indexes):
+        while l >= 2:
+            cards = ''
+            for curr_length in range(1, min(l, 6) + 1):
+                cards += CARD_RANK_STR[s + curr_length - 1] * 3
+                if curr_length >= 2:
+                    playable_cards.add(cards)
+                if 2 <= curr_length <= 5:
+                    for left, right in solo_attachments(current_hand, s, curr_length, curr_length):
+                        playable_cards.add(_attached(cards, left, right, 1))
+                if 2 <= curr_length <= 4:
+                    for left, right in pair_attachments(cards_count, s, curr_length, curr_length):
+                        playable_cards.add(_attached(cards, left, right, 2))
+            l -= 1
+            s += 1
+    if (cards_count[13] and cards_count[14]):
+        playable_cards.add(CARD_RANK_STR[13] + CARD_RANK_STR[14])
+    return playable_cards
+
+
+def bench(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def row(name: str, old_us: float, new_us: float) -> None:
+    print(f'{name:<34}{old_us:>12.3f}{new_us:>12.3f}{old_us / new_us:>9.1f}x')
+
+
+def main() -> None:
+    hands = [Hand.from_str(cards) for cards in HANDS]
+    moves = [Hand.from_str(cards) for cards in MOVES]
+    print(f'{"case":<34}{"old(us)":>12}{"bitboard(us)":>12}{"speedup":>10}')
+
+    pairs = [(hand, move) for hand in hands for move in moves]
+    for hand, move in pairs:
+        assert contains_by_counts(hand, move) == hand.contains(move)
+    row('contains (per call)',
+        bench(lambda: [contains_by_counts(hand, move) for hand, move in pairs], 2000) / len(pairs),
+        bench(lambda: [hand.contains(move) for hand, move in pairs], 2000) / len(pairs))
+
+    removable = [(hand, move) for hand, move in pairs if hand.contains(move)]
+    for hand, move in removable:
+        assert remove_by_counts(hand, move) == hand - move
+    row('remove (per call)',
+        bench(lambda: [remove_by_counts(hand, move) for hand, move in removable], 2000) / len(removable),
+        bench(lambda: [hand - move for hand, move in removable], 2000) / len(removable))
+
+    for cards, hand in zip(HANDS, hands):
+        assert playable_by_numpy(hand) == playable_cards_from_hand(hand), cards
+        row(f'playable {cards}',
+            bench(lambda: playable_by_numpy(hand), 50),
+            bench(lambda: playable_cards_from_hand(hand), 50))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+牌型表加载基准：JSON 解析 vs mmap 二进制索引
+
+每种模式分别启动 WORKERS 个子进程（模拟 restart.py 启动的 5 个 uvicorn worker），
+统计 import app.utils.utils 的耗时、每个进程的 RSS 以及按共享比例折算后的 PSS 总和。
+
+用法:
+    python -m scripts.bench_card_index
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+WORKERS = 5
+
+CHILD_CODE = r'''
+import json, sys, time
+start = time.perf_counter()
+import app.utils.utils as utils
+utils.CARD_TYPE['3334445556667778899B']
+elapsed = time.perf_counter() - start
+
+def read_kb(path, field):
+    try:
+        with open(path) as file:
+            for line in file:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+print(json.dumps({
+    'import_s': elapsed,
+    'rss_kb': read_kb('/proc/self/status', 'VmRSS'),
+    'pss_kb': read_kb('/proc/self/smaps_rollup', 'Pss'),
+}))
+sys.stdout.flush()
+# 保持进程存活，让所有 worker 同时在线时再统计 PSS
+sys.stdin.read()
+'''
+
+
+def run_mode(enabled: bool) -> list:
+    env = dict(os.environ, CARD_INDEX_ENABLED='true' if enabled else 'false')
+    procs = [
+        subprocess.Popen([sys.executable, '-c', CHILD_CODE], env=env,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(WORKERS)
+    ]
+    results = [json.loads(proc.stdout.readline()) for proc in procs]
+    # 所有 worker 均已加载完毕，重新读取 PSS（共享页按进程数均摊）
+    for proc, result in zip(procs, results):
+        result['pss_kb'] = _read_pss(proc.pid) or result['pss_kb']
+    for proc in procs:
+        proc.stdin.close()
+        proc.wait()
+    return results
+
+
+def _read_pss(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as file:
+            for line in file:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def main() -> None:
+    print(f'{"mode":<8}{"import avg(s)":>15}{"RSS avg(MB)":>14}{"PSS total(MB)":>16}')
+    for name, enabled in (('json', False), ('index', True)):
+        start = time.perf_counter()
+        results = run_mode(enabled)
+        wall = time.perf_counter() - start
+        import_avg = sum(r['import_s'] for r in results) / len(results)
+        rss_avg = sum(r['rss_kb'] for r in results) / len(results) / 1024
+        pss_total = sum(r['pss_kb'] for r in results) / 1024
+        print(f'{name:<8}{import_avg:>15.3f}{rss_avg:>14.1f}{pss_total:>16.1f}   (wall {wall:.2f}s, {WORKERS} workers)')
+
+
+if __name__ == '__main__':
+    main()
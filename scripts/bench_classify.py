@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+牌型判断基准：CARD_TYPE 查表 vs classify_move 直接计算
+
+    json     解析 card_type.json 得到的 dict
+    mmap     二进制索引中的 CardTypeTable（utils 默认使用）
+    classify 由点数张数计算，不需要任何表；输入不要求排序
+
+另外给出两张表各自的加载耗时，以及打乱牌面顺序后 classify_move 的耗时（查表需要先排序）。
+
+用法:
+    python -m scripts.bench_classify
+"""
+import json
+import os
+import random
+import time
+import timeit
+
+from app.utils import card_index
+from app.utils.hand import Hand, as_hand
+from app.utils.move_gen import classify_move
+from app.utils.utils import ROOT_PATH
+
+
+def load_json_table():
+    with open(os.path.join(ROOT_PATH, 'jsondata', 'card_type.json'), 'r') as file:
+        return json.load(file)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def bench(func, count: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=3)) / count * 1e6
+
+
+def main() -> None:
+    json_table, json_ms = timed(load_json_table)
+    tables, mmap_ms = timed(card_index.load_tables)
+    keys = list(json_table)
+    rng = random.Random(0)
+    shuffled = [''.join(rng.sample(cards, len(cards))) for cards in keys]
+
+    for cards in keys:
+        move_type, weight = json_table[cards][0]
+        assert classify_move(Hand.from_str(cards)) == (move_type, int(weight))
+
+    print(f'moves: {len(keys)}')
+    print(f'{"method":<22}{"load(ms)":>10}{"us/move":>10}')
+    print(f'{"json dict":<22}{json_ms:>10.1f}{bench(lambda: [json_table[cards] for cards in keys], len(keys)):>10.2f}')
+    if tables:
+        mmap_table = tables[0]
+        print(f'{"mmap table":<22}{mmap_ms:>10.1f}{bench(lambda: [mmap_table[cards] for cards in keys], len(keys)):>10.2f}')
+    print(f'{"classify":<22}{0:>10.1f}{bench(lambda: [classify_move(as_hand(cards)) for cards in keys], len(keys)):>10.2f}')
+    print(f'{"classify (unsorted)":<22}{0:>10.1f}{bench(lambda: [classify_move(as_hand(cards)) for cards in shuffled], len(keys)):>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+end_user_task 基准：逐条读取明细在 Python 中求和 vs 一次 $group 聚合（需要本地 MongoDB）
+
+在单独的数据库中为一个任务写入 N 条对局明细，分别测量两种实现结束任务的耗时。
+会清空 --database 指定的数据库，不要指向线上库。
+
+用法:
+    python -m scripts.bench_end_user_task --database fastserver_bench --sizes 10 1000 100000
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.core.config import settings
+from app.db.indexes import ensure_indexes
+from app.db.mongodb import close_mongo_connection, connect_to_mongo, get_database
+from app.services.bills_service import BillsService
+
+USERNAME = "bench_user"
+
+
+async def legacy_end_user_task(db, username: str, task_id: str) -> dict:
+    '''原实现：读出全部明细在 Python 中求和，逐条访问数据库'''
+    current_task = await db.current_task.find_one({"username": username, "current_task_id": task_id})
+    if current_task:
+        await db.current_task.delete_one({"username": username, "current_task_id": task_id})
+    details = await db.point_details.find({"task_id": task_id}).to_list(length=None)
+    user = await db.users.find_one({"username": username})
+    user_task = await db.user_tasks.find_one({"username": username, "task_id": task_id})
+    stats = {"game_count": 0, "total_up_points": 0, "total_down_points": 0, "consumed_points": 0}
+    for detail in details:
+        stats["game_count"] += 1
+        game_detail = detail.get("game_detail", {})
+        if game_detail.get("is_up", False):
+            stats["total_up_points"] += game_detail.get("records", 0)
+        else:
+            stats["total_down_points"] += game_detail.get("records", 0)
+        stats["consumed_points"] += detail.get("consumed_points", 0)
+    await db.user_tasks.update_one({"_id": user_task["_id"]}, {"$set": {"current_points": user.get("points", 0), **stats}})
+    return await db.user_tasks.find_one({"task_id": task_id})
+
+
+async def seed(db, task_id: str, size: int) -> None:
+    await db.current_task.insert_one({"username": USERNAME, "current_task_id": task_id})
+    await db.user_tasks.insert_one({"username": USERNAME, "task_id": task_id, "start_time": 0})
+    rng = random.Random(size)
+    batch = []
+    for _ in range(size):
+        is_up = rng.random() < 0.5
+        records = rng.randint(100, 5000)
+        batch.append({
+            "username": USERNAME,
+            "task_id": task_id,
+            "timestamp": 0,
+            "consumed_points": 0 if is_up else records,
+            "game_detail": {"is_up": is_up, "valid_match": True, "nickname": "a", "oppo_nickname": "b", "records": records},
+        })
+        if len(batch) == 10000:
+            await db.point_details.insert_many(batch)
+            batch = []
+    if batch:
+        await db.point_details.insert_many(batch)
+
+
+async def main(database: str, sizes: list) -> None:
+    settings.MONGODB_DATABASE = database
+    await connect_to_mongo()
+    db = get_database()
+    try:
+        await db.client.drop_database(database)
+        await db.users.insert_one({"username": USERNAME, "points": 100000})
+        await ensure_indexes(db)
+        print(f'{"details":>10}{"legacy(ms)":>14}{"aggregate(ms)":>16}{"speedup":>10}')
+        for size in sizes:
+            timings = {}
+            results = {}
+            for name in ("legacy", "aggregate"):
+                task_id = f"bench_{name}_{size}"
+                await seed(db, task_id, size)
+                start = time.perf_counter()
+                if name == "legacy":
+                    results[name] = await legacy_end_user_task(db, USERNAME, task_id)
+                else:
+                    results[name] = await BillsService.end_user_task(USERNAME, task_id)
+                timings[name] = (time.perf_counter() - start) * 1000
+                # 两次使用相同的随机种子，统计结果应完全一致
+                results[name] = {key: results[name][key] for key in ("game_count", "total_up_points", "total_down_points", "consumed_points")}
+            assert results["legacy"] == results["aggregate"], results
+            print(f'{size:>10}{timings["legacy"]:>14.1f}{timings["aggregate"]:>16.1f}{timings["legacy"] / timings["aggregate"]:>9.1f}x')
+    finally:
+        await db.client.drop_database(database)
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", default="fastserver_bench")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    args = parser.parse_args()
+    asyncio.run(main(args.database, args.sizes))
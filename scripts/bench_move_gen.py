@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+get_gt_cards 基准：逐条扫描 TYPE_CARD vs 直接从手牌计数生成
+
+用法:
+    python -m scripts.bench_move_gen
+"""
+import timeit
+
+from app.utils.hand import Hand
+from app.utils.move_gen import gen_gt_moves
+from app.utils.utils import CARD_TYPE, TYPE_CARD
+
+# 20张地主手牌
+HAND = '3345556777899TJQKKA2'
+
+CASES = ['3', '33', '555', '3334', '34567', '334455', '3334445B', '33334455', '3333']
+
+
+def gt_moves_by_table(hand: Hand, played_cards: str) -> list:
+    '''原实现：扫描比目标权重大的每个桶，逐条判断手牌是否包含'''
+    gt_cards = ['pass']
+    card_type, weight = CARD_TYPE[played_cards][0]
+    type_dict = {card_type: int(weight)}
+    type_dict.setdefault('rocket', -1)
+    type_dict.setdefault('bomb', -1)
+    for card_type, weight in type_dict.items():
+        for can_weight, cards_list in TYPE_CARD.get(card_type, {}).items():
+            if int(can_weight) > weight:
+                for cards in cards_list:
+                    if hand.contains(Hand.from_str(cards)) and cards not in gt_cards:
+                        gt_cards.append(cards)
+    return gt_cards
+
+
+def bench(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+
+def main() -> None:
+    hand = Hand.from_str(HAND)
+    print(f'hand: {HAND}')
+    print(f'{"played":<12}{"moves":>7}{"table(us)":>12}{"generator(us)":>15}{"speedup":>10}')
+    for played in CASES:
+        card_type, weight = CARD_TYPE[played][0]
+        expected = set(gt_moves_by_table(hand, played))
+        generated = {'pass'} | set(gen_gt_moves(hand, card_type, int(weight)))
+        assert expected == generated, played
+        table_us = bench(lambda: gt_moves_by_table(hand, played), 3)
+        gen_us = bench(lambda: gen_gt_moves(hand, card_type, int(weight)), 200)
+        print(f'{played:<12}{len(expected):>7}{table_us:>12.1f}{gen_us:>15.1f}{table_us / gen_us:>9.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+账单分页基准：skip 分页 vs 游标分页（需要本地 MongoDB）
+
+为一个用户写入 --bills 条账单，分别测量 skip 分页和游标分页在第 1 页与第 --deep-page 页的耗时。
+会清空 --database 指定的数据库，不要指向线上库。
+
+用法:
+    python -m scripts.bench_pagination --database fastserver_bench --bills 200000 --page-size 10 --deep-page 10000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.core.config import settings
+from app.db.indexes import ensure_indexes
+from app.db.mongodb import close_mongo_connection, connect_to_mongo, get_database
+from app.utils.pagination import encode_cursor, find_page, keyset_sort
+
+USERNAME = "bench_user"
+QUERY = {"username": USERNAME}
+SORT_FIELD = "start_time"
+SORT_ORDER = -1
+
+
+async def seed(db, bills: int) -> None:
+    batch = []
+    for i in range(bills):
+        batch.append({
+            "username": USERNAME,
+            "task_id": f"bench_{i}",
+            # 每 10 条共用一个时间戳，覆盖排序值相同时按 _id 区分的情况
+            "start_time": 1700000000000 + i // 10 * 1000,
+            "current_points": 0,
+            "consumed_points": i % 500,
+            "game_count": i % 50,
+            "total_up_points": 0,
+            "total_down_points": 0,
+        })
+        if len(batch) == 10000:
+            await db.user_tasks.insert_many(batch)
+            batch = []
+    if batch:
+        await db.user_tasks.insert_many(batch)
+    await ensure_indexes(db)
+
+
+async def skip_page(db, page: int, page_size: int) -> list:
+    '''原实现：sort + skip + limit'''
+    return await db.user_tasks.find(QUERY) \
+        .sort(keyset_sort(SORT_FIELD, SORT_ORDER)) \
+        .skip((page - 1) * page_size) \
+        .limit(page_size) \
+        .to_list(length=page_size)
+
+
+async def timed(func, repeat: int) -> tuple:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+async def main(database: str, bills: int, page_size: int, deep_page: int, repeat: int) -> None:
+    settings.MONGODB_DATABASE = database
+    await connect_to_mongo()
+    db = get_database()
+    try:
+        await db.client.drop_database(database)
+        await seed(db, bills)
+
+        # 游标分页的第 deep_page 页：用上一页最后一条记录生成游标，相当于客户端一路翻到这里
+        previous = await skip_page(db, deep_page - 1, page_size)
+        deep_cursor = encode_cursor(SORT_FIELD, SORT_ORDER, previous[-1])
+
+        cases = [
+            ("skip", 1, lambda: skip_page(db, 1, page_size)),
+            ("skip", deep_page, lambda: skip_page(db, deep_page, page_size)),
+            ("cursor", 1, lambda: find_page(db.user_tasks, QUERY, SORT_FIELD, SORT_ORDER, page_size)),
+            ("cursor", deep_page, lambda: find_page(db.user_tasks, QUERY, SORT_FIELD, SORT_ORDER, page_size, deep_cursor)),
+        ]
+        print(f"bills: {bills}, page_size: {page_size}, repeat: {repeat}")
+        print(f'{"mode":<8}{"page":>8}{"median(ms)":>14}')
+        pages = {}
+        for name, page, func in cases:
+            elapsed, result = await timed(func, repeat)
+            pages[(name, page)] = [doc["_id"] for doc in (result[0] if name == "cursor" else result)]
+            print(f"{name:<8}{page:>8}{elapsed:>14.2f}")
+        # 两种方式取到的同一页应完全一致
+        assert pages[("skip", 1)] == pages[("cursor", 1)]
+        assert pages[("skip", deep_page)] == pages[("cursor", deep_page)]
+    finally:
+        await db.client.drop_database(database)
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", default="fastserver_bench")
+    parser.add_argument("--bills", type=int, default=200000)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--deep-page", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.database, args.bills, args.page_size, args.deep_page, args.repeat))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+登录吞吐量与事件循环响应基准：bcrypt 在事件循环中执行 vs 在线程池中执行
+
+同时发起 --logins 个密码校验，另有一个心跳协程每 10ms 唤醒一次，
+记录心跳的最大/99分位延迟，反映其他请求在登录高峰期间被阻塞的程度。
+
+用法:
+    python -m scripts.bench_password_hash --logins 64
+"""
+import argparse
+import asyncio
+import time
+
+from app.core import security
+from app.core.security import PasswordHashOverloaded, pwd_context
+
+HEARTBEAT_INTERVAL = 0.01
+
+
+async def heartbeat(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(time.perf_counter() - start - HEARTBEAT_INTERVAL)
+
+
+async def inline_verify(password: str, hashed: str) -> bool:
+    '''原实现：直接在协程中调用'''
+    return pwd_context.verify(password, hashed)
+
+
+async def run(verify, logins: int, hashed: str) -> dict:
+    stop = asyncio.Event()
+    lags = []
+    beat = asyncio.ensure_future(heartbeat(stop, lags))
+    await asyncio.sleep(HEARTBEAT_INTERVAL * 2)
+
+    async def login():
+        try:
+            return await verify("secret", hashed)
+        except PasswordHashOverloaded:
+            return None
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[login() for _ in range(logins)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    lags.sort()
+    return {
+        "ok": sum(1 for result in results if result),
+        "rejected": sum(1 for result in results if result is None),
+        "seconds": elapsed,
+        "lag_max_ms": lags[-1] * 1000 if lags else 0.0,
+        "lag_p99_ms": lags[int(len(lags) * 0.99)] * 1000 if lags else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=64)
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash("secret")
+    print(f"logins: {args.logins}")
+    print(f'{"mode":<10}{"ok":>6}{"503":>6}{"seconds":>10}{"logins/s":>10}{"lag max(ms)":>14}{"lag p99(ms)":>14}')
+    for name, verify in [("inline", inline_verify), ("executor", security.verify_password)]:
+        result = asyncio.run(run(verify, args.logins, hashed))
+        print(f'{name:<10}{result["ok"]:>6}{result["rejected"]:>6}{result["seconds"]:>10.2f}'
+              f'{result["ok"] / result["seconds"]:>10.1f}{result["lag_max_ms"]:>14.1f}{result["lag_p99_ms"]:>14.1f}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+import os
+import time
+
+from app.utils.card_index import build_index
+
+
+def main() -> None:
+    start = time.perf_counter()
+    path = build_index()
+    elapsed = time.perf_counter() - start
+    print(f'Card index written to {path} ({os.path.getsize(path)} bytes, {elapsed:.2f}s).')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+斗地主AI接口的本地桩服务，用于调试 PklordAI 的连接池、超时与重试
+
+接口与线上一致：/ai-poker/call-landlord、/ai-poker/play-card、/ai-poker/check。
+可以模拟延迟和随机失败（返回 503），便于观察超时和重试行为。
+
+用法:
+    python -m scripts.pklord_stub_server --port 8567 --delay 0.05 --fail-rate 0.1
+    # .env 中设置 PKLORD_AI_BASE_URL=http://127.0.0.1:8567/ai-poker
+"""
+import argparse
+import asyncio
+import random
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Pklord AI Stub")
+
+OPTIONS = {"delay": 0.0, "fail_rate": 0.0}
+STATS = {"requests": 0, "failures": 0}
+
+
+async def _simulate() -> Optional[JSONResponse]:
+    """按配置等待并随机返回失败，返回 None 表示正常处理"""
+    STATS["requests"] += 1
+    if OPTIONS["delay"]:
+        await asyncio.sleep(OPTIONS["delay"])
+    if random.random() < OPTIONS["fail_rate"]:
+        STATS["failures"] += 1
+        return JSONResponse(status_code=503, content={"code": 503, "message": "stub failure"})
+    return None
+
+
+@app.post("/ai-poker/call-landlord")
+async def call_landlord(request: Request):
+    failure = await _simulate()
+    if failure:
+        return failure
+    data = await request.json()
+    # 手牌中有大小王或 3 张以上的 2 就叫地主
+    cards = data.get("self_cards", "").split(",")
+    call = int(("X" in cards and "D" in cards) or cards.count("2") >= 3)
+    return {"call": call, "code": 0}
+
+
+@app.post("/ai-poker/play-card")
+async def play_card(request: Request):
+    failure = await _simulate()
+    if failure:
+        return failure
+    data = await request.json()
+    # 对手没有出牌时出最小的一张，否则不出
+    cards = [card for card in data.get("self_cards", "").split(",") if card]
+    if data.get("oppo_last_move") or not cards:
+        return {"cards": "", "code": 0}
+    return {"cards": cards[-1], "code": 0}
+
+
+@app.post("/ai-poker/check")
+async def check(request: Request):
+    failure = await _simulate()
+    if failure:
+        return failure
+    return {"check": 0, "code": 0}
+
+
+@app.get("/stats")
+async def stats():
+    return STATS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pklord AI stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8567)
+    parser.add_argument("--delay", type=float, default=0.0, help="每个请求的处理延迟（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="返回 503 的概率")
+    args = parser.parse_args()
+    OPTIONS["delay"] = args.delay
+    OPTIONS["fail_rate"] = args.fail_rate
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
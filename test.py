@@ -1,3 +1,4 @@
+import asyncio
 from app.utils.pklord_ai import PklordAI
 from app.models.play import PredictPutCardModel, PlayableCardsModel
 
@@ -30,7 +31,7 @@ def test_play_cards():
 
     try:
         # 调用play_cards方法
-        result = PklordAI.play_cards(test_data)
+        result = asyncio.run(PklordAI.play_cards(PredictPutCardModel.from_dict(test_data)))
         print("测试结果:")
         print(result)
     except Exception as e:
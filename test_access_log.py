@@ -0,0 +1,97 @@
+import asyncio
+import json
+import logging
+
+from fastapi import FastAPI, Request
+import httpx
+
+from app.core import access_log
+from app.core.access_log import AccessLogMiddleware, parse_body, redact, should_log
+from app.core.config import settings
+
+BODY_ROUTE = "/api/v1/play/pklord/predictPutCard"
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(json.loads(record.getMessage()))
+
+
+def test_redact_nested_fields():
+    fields = frozenset(["password", "token"])
+    value = {"username": "a", "Password": "x", "items": [{"token": "t", "n": 1}], "nested": {"token": None}}
+    assert redact(value, fields) == {
+        "username": "a", "Password": "***", "items": [{"token": "***", "n": 1}], "nested": {"token": "***"}
+    }
+
+
+def test_parse_body(monkeypatch):
+    monkeypatch.setattr(settings, "ACCESS_LOG_REDACT_FIELDS", ["password"])
+    assert parse_body(b"", "application/json", False) is None
+    assert parse_body(b'{"username": "a", "password": "x"}', "application/json; charset=utf-8", False) == \
+        {"username": "a", "password": "***"}
+    assert parse_body(b"username=a&password=x&empty=", "application/x-www-form-urlencoded", False) == \
+        {"username": "a", "password": "***", "empty": ""}
+    # 截断、无法解析或其他类型的内容只记录长度，不会漏掉脱敏
+    assert parse_body(b'{"password": "x"', "application/json", True) == "<16+ bytes>"
+    assert parse_body(b"{not json", "application/json", False) == "<9 bytes>"
+    assert parse_body(b"password=x", "text/plain", False) == "<10 bytes>"
+
+
+def test_should_log_sampling(monkeypatch):
+    monkeypatch.setattr(settings, "ACCESS_LOG_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "ACCESS_LOG_SLOW_MS", 1000)
+    monkeypatch.setattr(settings, "ACCESS_LOG_ROUTE_SAMPLE_RATES", {"/sampled": 0.25, "/all": 1.0})
+    assert not should_log("/other", 200, 10)
+    # 5xx 和慢请求总是记录
+    assert should_log("/other", 503, 10)
+    assert should_log("/other", 200, 1000)
+    assert should_log("/all", 404, 10)
+
+    monkeypatch.setattr(access_log.random, "random", lambda: 0.2)
+    assert should_log("/sampled", 200, 10)
+    monkeypatch.setattr(access_log.random, "random", lambda: 0.3)
+    assert not should_log("/sampled", 200, 10)
+
+
+def test_middleware_truncates_and_redacts_body(monkeypatch):
+    handler = ListHandler()
+    monkeypatch.setattr(access_log.logger, "handlers", [handler])
+    monkeypatch.setattr(settings, "ACCESS_LOG_ENABLED", True)
+    monkeypatch.setattr(settings, "ACCESS_LOG_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "ACCESS_LOG_BODY_ROUTES", [BODY_ROUTE])
+    monkeypatch.setattr(settings, "ACCESS_LOG_BODY_MAX_BYTES", 64)
+
+    app = FastAPI()
+
+    @app.post(BODY_ROUTE)
+    async def predict(request: Request):
+        # 截断只影响日志，接口仍然读到完整的请求体
+        return {"size": len(await request.body())}
+
+    @app.post("/other")
+    async def other(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(AccessLogMiddleware)
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            small = await client.post(BODY_ROUTE, json={"password": "x", "cards": "345"})
+            large = await client.post(BODY_ROUTE, json={"password": "x", "cards": "3" * 200})
+            other = await client.post("/other", json={"password": "x"})
+            return small, large, other
+
+    small, large, other = asyncio.run(main())
+    assert large.json()["size"] > 200
+    first, second, third = handler.lines
+    assert first["path"] == BODY_ROUTE and first["status"] == 200
+    assert first["body"] == {"password": "***", "cards": "345"}
+    assert second["body"] == "<64+ bytes>"
+    assert "body" not in third
+    assert first["total_ms"] >= first["handler_ms"] >= 0
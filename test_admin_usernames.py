@@ -0,0 +1,187 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+import pytest
+
+from app.services import admin_service as module
+from app.services.admin_service import AdminService
+
+
+class Result:
+    def __init__(self, inserted_id=None, deleted_count=0):
+        self.inserted_id = inserted_id
+        self.deleted_count = deleted_count
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        for field, order in reversed(keys):
+            self.documents.sort(key=lambda document: document[field], reverse=order < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length):
+        return self.documents[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+class FakeCollection:
+    '''只支持空条件、_id 相等和 _id $in 查询，记录每次 find 的条件'''
+
+    def __init__(self, documents=()):
+        self.documents = list(documents)
+        self.queries = []
+
+    def _matches(self, document, query):
+        condition = query.get("_id")
+        if condition is None:
+            return True
+        if isinstance(condition, dict):
+            return document["_id"] in condition["$in"]
+        return document["_id"] == condition
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return FakeCursor([dict(document) for document in self.documents if self._matches(document, query)])
+
+    async def find_one(self, query):
+        return next((dict(document) for document in self.documents if self._matches(document, query)
+                     and all(document.get(key) == value for key, value in query.items() if key != "_id")), None)
+
+    async def insert_one(self, document):
+        self.documents.append(dict(document))
+        return Result(inserted_id=document.get("_id"))
+
+    async def delete_one(self, query):
+        before = len(self.documents)
+        self.documents = [document for document in self.documents if not self._matches(document, query)]
+        return Result(deleted_count=before - len(self.documents))
+
+
+class FakeDatabase:
+    def __init__(self, users=(), points_logs=()):
+        self.users = FakeCollection(users)
+        self.points_logs = FakeCollection(points_logs)
+        self.admin_logs = FakeCollection()
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(module, "_admin_usernames", {})
+    monkeypatch.setattr(module.time, "monotonic", clock)
+
+    async def invalidate(user_id):
+        pass
+
+    monkeypatch.setattr(module, "invalidate_user_principal", invalidate)
+    return clock
+
+
+def make_service(monkeypatch, db):
+    monkeypatch.setattr(module, "get_database", lambda: db)
+    return AdminService()
+
+
+def admin(username):
+    return {"_id": ObjectId(), "username": username, "is_admin": True}
+
+
+def test_one_in_query_per_page(monkeypatch, clock):
+    alice, bob = admin("alice"), admin("bob")
+    deleted = str(ObjectId())
+    admin_ids = [str(alice["_id"]), str(bob["_id"]), deleted, "system"]
+    start = datetime(2024, 1, 1)
+    logs = [
+        {"_id": ObjectId(), "admin_id": admin_ids[i % 4], "user_id": "u", "username": "user",
+         "points_change": i, "points_after": i, "created_at": start + timedelta(minutes=i)}
+        for i in range(12)
+    ]
+    db = FakeDatabase(users=[alice, bob], points_logs=logs)
+    service = make_service(monkeypatch, db)
+
+    page = asyncio.run(service.get_points_logs(limit=10, with_total=False))
+    assert len(page["logs"]) == 10
+    names = dict(zip(admin_ids, ["alice", "bob", "Unknown", "Unknown"]))
+    assert all(log["admin_username"] == names[log["admin_id"]] for log in page["logs"])
+    # 一页只查一次，无效的 id 不进入查询
+    query, = db.users.queries
+    assert sorted(query["_id"]["$in"]) == sorted([alice["_id"], bob["_id"], ObjectId(deleted)])
+
+
+def test_usernames_cached_until_ttl(monkeypatch, clock):
+    alice = admin("alice")
+    db = FakeDatabase(users=[alice])
+    service = make_service(monkeypatch, db)
+    admin_id = str(alice["_id"])
+
+    assert asyncio.run(service.resolve_admin_usernames([admin_id])) == {admin_id: "alice"}
+    db.users.documents[0]["username"] = "alice2"
+    clock.now += module.ADMIN_USERNAME_CACHE_TTL - 1
+    assert asyncio.run(service.resolve_admin_usernames([admin_id])) == {admin_id: "alice"}
+    assert len(db.users.queries) == 1
+
+    clock.now += 2
+    assert asyncio.run(service.resolve_admin_usernames([admin_id])) == {admin_id: "alice2"}
+    assert len(db.users.queries) == 2
+
+
+def test_unknown_and_invalid_ids_do_not_raise(monkeypatch, clock):
+    db = FakeDatabase()
+    service = make_service(monkeypatch, db)
+    missing = str(ObjectId())
+    result = asyncio.run(service.resolve_admin_usernames([missing, "system", "", "not-an-id"]))
+    assert result == {missing: "Unknown", "system": "Unknown", "": "Unknown", "not-an-id": "Unknown"}
+    # 未找到的管理员不缓存，下次仍会查询
+    assert module._admin_usernames == {}
+    asyncio.run(service.resolve_admin_usernames(["system"]))
+    assert len(db.users.queries) == 1
+    assert asyncio.run(service.resolve_admin_usernames([])) == {}
+
+
+def test_create_and_delete_update_cache(monkeypatch, clock):
+    db = FakeDatabase()
+    service = make_service(monkeypatch, db)
+
+    async def get_password_hash(password):
+        return "hashed"
+
+    monkeypatch.setattr(service, "get_password_hash", get_password_hash)
+    created = asyncio.run(service.create_admin("carol", "secret", "root"))
+    # 新建的管理员直接写入缓存，不需要查询
+    assert asyncio.run(service.resolve_admin_usernames([created["id"]])) == {created["id"]: "carol"}
+    assert db.users.queries == []
+
+    # 用户被删除后从缓存移除，再查询时得到 Unknown
+    user = {"_id": ObjectId(), "username": "dave", "is_admin": False}
+    db.users.documents.append(user)
+    user_id = str(user["_id"])
+    module.remember_admin_username(user_id, "dave")
+    assert asyncio.run(service.delete_user(user_id, "root"))
+    assert user_id not in module._admin_usernames
+    assert asyncio.run(service.resolve_admin_usernames([user_id])) == {user_id: "Unknown"}
+
+    module.forget_admin_username(created["id"])
+    asyncio.run(service.resolve_admin_usernames([created["id"]]))
+    assert len(db.users.queries) == 2
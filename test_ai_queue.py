@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import fakeredis
+
+from app.services.ai_queue_service import AIQueueService, CLAIMS_KEY, PROCESSING_KEY, QUEUE_KEY
+
+
+def run(coro_factory):
+    async def main():
+        queue = AIQueueService(fakeredis.FakeAsyncRedis(decode_responses=True))
+        return await coro_factory(queue)
+    return asyncio.run(main())
+
+
+def test_claim_and_ack():
+    async def scenario(queue):
+        await queue.enqueue("r1", {"cards": []})
+        raw = await queue.claim(timeout=1)
+        assert json.loads(raw) == {"attempt": 0, "request_id": "r1", "data": {"cards": []}}
+        assert await queue.depth() == {"pending": 0, "processing": 1}
+        assert await queue.redis.hexists(CLAIMS_KEY, raw)
+        await queue.ack(raw)
+        assert await queue.depth() == {"pending": 0, "processing": 0}
+        assert not await queue.redis.hexists(CLAIMS_KEY, raw)
+        assert await queue.claim(timeout=1) is None
+    run(scenario)
+
+
+def test_reap_requeues_stale_claims_only():
+    async def scenario(queue):
+        await queue.enqueue("r1", {})
+        raw = await queue.claim(timeout=1)
+        # 没有超时的请求不放回
+        assert await queue.reap(visibility_timeout=60) == 0
+        assert await queue.reap(visibility_timeout=-1) == 1
+        assert await queue.depth() == {"pending": 1, "processing": 0}
+        requeued = await queue.redis.lindex(QUEUE_KEY, 0)
+        assert requeued != raw
+        assert json.loads(requeued) == {"attempt": 1, "request_id": "r1", "data": {}}
+        assert not await queue.redis.hexists(CLAIMS_KEY, raw)
+    run(scenario)
+
+
+def test_reap_records_claims_missing_a_timestamp():
+    async def scenario(queue):
+        # 刚移入处理中队列、还没写入领取时间的请求，第一轮只记录时间；
+        # 旧格式（没有 attempt 字段）的消息放回时补上 attempt
+        legacy = json.dumps({"request_id": "r0", "data": {}})
+        await queue.redis.lpush(PROCESSING_KEY, legacy)
+        assert await queue.reap(visibility_timeout=-1) == 0
+        assert await queue.redis.hexists(CLAIMS_KEY, legacy)
+        assert await queue.reap(visibility_timeout=-1) == 1
+        requeued = await queue.redis.lrange(QUEUE_KEY, 0, -1)
+        assert [json.loads(raw) for raw in requeued] == [{"attempt": 1, "request_id": "r0", "data": {}}]
+    run(scenario)
+
+
+def test_late_ack_does_not_remove_the_requeued_copy():
+    async def scenario(queue):
+        await queue.enqueue("r1", {})
+        slow = await queue.claim(timeout=1)
+        await queue.reap(visibility_timeout=-1)
+        retry = await queue.claim(timeout=1)
+        assert json.loads(retry)["attempt"] == 1
+        # 处理得慢的 worker 最后才确认原消息，不能删掉重新领取的那一份
+        await queue.ack(slow)
+        assert await queue.redis.lrange(PROCESSING_KEY, 0, -1) == [retry]
+        assert await queue.redis.hexists(CLAIMS_KEY, retry)
+        await queue.ack(retry)
+        assert await queue.depth() == {"pending": 0, "processing": 0}
+    run(scenario)
@@ -0,0 +1,472 @@
+import asyncio
+import copy
+import random
+
+from bson import ObjectId
+import pytest
+
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.bills import UserPointDetailSchema
+from app.services import bills_service as module
+from app.services.bills_service import BillsService, TASK_STAT_FIELDS
+
+USERNAME = "alice"
+
+
+def get_path(document, path):
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def matches(document, query):
+    '''只支持等值条件（字段不存在时不匹配）'''
+    return all(key in document and document[key] == value for key, value in query.items())
+
+
+def evaluate(expression, document):
+    '''只支持 aggregate_task_stats 用到的表达式：字段路径、$ifNull、$eq、$cond'''
+    if isinstance(expression, str) and expression.startswith("$"):
+        return get_path(document, expression[1:])
+    if not isinstance(expression, dict):
+        return expression
+    (op, args), = expression.items()
+    values = [evaluate(arg, document) for arg in args]
+    if op == "$ifNull":
+        return values[1] if values[0] is None else values[0]
+    if op == "$eq":
+        # 与 MongoDB 一样，布尔值不等于数字
+        return isinstance(values[0], bool) == isinstance(values[1], bool) and values[0] == values[1]
+    if op == "$cond":
+        return values[1] if values[0] else values[2]
+    raise NotImplementedError(op)
+
+
+def accumulate(accumulator, documents):
+    (op, expression), = accumulator.items()
+    assert op == "$sum"
+    values = [evaluate(expression, document) for document in documents]
+    # $sum 忽略非数字
+    return sum(value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool))
+
+
+def apply_update(document, update, inserting=False):
+    for field, value in update.get("$inc", {}).items():
+        document[field] = document.get(field, 0) + value
+    document.update(update.get("$set", {}))
+    if inserting:
+        document.update(update.get("$setOnInsert", {}))
+
+
+class UpdateResult:
+    def __init__(self, matched_count):
+        self.matched_count = matched_count
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length):
+        return self.documents[:length]
+
+
+class FakeCollection:
+    '''
+    内存中的集合，方法签名与 motor 一致
+
+    fail: 方法名 -> 异常，调用时抛出
+    after: 方法名 -> 回调，方法读写完成、返回之前调用（模拟并发的其他请求）
+    '''
+
+    def __init__(self, documents=()):
+        self.documents = [copy.deepcopy(document) for document in documents]
+        self.fail = {}
+        self.after = {}
+        self.sessions = []
+
+    def _enter(self, method, session):
+        self.sessions.append((method, session))
+        if method in self.fail:
+            raise self.fail[method]
+
+    def _leave(self, method):
+        if method in self.after:
+            self.after[method]()
+
+    def _find(self, query):
+        return next((document for document in self.documents if matches(document, query)), None)
+
+    async def find_one(self, query, projection=None, session=None):
+        self._enter("find_one", session)
+        document = copy.deepcopy(self._find(query))
+        self._leave("find_one")
+        return document
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False,
+                                  return_document=False, session=None):
+        self._enter("find_one_and_update", session)
+        document = self._find(query)
+        before = copy.deepcopy(document)
+        if document is None:
+            if not upsert:
+                return None
+            document = {"_id": ObjectId(), **query}
+            self.documents.append(document)
+            apply_update(document, update, inserting=True)
+        else:
+            apply_update(document, update)
+        result = copy.deepcopy(document) if return_document else before
+        self._leave("find_one_and_update")
+        if result is not None and projection:
+            result = {key: value for key, value in result.items() if key in projection}
+        return result
+
+    async def find_one_and_delete(self, query, session=None):
+        self._enter("find_one_and_delete", session)
+        document = self._find(query)
+        if document is not None:
+            self.documents.remove(document)
+        return document
+
+    async def update_one(self, query, update, session=None):
+        self._enter("update_one", session)
+        document = self._find(query)
+        if document is not None:
+            apply_update(document, update)
+        return UpdateResult(int(document is not None))
+
+    async def insert_one(self, document, session=None):
+        self._enter("insert_one", session)
+        self.documents.append(copy.deepcopy(document))
+
+    async def delete_one(self, query, session=None):
+        self._enter("delete_one", session)
+        document = self._find(query)
+        if document is not None:
+            self.documents.remove(document)
+
+    def aggregate(self, pipeline):
+        match, group = pipeline
+        documents = [document for document in self.documents if matches(document, match["$match"])]
+        if not documents:
+            return FakeCursor([])
+        fields = {key: value for key, value in group["$group"].items() if key != "_id"}
+        return FakeCursor([{"_id": None, **{key: accumulate(value, documents) for key, value in fields.items()}}])
+
+
+class FakeTransaction:
+    """退出时有异常则把所有集合恢复到事务开始时的状态"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def __aenter__(self):
+        self.snapshot = {name: copy.deepcopy(collection.documents) for name, collection in self.db.collections()}
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            for name, collection in self.db.collections():
+                collection.documents = self.snapshot[name]
+        else:
+            self.db.committed += 1
+        return False
+
+
+class FakeSession:
+    def __init__(self, db):
+        self.db = db
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    def start_transaction(self):
+        return FakeTransaction(self.db)
+
+
+class FakeClient:
+    def __init__(self, db):
+        self.db = db
+
+    async def start_session(self):
+        return FakeSession(self.db)
+
+
+class FakeDatabase:
+    def __init__(self, users=(), user_tasks=(), point_details=(), current_task=()):
+        self.users = FakeCollection(users)
+        self.user_tasks = FakeCollection(user_tasks)
+        self.point_details = FakeCollection(point_details)
+        self.current_task = FakeCollection(current_task)
+        self.client = FakeClient(self)
+        self.committed = 0
+
+    def collections(self):
+        return [(name, getattr(self, name)) for name in ("users", "user_tasks", "point_details", "current_task")]
+
+
+def legacy_stats(details):
+    '''原实现中逐条明细求和的循环'''
+    stats = dict.fromkeys(TASK_STAT_FIELDS, 0)
+    for detail in details:
+        stats["game_count"] += 1
+        game_detail = detail.get("game_detail", {})
+        if game_detail.get("is_up", False):
+            stats["total_up_points"] += game_detail.get("records", 0)
+        else:
+            stats["total_down_points"] += game_detail.get("records", 0)
+        stats["consumed_points"] += detail.get("consumed_points", 0)
+    return stats
+
+
+def make_detail(task_id, is_up, records):
+    return {
+        "_id": ObjectId(),
+        "username": USERNAME,
+        "task_id": task_id,
+        "consumed_points": 0 if is_up else records,
+        "game_detail": {"is_up": is_up, "records": records},
+    }
+
+
+def random_details(task_id, count, seed):
+    rng = random.Random(seed)
+    details = []
+    for _ in range(count):
+        detail = make_detail(task_id, rng.random() < 0.5, rng.randint(0, 5000))
+        # 旧数据可能缺少 records、consumed_points 甚至 game_detail
+        roll = rng.random()
+        if roll < 0.1:
+            del detail["game_detail"]["records"]
+        elif roll < 0.15:
+            del detail["consumed_points"]
+        elif roll < 0.2:
+            del detail["game_detail"]
+        details.append(detail)
+    return details
+
+
+@pytest.mark.parametrize("count", [0, 1, 7, 200])
+def test_aggregate_matches_legacy_loop(count):
+    details = random_details("t1", count, count)
+    db = FakeDatabase(point_details=details + random_details("t2", 20, -1))
+    stats = asyncio.run(BillsService.aggregate_task_stats(db, "t1"))
+    assert stats == legacy_stats(details)
+    if count == 0:
+        assert stats == dict.fromkeys(TASK_STAT_FIELDS, 0)
+
+
+def test_aggregate_handles_missing_fields():
+    details = [
+        make_detail("t1", True, 30),
+        make_detail("t1", False, 20),
+        {"task_id": "t1", "game_detail": {"is_up": True}},
+        {"task_id": "t1", "game_detail": {"is_up": False}, "consumed_points": 5},
+        {"task_id": "t1"},
+    ]
+    stats = asyncio.run(BillsService.aggregate_task_stats(FakeDatabase(point_details=details), "t1"))
+    assert stats == legacy_stats(details) == {
+        "game_count": 5, "total_up_points": 30, "total_down_points": 20, "consumed_points": 25
+    }
+
+
+def end_task(monkeypatch, db, task_id="t1"):
+    monkeypatch.setattr(module, "get_database", lambda: db)
+    return asyncio.run(BillsService.end_user_task(USERNAME, task_id))
+
+
+def make_db(tasks=(), details=()):
+    return FakeDatabase(
+        users=[{"_id": ObjectId(), "username": USERNAME, "points": 900}],
+        user_tasks=tasks,
+        point_details=details,
+        current_task=[{"_id": ObjectId(), "username": USERNAME, "current_task_id": "t1"}],
+    )
+
+
+def test_end_legacy_task_writes_aggregated_stats(monkeypatch):
+    details = random_details("t1", 50, 3)
+    db = make_db([{"_id": ObjectId(), "username": USERNAME, "task_id": "t1", "start_time": 123}], details)
+    result = end_task(monkeypatch, db)
+    expected = {"username": USERNAME, "task_id": "t1", "start_time": 123, "current_points": 900, **legacy_stats(details)}
+    assert {key: value for key, value in result.items() if key != "_id"} == expected
+    assert db.user_tasks.documents == [result]
+    assert db.current_task.documents == []
+
+
+def test_end_missing_legacy_task_is_upserted(monkeypatch):
+    details = [make_detail("t1", True, 40)]
+    db = make_db(details=details)
+    monkeypatch.setattr(module, "get_current_timestamp", lambda: 555)
+    result = end_task(monkeypatch, db)
+    assert result["start_time"] == 555 and result["current_points"] == 900
+    assert {key: result[key] for key in TASK_STAT_FIELDS} == legacy_stats(details)
+    assert db.user_tasks.documents == [result]
+
+
+def test_end_empty_legacy_task_is_deleted(monkeypatch):
+    task = {"_id": ObjectId(), "username": USERNAME, "task_id": "t1", "start_time": 123}
+    # 只有其他任务的明细，本任务聚合结果为空
+    db = make_db([task], random_details("t2", 5, 1))
+    result = end_task(monkeypatch, db)
+    assert result == {**task, "current_points": 900, **dict.fromkeys(TASK_STAT_FIELDS, 0)}
+    assert db.user_tasks.documents == []
+
+
+def live_task(**counters):
+    return {
+        "_id": ObjectId(), "username": USERNAME, "task_id": "t1", "start_time": 123,
+        "current_points": 0, "live_counters": True, **dict.fromkeys(TASK_STAT_FIELDS, 0), **counters
+    }
+
+
+def make_upload(is_up=False, records=30):
+    user = User(_id=ObjectId(), username=USERNAME, points=500)
+    db = FakeDatabase(
+        users=[{"_id": user.id, "username": USERNAME, "points": 500,
+                "current_total_up_points": 0, "current_total_down_points": 0}],
+        user_tasks=[live_task(game_count=2, total_up_points=10, total_down_points=20, consumed_points=20)],
+    )
+    point_detail = UserPointDetailSchema(
+        username=USERNAME,
+        task_id="t1",
+        game_detail={"is_up": is_up, "valid_match": True, "nickname": "a", "oppo_nickname": "b", "records": records},
+    )
+    return db, user, point_detail
+
+
+def upload(monkeypatch, db, user, point_detail, transactions=False):
+    async def invalidate(user_id):
+        pass
+
+    monkeypatch.setattr(module, "get_database", lambda: db)
+    monkeypatch.setattr(module, "invalidate_user_principal", invalidate)
+    monkeypatch.setattr(settings, "BILLS_USE_TRANSACTIONS", transactions)
+    return asyncio.run(BillsService.upload_point_detail(user, point_detail))
+
+
+def counters(db):
+    task, = db.user_tasks.documents
+    user, = db.users.documents
+    return (
+        {key: task[key] for key in TASK_STAT_FIELDS},
+        {key: user[key] for key in ("points", "current_total_up_points", "current_total_down_points")},
+    )
+
+
+@pytest.mark.parametrize("transactions", [False, True])
+@pytest.mark.parametrize("is_up", [False, True])
+def test_upload_updates_task_user_and_detail_together(monkeypatch, transactions, is_up):
+    db, user, point_detail = make_upload(is_up=is_up, records=30)
+    document = upload(monkeypatch, db, user, point_detail, transactions)
+    task, user_points = counters(db)
+    assert task == {
+        "game_count": 3,
+        "total_up_points": 40 if is_up else 10,
+        "total_down_points": 20 if is_up else 50,
+        "consumed_points": 20 if is_up else 50,
+    }
+    assert user_points == {
+        "points": 500 if is_up else 530,
+        "current_total_up_points": 30 if is_up else 0,
+        "current_total_down_points": 0 if is_up else 30,
+    }
+    detail, = db.point_details.documents
+    assert detail["_id"] == document.id and detail["consumed_points"] == (0 if is_up else 30)
+    assert db.committed == int(transactions)
+
+
+def fail_user_update(db):
+    db.users.fail["update_one"] = RuntimeError("connection reset")
+
+
+def remove_user(db):
+    db.users.documents.clear()
+
+
+def fail_insert(db):
+    db.point_details.fail["insert_one"] = RuntimeError("write concern error")
+
+
+@pytest.mark.parametrize("transactions", [False, True])
+@pytest.mark.parametrize("break_step", [fail_user_update, remove_user, fail_insert])
+def test_failed_second_step_rolls_back(monkeypatch, transactions, break_step):
+    db, user, point_detail = make_upload()
+    break_step(db)
+    before = copy.deepcopy([db.user_tasks.documents, db.users.documents])
+    with pytest.raises(Exception):
+        upload(monkeypatch, db, user, point_detail, transactions)
+    # 已累加的任务统计与用户点数都被撤销，也没有留下明细
+    assert [db.user_tasks.documents, db.users.documents] == before
+    assert db.point_details.documents == []
+    assert db.committed == 0
+
+
+@pytest.mark.parametrize("transactions", [False, True])
+def test_upload_to_missing_task_raises_value_error(monkeypatch, transactions):
+    db, user, point_detail = make_upload()
+    point_detail.task_id = "missing"
+    before = copy.deepcopy([db.user_tasks.documents, db.users.documents])
+    with pytest.raises(ValueError):
+        upload(monkeypatch, db, user, point_detail, transactions)
+    assert [db.user_tasks.documents, db.users.documents] == before
+    assert db.point_details.documents == []
+
+
+def test_transaction_passes_session_to_every_step(monkeypatch):
+    db, user, point_detail = make_upload()
+    upload(monkeypatch, db, user, point_detail, transactions=True)
+    calls = db.user_tasks.sessions + db.users.sessions + db.point_details.sessions
+    assert [method for method, _ in calls] == ["find_one_and_update", "update_one", "insert_one"]
+    assert all(isinstance(session, FakeSession) for _, session in calls)
+
+
+def concurrent_upload(db, is_up, records):
+    '''在 end_user_task 读取任务之后累加一条明细，与上传接口的 $inc 相同'''
+    def apply():
+        task, = db.user_tasks.documents
+        apply_update(task, {"$inc": {
+            "game_count": 1,
+            "total_up_points": records if is_up else 0,
+            "total_down_points": 0 if is_up else records,
+            "consumed_points": 0 if is_up else records,
+        }})
+    db.user_tasks.after["find_one"] = apply
+
+
+def test_end_task_keeps_upload_landing_after_read(monkeypatch):
+    db = make_db([live_task(game_count=1, total_up_points=10)])
+    concurrent_upload(db, is_up=False, records=30)
+    result = end_task(monkeypatch, db)
+    # 只写当前点数，读取之后累加的统计不被覆盖
+    expected = {"game_count": 2, "total_up_points": 10, "total_down_points": 30, "consumed_points": 30}
+    assert {key: result[key] for key in TASK_STAT_FIELDS} == expected
+    assert result["current_points"] == 900
+    assert db.user_tasks.documents == [result]
+
+
+def test_end_empty_task_is_kept_when_upload_lands_after_read(monkeypatch):
+    db = make_db([live_task()])
+    concurrent_upload(db, is_up=True, records=40)
+    result = end_task(monkeypatch, db)
+    # 读取时上下分为 0，但删除条件不再成立，任务和新明细的统计都保留
+    task, = db.user_tasks.documents
+    assert task == result
+    assert task["total_up_points"] == 40 and task["game_count"] == 1
+    assert task["current_points"] == 900
+
+
+def test_end_empty_live_task_is_deleted(monkeypatch):
+    task = live_task()
+    db = make_db([task])
+    result = end_task(monkeypatch, db)
+    assert db.user_tasks.documents == []
+    assert result == {**task, "current_points": 900}
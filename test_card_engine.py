@@ -0,0 +1,250 @@
+import json
+import os
+import random
+from collections import OrderedDict
+
+import pytest
+
+from app.utils import card_index
+from app.utils.action_cache import LegalActionCache
+from app.utils.beats_index import get_beats_index
+from app.utils.hand import Hand, as_hand, chain_starts, rank_indexes, validate_cards
+from app.utils.move_gen import classify_move, gen_gt_moves, gen_moves_of_type
+from app.utils.utils import (
+    ACTION_SPACE,
+    DataTransformer,
+    contains_cards,
+    get_bombs_rockets,
+    get_card_type,
+    get_card_str_by_action_id,
+    get_gt_cards,
+    get_legal_action_ids,
+    get_legal_action_mask,
+    pair_attachments,
+    playable_cards_from_hand,
+    solo_attachments,
+)
+
+JSON_DIR = card_index.JSON_DIR
+
+
+def load_json(name):
+    with open(os.path.join(JSON_DIR, name), 'r') as file:
+        return json.load(file, object_pairs_hook=OrderedDict)
+
+
+@pytest.fixture(scope="module")
+def index_tables(tmp_path_factory):
+    # 重新编译一份索引，避免依赖仓库中可能过期的 card_index.bin
+    path = str(tmp_path_factory.mktemp("card_index") / "card_index.bin")
+    card_index.build_index(out_path=path)
+    index = card_index.CardIndex(path)
+    return card_index.CardTypeTable(index), card_index.TypeCardTable(index), card_index.SpecificMapTable(index)
+
+
+def test_card_index_matches_json(index_tables):
+    card_type, type_card, specific_map = index_tables
+
+    expected_card_type = load_json('card_type.json')
+    assert len(card_type) == len(expected_card_type)
+    for cards, types in expected_card_type.items():
+        assert card_type[cards] == types
+
+    expected_specific_map = load_json('specific_map.json')
+    assert len(specific_map) == len(expected_specific_map)
+    for cards, abstracts in expected_specific_map.items():
+        assert specific_map[cards] == abstracts
+
+    expected_type_card = load_json('type_card.json')
+    # 牌型和权重的顺序都需要与 JSON 保持一致
+    assert list(type_card) == list(expected_type_card)
+    for name, buckets in expected_type_card.items():
+        assert list(type_card[name]) == list(buckets)
+        for weight, cards_list in buckets.items():
+            assert type_card[name][weight] == cards_list
+
+
+def test_card_index_missing_keys(index_tables):
+    card_type, type_card, specific_map = index_tables
+    # 'pass' 只存在于动作映射中
+    assert 'pass' not in card_type
+    assert specific_map['pass'] == ['pass']
+    assert card_type.get('43') is None
+    with pytest.raises(KeyError):
+        card_type['XYZ']
+    assert type_card.get('unknown', {}) == {}
+
+
+def test_committed_card_index_is_current():
+    # 仓库中提交的索引需要与 JSON 源文件同步，修改 JSON 后请重新运行 scripts/build_card_index.py
+    assert card_index.load_tables() is not None
+
+
+def test_hand_counts_and_canonical_string():
+    hand = Hand.from_str('R3B33K4')
+    assert hand.counts == (3, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 1, 1)
+    assert str(hand) == '3334KBR'
+    assert len(hand) == 7
+    assert Hand.from_str('pass') == Hand.from_str('') and not Hand.from_str('pass')
+    # 相同字符串只解析一次
+    assert Hand.from_str('3334KBR') is Hand.from_str('3334KBR')
+
+
+def test_hand_subset_and_subtraction():
+    hand = Hand.from_str('3334KBR')
+    assert hand.contains(Hand.from_str('333K'))
+    assert Hand.from_str('BR') <= hand
+    assert not hand.contains(Hand.from_str('3333'))
+    assert str(hand - Hand.from_str('33B')) == '34KR'
+    with pytest.raises(ValueError):
+        hand - Hand.from_str('44')
+
+
+def test_hand_bitboard():
+    hand = Hand.from_str('3334556789TTTT2BR')
+    assert Hand.from_bits(hand.bits) == hand
+    assert Hand.from_bits(hand.bits).counts == hand.counts
+    assert rank_indexes(hand.at_least(1)) == [0, 1, 2, 3, 4, 5, 6, 7, 12, 13, 14]
+    assert rank_indexes(hand.at_least(3)) == [0, 7]
+    assert rank_indexes(hand.at_least(4)) == [7]
+    # 34567、45678、56789、6789T 四个五连
+    assert rank_indexes(chain_starts(hand.at_least(1), 5)) == [0, 1, 2, 3]
+    # '2' 和大小王不参与顺子
+    assert chain_starts(Hand.from_str('QKA2BR').at_least(1), 3) == chain_starts(Hand.from_str('QKA').at_least(1), 3)
+    # 借位不会跨越点数：4 张 4 减 1 张 3 不影响相邻点数的判断
+    assert not Hand.from_str('4444').contains(Hand.from_str('3'))
+    assert str(hand - Hand.from_str('TTTT')) == '33345567892BR'
+    with pytest.raises(ValueError):
+        Hand([8] + [0] * 14)
+
+
+def test_validate_cards():
+    for cards in ('', 'pass', '3334BR', '3' * 7):
+        assert validate_cards(cards) == cards
+        as_hand(cards)
+    for cards in ('3' * 8, '334x', '10JQK', 'PASS', '33 4'):
+        with pytest.raises(ValueError):
+            validate_cards(cards)
+
+
+def test_card_functions_accept_hand():
+    cards = '3334445555BR'
+    hand = as_hand(cards)
+    assert sorted(get_gt_cards('KKK', hand)) == sorted(get_gt_cards('KKK', cards))
+    assert playable_cards_from_hand(hand) == playable_cards_from_hand(cards)
+    assert get_bombs_rockets(hand) == get_bombs_rockets(cards) == ['BR', '5555']
+    assert contains_cards(hand, '3355') and not contains_cards(cards, '3366')
+    assert DataTransformer.cards_to_nums(hand) == DataTransformer.cards_to_nums(cards)
+
+
+def random_hands(count, seed=20240501):
+    # 固定种子生成随机手牌，另外加入整副牌和飞机较多的极端手牌
+    rng = random.Random(seed)
+    deck = [card for card in '3456789TJQKA2' for _ in range(4)] + ['B', 'R']
+    hands = [Hand.from_str(''.join(rng.sample(deck, rng.randint(1, 20)))) for _ in range(count)]
+    hands.append(Hand([4] * 13 + [1, 1]))
+    hands.append(Hand.from_str('333444555666777888BR'))
+    hands.append(Hand.from_str('3333444455556666KKAA'))
+    return hands
+
+
+@pytest.fixture(scope="module")
+def table_moves():
+    # [(牌面, 牌型, 权重, Hand)]，作为逐条扫描 TYPE_CARD 的参照实现
+    moves = []
+    for move_type, buckets in load_json('type_card.json').items():
+        for weight, cards_list in buckets.items():
+            for cards in cards_list:
+                moves.append((cards, move_type, int(weight), Hand.from_str(cards)))
+    return moves
+
+
+def test_gen_gt_moves_matches_type_card_scan(table_moves):
+    buckets = sorted({(move_type, weight) for _, move_type, weight, _ in table_moves})
+    for hand in random_hands(150):
+        contained = [(cards, move_type, weight) for cards, move_type, weight, move in table_moves if hand.contains(move)]
+        bombs = {cards for cards, move_type, _ in contained if move_type == 'bomb'}
+        rockets = {cards for cards, move_type, _ in contained if move_type == 'rocket'}
+        for target_type, target_weight in buckets:
+            if target_type == 'rocket':
+                expected = set()
+            else:
+                expected = {
+                    cards for cards, move_type, weight in contained
+                    if move_type == target_type and weight > target_weight
+                } | rockets
+                if target_type != 'bomb':
+                    expected |= bombs
+            generated = gen_gt_moves(hand, target_type, target_weight)
+            assert len(generated) == len(set(generated))
+            assert set(generated) == expected, (str(hand), target_type, target_weight)
+
+
+def test_gen_moves_of_type_covers_type_card():
+    full_deck = Hand([4] * 13 + [1, 1])
+    for move_type, buckets in load_json('type_card.json').items():
+        expected = {cards for cards_list in buckets.values() for cards in cards_list}
+        assert set(gen_moves_of_type(full_deck, move_type)) == expected
+
+
+def test_legal_action_cache_lru():
+    cache = LegalActionCache(get_gt_cards, maxsize=2)
+    first = cache.get('3334445555BR', 'KKK')
+    assert sorted(first) == sorted(get_gt_cards('KKK', '3334445555BR'))
+    # 手牌顺序不同、last move 为空或 'pass' 时命中同一个键
+    assert cache.get('BR5555444333', 'KKK') is first
+    assert cache.get('34', None) is cache.get('43', 'pass')
+    cache.get('34', '3')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 3, 1, 2)
+
+
+def test_beats_index_matches_get_gt_cards():
+    index = get_beats_index()
+    hands = random_hands(60)
+    played = ['pass', '3', '2', '33', '555', '3334', '34567', '334455', '33344456', '3333', 'BR', 'KKAAA']
+    played = [played[i % len(played)] for i in range(len(hands))]
+    expected = [get_gt_cards(move, hand) for hand, move in zip(hands, played)]
+    assert [sorted(moves) for moves in index.gt_cards(hands, played)] == [sorted(moves) for moves in expected]
+    assert index.legal_action_ids(hands, played) == [sorted(get_legal_action_ids(moves)) for moves in expected]
+    # 单个出牌对所有手牌生效
+    assert index.gt_cards(['3334BR', '5'], '4') == [['pass', 'B', 'R', 'BR'], ['pass', '5']]
+
+
+def test_action_id_mapping():
+    legal = ['pass', '333', '33', '3334', '33344456']
+    ids = get_legal_action_ids(legal)
+    assert ids == [ACTION_SPACE['pass'], ACTION_SPACE['333'], ACTION_SPACE['33'], ACTION_SPACE['333*'], ACTION_SPACE['333444**']]
+    mask = get_legal_action_mask(legal)
+    assert mask.shape == (len(ACTION_SPACE),) and mask.sum() == len(ids) and mask[ids].all()
+    # 精确映射：动作 '33' 不再被子串匹配到 '333'
+    assert get_card_str_by_action_id(ACTION_SPACE['33'], legal) == '33'
+    assert get_card_str_by_action_id(ACTION_SPACE['333444**'], legal) == '33344456'
+    assert get_card_str_by_action_id(ACTION_SPACE['4'], legal) is None
+    assert get_card_str_by_action_id(len(ACTION_SPACE), legal) is None
+
+
+def test_attachments_are_shared():
+    # 飞机 333444 的单牌附件：只与去掉主体后的手牌有关，4 张按 3 张计算
+    attachments = solo_attachments('3334445666BR', 0, 2, 2)
+    assert isinstance(attachments, tuple)
+    assert set(attachments) == {((), (2, 3)), ((), (3, 3)), ((), (2, 13)), ((), (2, 14)), ((), (3, 13)), ((), (3, 14))}
+    assert solo_attachments('3333444456666BR', 0, 2, 2) is attachments
+    assert pair_attachments('33344455KK', 0, 2, 2) is pair_attachments('333344445555KKK', 0, 2, 2)
+    assert pair_attachments('33344455KK', 0, 2, 2) == (((), (2, 10)),)
+
+
+def test_classify_move_matches_card_type():
+    card_type = load_json('card_type.json')
+    rng = random.Random(7)
+    for cards, ((move_type, weight),) in card_type.items():
+        expected = (move_type, int(weight))
+        assert classify_move(Hand.from_str(cards)) == expected, cards
+        shuffled = ''.join(rng.sample(cards, len(cards)))
+        assert classify_move(as_hand(shuffled)) == expected, shuffled
+    # 不在表中的组合都不是合法出牌
+    for hand in random_hands(2000, seed=25):
+        assert (classify_move(hand) is None) == (str(hand) not in card_type), str(hand)
+    assert get_card_type('4333') == [['trio_solo', '1']]
+    assert get_card_type('3345') == []
+    assert get_gt_cards('KAKAA', 'AAA22') == get_gt_cards('KKAAA', 'AAA22')
@@ -0,0 +1,33 @@
+import asyncio
+
+from pymongo.errors import DuplicateKeyError
+
+from app.db.indexes import INDEXES, ensure_indexes
+
+
+class FakeCollection:
+    def __init__(self, failing):
+        self.failing = failing
+
+    async def create_indexes(self, models):
+        names = [model.document["name"] for model in models]
+        if self.failing in names:
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return names
+
+
+class FakeDatabase:
+    def __init__(self, failing):
+        self.failing = failing
+
+    def __getitem__(self, collection):
+        return FakeCollection(self.failing.get(collection))
+
+
+def test_failed_index_does_not_drop_the_rest(capsys):
+    created = asyncio.run(ensure_indexes(FakeDatabase({"user_tasks": "task_id_unique"})))
+    assert created["user_tasks"] == ["username_start_time"]
+    for collection, models in INDEXES.items():
+        if collection != "user_tasks":
+            assert created[collection] == [model.document["name"] for model in models]
+    assert "task_id_unique on user_tasks" in capsys.readouterr().out
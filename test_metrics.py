@@ -0,0 +1,95 @@
+import json
+import random
+
+import pytest
+
+from app.core.metrics import Histogram, MetricsRegistry, QUANTILES, bucket_index, bucket_upper, render
+
+
+def test_bucket_bounds_and_relative_error():
+    values = list(range(0, 5000)) + [2 ** k + offset for k in range(13, 40) for offset in (-1, 0, 1)]
+    indexes = [bucket_index(micros) for micros in values]
+    # 桶下标随值单调不减
+    assert indexes == sorted(indexes)
+    for micros, index in zip(values, indexes):
+        upper = bucket_upper(index)
+        # 值落在自己的桶内：不超过本桶上界，大于上一个桶的上界
+        assert upper >= micros
+        assert index == 0 or bucket_upper(index - 1) < micros
+        # 64 微秒以下精确记录，之后相对误差不超过 1/32
+        if micros < 64:
+            assert upper == micros
+        else:
+            assert (upper - micros) / micros <= 1 / 32
+
+
+def test_quantiles_of_known_distribution():
+    histogram = Histogram()
+    # 1ms ~ 10s 均匀分布，p 分位数约为 p * 10s
+    values = [i / 1000 for i in range(1, 10001)]
+    random.Random(0).shuffle(values)
+    for value in values:
+        histogram.record(value)
+    assert histogram.count == 10000
+    assert histogram.sum == pytest.approx(sum(values))
+    for q in QUANTILES:
+        expected = q * 10
+        assert expected <= histogram.quantile(q) <= expected * (1 + 1 / 32) + 1e-6
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_merge_equals_recording_everything_in_one_registry():
+    combined, first, second = MetricsRegistry(), MetricsRegistry(), MetricsRegistry()
+    rng = random.Random(1)
+    for registry in (first, second):
+        for _ in range(500):
+            seconds = rng.expovariate(50)
+            status = rng.choice([200, 500])
+            registry.observe("http_request", seconds, route="/a", status=status)
+            combined.observe("http_request", seconds, route="/a", status=status)
+        registry.inc("access_log_dropped", 2)
+        combined.inc("access_log_dropped", 2)
+
+    merged = MetricsRegistry()
+    # 快照经过 JSON（Redis 中的格式）后合并，桶下标变成字符串
+    for registry in (first, second):
+        merged.merge(json.loads(json.dumps(registry.snapshot())))
+    assert merged.counters == combined.counters
+    assert merged.histograms.keys() == combined.histograms.keys()
+    for key, histogram in combined.histograms.items():
+        assert merged.histograms[key].counts == histogram.counts
+        assert merged.histograms[key].count == histogram.count
+        assert merged.histograms[key].sum == pytest.approx(histogram.sum)
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    for micros in (1000, 2000, 3000, 4000):
+        registry.observe("http_request", micros / 1e6, route="/a", method="GET", status=200)
+    registry.inc("access_log_dropped", 3)
+    text = render(registry, {"ai_queue_pending": 5, "processes": 2})
+
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    metric = "fastserver_http_request_duration_seconds"
+    labels = 'method="GET",route="/a",status="200"'
+    assert lines[0] == f"# TYPE {metric} summary"
+    # 分位数取所在桶的上界
+    p50 = bucket_upper(bucket_index(2000)) / 1e6
+    p999 = bucket_upper(bucket_index(4000)) / 1e6
+    assert f'{metric}{{{labels},quantile="0.5"}} {p50:.6f}' in lines
+    assert f'{metric}{{{labels},quantile="0.999"}} {p999:.6f}' in lines
+    assert f"{metric}_sum{{{labels}}} 0.010000" in lines
+    assert f"{metric}_count{{{labels}}} 4" in lines
+    assert "# TYPE fastserver_access_log_dropped_total counter" in lines
+    assert "fastserver_access_log_dropped_total 3" in lines
+    assert lines[-4:] == [
+        "# TYPE fastserver_ai_queue_pending gauge", "fastserver_ai_queue_pending 5",
+        "# TYPE fastserver_processes gauge", "fastserver_processes 2",
+    ]
+
+
+def test_render_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.inc("errors", route='/a"b\\c\nd')
+    assert 'fastserver_errors_total{route="/a\\"b\\\\c\\nd"} 1' in render(registry, {})
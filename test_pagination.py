@@ -0,0 +1,144 @@
+import asyncio
+import base64
+from datetime import datetime
+import json
+
+from bson import ObjectId
+import pytest
+
+from app.utils.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    find_page,
+    keyset_filter,
+    keyset_sort,
+)
+
+
+def matches(document, query):
+    '''只支持 find_page 用到的条件：$and、$or、相等、$lt、$gt'''
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(document, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = document.get(key)
+            for op, bound in condition.items():
+                if op == "$lt" and not value < bound:
+                    return False
+                if op == "$gt" and not value > bound:
+                    return False
+        elif document.get(key) != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, keys):
+        # 多键排序：从最后一个键开始依次稳定排序
+        for field, order in reversed(keys):
+            self.documents.sort(key=lambda document: document[field], reverse=order < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length):
+        return self.documents[:length]
+
+
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query, projection=None):
+        return FakeCursor([document for document in self.documents if matches(document, query)])
+
+
+def make_tasks():
+    # 多条记录的 start_time 相同，翻页时要靠 _id 区分
+    times = [100, 200, 200, 200, 300, 300, 400]
+    return [{"_id": ObjectId(), "username": "alice", "start_time": start} for start in times] + \
+        [{"_id": ObjectId(), "username": "bob", "start_time": 250}]
+
+
+def collect_pages(collection, query, page_size):
+    pages = []
+    cursor = None
+    while True:
+        documents, cursor = asyncio.run(find_page(collection, query, "start_time", -1, page_size, cursor))
+        pages.append(documents)
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip():
+    oid = ObjectId()
+    document = {"_id": oid, "start_time": 1700000000000}
+    cursor = encode_cursor("start_time", -1, document)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "start_time", -1) == (1700000000000, oid)
+
+    created = datetime(2024, 5, 1, 12, 30, 15, 123000)
+    cursor = encode_cursor("created_at", 1, {"_id": oid, "created_at": created})
+    assert decode_cursor(cursor, "created_at", 1) == (created, oid)
+
+
+def test_keyset_filter_and_sort():
+    oid = ObjectId()
+    assert keyset_filter("start_time", -1, 200, oid) == {"$or": [
+        {"start_time": {"$lt": 200}},
+        {"start_time": 200, "_id": {"$lt": oid}},
+    ]}
+    assert keyset_filter("_id", 1, None, oid) == {"_id": {"$gt": oid}}
+    assert keyset_sort("start_time", -1) == [("start_time", -1), ("_id", -1)]
+    assert keyset_sort("_id", 1) == [("_id", 1)]
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 10])
+def test_find_page_walks_ties_without_gaps(page_size):
+    tasks = make_tasks()
+    collection = FakeCollection(tasks)
+    pages = collect_pages(collection, {"username": "alice"}, page_size)
+    seen = [document for page in pages for document in page]
+    expected = sorted(
+        (task for task in tasks if task["username"] == "alice"),
+        key=lambda task: (task["start_time"], task["_id"]),
+        reverse=True
+    )
+    assert seen == expected
+    assert all(len(page) == page_size for page in pages[:-1])
+
+
+def tamper(cursor, **changes):
+    payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    payload.update(changes)
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+
+def test_rejects_malformed_and_tampered_cursors():
+    cursor = encode_cursor("start_time", -1, {"_id": ObjectId(), "start_time": 200})
+    invalid = [
+        "not a cursor!",
+        cursor[:-3],
+        base64.urlsafe_b64encode(b"[1, 2]").decode("ascii"),
+        base64.urlsafe_b64encode(b'{"f": "start_time", "o": -1}').decode("ascii"),
+        tamper(cursor, f="consumed_points"),
+        tamper(cursor, o=1),
+        tamper(cursor, v={"$ne": None}),
+        tamper(cursor, id={"$gt": ""}),
+        tamper(cursor, v={"$date": "yesterday"}),
+    ]
+    for bad in invalid:
+        with pytest.raises(InvalidCursor):
+            decode_cursor(bad, "start_time", -1)
+    with pytest.raises(InvalidCursor):
+        asyncio.run(find_page(FakeCollection([]), {}, "start_time", -1, 10, invalid[0]))
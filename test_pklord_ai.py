@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+
+from app.core.config import settings
+from app.utils.pklord_ai import PklordAI
+
+
+def run_with_transport(handler, coro_factory):
+    async def main():
+        await PklordAI.init_client(transport=httpx.MockTransport(handler))
+        try:
+            return await coro_factory()
+        finally:
+            await PklordAI.close_client()
+    return asyncio.run(main())
+
+
+def test_retries_idempotent_call_until_success(monkeypatch):
+    monkeypatch.setattr(settings, "PKLORD_AI_RETRY_BACKOFF", 0.0)
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        if len(calls) == 2:
+            return httpx.Response(503, text="busy")
+        return httpx.Response(200, json={"check": 1, "code": 0})
+
+    result = run_with_transport(handler, lambda: PklordAI.check("3,4,5", 1))
+    assert result == {"check": 1, "code": 0}
+    assert calls == ["/ai-poker/check"] * 3
+
+
+def test_gives_up_after_retries(monkeypatch):
+    monkeypatch.setattr(settings, "PKLORD_AI_RETRY_BACKOFF", 0.0)
+    monkeypatch.setattr(settings, "PKLORD_AI_RETRIES", 1)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadTimeout("slow", request=request)
+
+    result = run_with_transport(handler, lambda: PklordAI.call_landlord("3,4,5", 1, 0))
+    assert result["code"] == -1
+    assert len(calls) == 2
+
+
+def test_client_error_is_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, text="bad request")
+
+    result = run_with_transport(handler, lambda: PklordAI.check("3,4,5", 1))
+    assert result == {"code": 400, "message": "bad request"}
+    assert len(calls) == 1
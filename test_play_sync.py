@@ -0,0 +1,111 @@
+import asyncio
+
+from bson import ObjectId
+from fastapi import FastAPI
+import fakeredis
+import httpx
+import pytest
+
+from app.api.v1.endpoints import play
+from app.models.user import User
+from app.services.auth_service import get_current_user
+from app.services.result_service import ResultService
+
+URL = "/api/v1/play/pklord/predictPutCard"
+
+
+class FakeQueue:
+    """代替 AIQueueService，只记录入队的请求"""
+
+    enqueued = []
+
+    def __init__(self, redis_client):
+        pass
+
+    async def enqueue(self, request_id, data):
+        self.enqueued.append((request_id, data))
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    monkeypatch.setattr(FakeQueue, "enqueued", [])
+    monkeypatch.setattr(play, "AIQueueService", FakeQueue)
+    return FakeQueue.enqueued
+
+
+def make_request(pk_status=0):
+    return {
+        "init_card": "334455789",
+        "current_hand": "334455789",
+        "opponent_hands": "",
+        "fundcards": "",
+        "other_hands": "",
+        "current_multiplier": 1,
+        "self_seat": 0,
+        "landlord_seat": 0,
+        "pk_status": pk_status,
+        "self_win_card_num": 0,
+        "oppo_win_card_num": 0,
+        "playables": [],
+    }
+
+
+def post(monkeypatch, *requests):
+    '''依次发送 (查询参数, 请求头, 请求体)，返回响应列表和 Redis 中的键'''
+    async def main():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        monkeypatch.setattr(play, "get_redis", lambda: redis)
+        app = FastAPI()
+        app.include_router(play.router, prefix="/api/v1")
+        app.dependency_overrides[get_current_user] = lambda: User(_id=ObjectId(), username="alice")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = [
+                (await client.post(URL, params=params, headers=headers, json=body)).json()
+                for params, headers, body in requests
+            ]
+        return responses, sorted(await redis.keys("*")), redis
+
+    return asyncio.run(main())
+
+
+def test_sync_mode_returns_move_inline(monkeypatch, queue):
+    responses, keys, _ = post(
+        monkeypatch,
+        ({"sync": "true"}, {}, make_request()),
+        ({}, {"X-Sync-Result": "1"}, make_request()),
+        ({}, {"X-Sync-Result": "yes"}, make_request(pk_status=1)),
+    )
+    assert responses == [
+        {"code": 200, "msg": "success", "data": "334455"},
+        {"code": 200, "msg": "success", "data": "334455"},
+        {"code": 200, "msg": "success", "data": "pass"},
+    ]
+    # 同步模式不写结果，也不入队
+    assert keys == []
+    assert queue == []
+
+
+def test_sync_mode_ai_request_returns_202(monkeypatch, queue):
+    responses, keys, _ = post(monkeypatch, ({"sync": "true"}, {}, make_request(pk_status=2)))
+    response = responses[0]
+    assert response["code"] == 202
+    assert [request_id for request_id, _ in queue] == [response["data"]]
+    assert queue[0][1]["pk_status"] == 2
+    assert keys == []
+
+
+def test_default_mode_publishes_result(monkeypatch, queue):
+    async def fetch(redis, request_id):
+        return await ResultService(redis).fetch(request_id)
+
+    responses, keys, redis = post(
+        monkeypatch,
+        ({}, {}, make_request()),
+        ({}, {"X-Sync-Result": "0"}, make_request(pk_status=2)),
+    )
+    local, ai = responses
+    assert local["code"] == 200 and local["msg"] == "请求已加入处理队列"
+    assert keys == sorted([local["data"], ResultService.result_key(local["data"])])
+    assert asyncio.run(fetch(redis, local["data"])) == {"code": 200, "msg": "success", "data": "334455"}
+    assert ai["code"] == 200 and [request_id for request_id, _ in queue] == [ai["data"]]
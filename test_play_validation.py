@@ -0,0 +1,57 @@
+import asyncio
+
+from bson import ObjectId
+from fastapi import FastAPI
+import fakeredis
+import httpx
+
+from app.api.v1.endpoints import play
+from app.models.user import User
+from app.services.auth_service import get_current_user
+from test_play_sync import make_request
+
+PREFIX = "/api/v1/play/pklord"
+
+
+def send(monkeypatch, *requests):
+    '''依次发送 (方法, 路径, 参数)，返回响应列表'''
+    async def main():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        monkeypatch.setattr(play, "get_redis", lambda: redis)
+        app = FastAPI()
+        app.include_router(play.router, prefix="/api/v1")
+        app.dependency_overrides[get_current_user] = lambda: User(_id=ObjectId(), username="alice")
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = []
+            for method, path, payload in requests:
+                if method == "GET":
+                    responses.append(await client.get(PREFIX + path, params=payload))
+                else:
+                    responses.append(await client.post(PREFIX + path, params={"sync": "true"}, json=payload))
+            return responses
+
+    return asyncio.run(main())
+
+
+def test_predict_put_card_rejects_invalid_cards(monkeypatch):
+    bad_hand = {**make_request(), "current_hand": "3" * 8}
+    bad_char = {**make_request(), "current_hand": "334x"}
+    bad_move = {**make_request(), "playables": [{"cards": "10", "seat": 1}]}
+    good = {**make_request(), "playables": [{"cards": "pass", "seat": 1}]}
+    responses = send(monkeypatch, *[("POST", "/predictPutCard", body) for body in (bad_hand, bad_char, bad_move, good)])
+    assert [response.status_code for response in responses] == [422, 422, 422, 200]
+    assert responses[3].json()["code"] == 200
+
+
+def test_landlord_score_rejects_invalid_cards(monkeypatch):
+    params = {"pk_status": 0, "oppo_call": 0}
+    ok, bad_char, too_many = send(
+        monkeypatch,
+        ("GET", "/getLandlordScore", {**params, "current_hand": "56888TTQKKKAA222R"}),
+        ("GET", "/getLandlordScore", {**params, "current_hand": "5688x"}),
+        ("GET", "/getLandlordScore", {**params, "current_hand": "A" * 8}),
+    )
+    assert ok.status_code == 200 and ok.json()["code"] == 200
+    assert bad_char.status_code == 400
+    assert too_many.status_code == 400
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.core import principal_cache as module
+from app.core.principal_cache import ActivityBuffer, PrincipalCache
+from app.models.user import User
+
+
+class FakeCollection:
+    def __init__(self, on_write=None):
+        self.on_write = on_write
+        self.calls = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls.append(operations)
+        if self.on_write:
+            self.on_write()
+
+
+class FakeDatabase:
+    """与 motor 的 Database 一样不支持真值判断"""
+
+    def __init__(self, on_write=None):
+        self.users = FakeCollection(on_write)
+
+    def __bool__(self):
+        raise NotImplementedError("Database objects do not implement truth value testing")
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_user(name="alice"):
+    return User(_id=ObjectId(), username=name)
+
+
+def test_principal_cache_ttl_and_token_expiry(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(module.time, "time", clock)
+    cache = PrincipalCache(ttl=30, maxsize=10)
+    user = make_user()
+    cache.put("t1", user)
+    # token 本身先过期时以 token 为准
+    cache.put("t2", user, token_exp=clock.now + 5)
+    assert cache.get("t1") is user and cache.get("t2") is user
+    clock.now += 10
+    assert cache.get("t1") is user
+    assert cache.get("t2") is None
+    clock.now += 25
+    assert cache.get("t1") is None
+    assert len(cache) == 0
+
+
+def test_principal_cache_invalidation_and_capacity():
+    cache = PrincipalCache(ttl=60, maxsize=2)
+    alice, bob = make_user("alice"), make_user("bob")
+    cache.put("a1", alice)
+    cache.put("a2", alice)
+    cache.put("b1", bob)
+    # 超过容量时淘汰最早的条目
+    assert cache.get("a1") is None and len(cache) == 2
+    cache.invalidate_user(str(alice.id))
+    assert cache.get("a2") is None
+    assert cache.get("b1") is bob
+
+    disabled = PrincipalCache(ttl=60, maxsize=0)
+    disabled.put("a1", alice)
+    assert disabled.get("a1") is None
+
+
+def test_activity_buffer_coalesces_and_flushes():
+    buffer = ActivityBuffer()
+    first, last = datetime(2024, 1, 1, 12, 0), datetime(2024, 1, 1, 12, 5)
+    user_id, other_id = str(ObjectId()), str(ObjectId())
+    buffer.touch(user_id, first)
+    buffer.touch(user_id, last)
+    buffer.touch(other_id, first)
+
+    db = FakeDatabase()
+    assert asyncio.run(buffer.flush(db)) == 2
+    (operations,) = db.users.calls
+    updates = {op._filter["_id"]: op._doc["$set"]["last_active"] for op in operations}
+    assert updates == {ObjectId(user_id): last, ObjectId(other_id): first}
+    # 写入后清空，没有待写入的数据时不访问数据库
+    assert asyncio.run(buffer.flush(db)) == 0
+    assert len(db.users.calls) == 1
+
+
+def test_activity_buffer_keeps_pending_on_failure():
+    buffer = ActivityBuffer()
+    user_id, other_id = str(ObjectId()), str(ObjectId())
+    old, new = datetime(2024, 1, 1, 12, 0), datetime(2024, 1, 1, 12, 5)
+    buffer.touch(user_id, old)
+    buffer.touch(other_id, old)
+
+    def touch_then_fail():
+        # 写入期间又有新的活跃时间
+        buffer.touch(user_id, new)
+        raise RuntimeError("write failed")
+
+    assert asyncio.run(buffer.flush(FakeDatabase(on_write=touch_then_fail))) == 0
+    # 失败后放回，期间有更新的以新的为准
+    assert buffer.drain() == {user_id: new, other_id: old}
@@ -0,0 +1,181 @@
+import asyncio
+import json
+
+from bson import ObjectId
+from fastapi import FastAPI
+import fakeredis
+import httpx
+import pytest
+
+from app.api.v1.endpoints import play
+from app.core.config import settings
+from app.models.user import User
+from app.services import result_service as module
+from app.services.auth_service import get_current_user
+from app.services.result_service import ResultService, ResultWaitersExhausted
+
+PREFIX = "/api/v1"
+
+
+@pytest.fixture(autouse=True)
+def fresh_waiters(monkeypatch):
+    # 信号量绑定事件循环，每个 asyncio.run 重新创建
+    monkeypatch.setattr(module, "_waiters", None)
+
+
+def make_app(monkeypatch, redis):
+    monkeypatch.setattr(play, "get_redis", lambda: redis)
+    app = FastAPI()
+    app.include_router(play.router, prefix=PREFIX)
+    app.dependency_overrides[get_current_user] = lambda: User(_id=ObjectId(), username="alice")
+    return app
+
+
+def parse_events(text):
+    events = []
+    for block in text.split("\n\n"):
+        lines = [line for line in block.split("\n") if line and not line.startswith(":")]
+        if lines:
+            fields = dict(line.split(": ", 1) for line in lines)
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_publish_then_fetch():
+    async def main():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        service = ResultService(redis)
+        await service.publish("r1", {"code": 200, "msg": "success", "data": "345"})
+        for key in ("r1", service.result_key("r1")):
+            assert module.RESULT_TTL - 5 < await redis.ttl(key) <= module.RESULT_TTL
+        first = await service.fetch("r1")
+        # 取到后两个键都删除，再取为空
+        assert await redis.exists("r1", service.result_key("r1")) == 0
+        return first, await service.fetch("r1")
+
+    first, second = asyncio.run(main())
+    assert first == {"code": 200, "msg": "success", "data": "345"}
+    assert second is None
+
+
+def test_wait_returns_result_published_while_waiting():
+    async def main():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        service = ResultService(redis)
+        waiter = asyncio.ensure_future(service.wait("r1", 5))
+        await asyncio.sleep(0.05)
+        await service.publish("r1", {"code": 200, "msg": "success", "data": "pass"})
+        result = await asyncio.wait_for(waiter, 5)
+        return result, await redis.exists("r1")
+
+    result, remaining = asyncio.run(main())
+    assert result == {"code": 200, "msg": "success", "data": "pass"}
+    assert remaining == 0
+
+
+def test_wait_any_returns_matching_request_id():
+    async def main():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        service = ResultService(redis)
+        await service.publish("r2", {"code": 200, "msg": "success", "data": "77"})
+        first = await service.wait_any(["r1", "r2", "r3"], 1)
+        second = await service.wait_any(["r1", "r2", "r3"], 1)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == ("r2", {"code": 200, "msg": "success", "data": "77"})
+    assert second is None
+
+
+def test_waiters_are_bounded(monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_WAIT_MAX_WAITERS", 1)
+
+    async def main():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        service = ResultService(redis)
+        waiter = asyncio.ensure_future(service.wait("r1", 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ResultWaitersExhausted):
+            await service.wait("r2", 1)
+        await service.publish("r1", {"code": 200})
+        await asyncio.wait_for(waiter, 5)
+        # 等待结束后释放名额
+        await service.publish("r2", {"code": 200})
+        return await service.wait("r2", 1)
+
+    assert asyncio.run(main()) == {"code": 200}
+
+
+def test_wait_endpoint(monkeypatch):
+    async def main():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        app = make_app(monkeypatch, redis)
+        await ResultService(redis).publish("r1", {"code": 200, "msg": "success", "data": "345"})
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            url = f"{PREFIX}/play/pklord/waitRequestResult"
+            found = await client.get(url, params={"request_id": "r1", "timeout": 1})
+            timed_out = await client.get(url, params={"request_id": "r1", "timeout": 1})
+            monkeypatch.setattr(settings, "RESULT_WAIT_MAX_WAITERS", 0)
+            monkeypatch.setattr(module, "_waiters", None)
+            busy = await client.get(url, params={"request_id": "r1", "timeout": 1})
+            return found, timed_out, busy
+
+    found, timed_out, busy = asyncio.run(main())
+    assert found.json() == {"code": 200, "msg": "success", "data": "345"}
+    assert timed_out.status_code == 200 and timed_out.json()["code"] == 408
+    assert busy.status_code == 503
+
+
+def test_wait_endpoints_require_auth(monkeypatch):
+    async def main():
+        app = make_app(monkeypatch, fakeredis.FakeAsyncRedis(decode_responses=True))
+        app.dependency_overrides.clear()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            wait = await client.get(f"{PREFIX}/play/pklord/waitRequestResult", params={"request_id": "r1"})
+            stream = await client.get(f"{PREFIX}/play/pklord/resultStream", params={"request_ids": "r1"})
+            return wait, stream
+
+    wait, stream = asyncio.run(main())
+    assert wait.status_code == 401
+    assert stream.status_code == 401
+
+
+def test_result_stream_sends_results_then_end(monkeypatch):
+    async def main():
+        redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        app = make_app(monkeypatch, redis)
+        service = ResultService(redis)
+        await service.publish("r1", {"code": 200, "msg": "success", "data": "3"})
+        await service.publish("r2", {"code": 200, "msg": "success", "data": "4"})
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            url = f"{PREFIX}/play/pklord/resultStream"
+            done = await client.get(url, params={"request_ids": "r1,r2", "timeout": 5})
+            # r3 没有结果，超时后 end 事件带上未完成的请求
+            partial = await client.get(url, params={"request_ids": "r3", "timeout": 1})
+            return done, partial
+
+    done, partial = asyncio.run(main())
+    assert done.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(done.text)
+    assert [name for name, _ in events] == ["result", "result", "end"]
+    assert {data["request_id"]: data["data"] for _, data in events[:2]} == {"r1": "3", "r2": "4"}
+    assert events[2][1] == {"pending": []}
+    assert parse_events(partial.text) == [("end", {"pending": ["r3"]})]
+
+
+def test_result_stream_rejects_empty_and_too_many_ids(monkeypatch):
+    async def main():
+        app = make_app(monkeypatch, fakeredis.FakeAsyncRedis(decode_responses=True))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            url = f"{PREFIX}/play/pklord/resultStream"
+            too_many = ",".join(f"r{i}" for i in range(play.RESULT_STREAM_MAX_IDS + 1))
+            return [
+                (await client.get(url, params={"request_ids": ids})).status_code
+                for ids in ("", ",,", too_many)
+            ]
+
+    assert asyncio.run(main()) == [400, 400, 400]
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from app.api.v1.endpoints.user import router as user_router
+from app.core import security
+from app.core.config import settings
+from app.services import user_service
+
+
+class FakeUsers:
+    def __init__(self, user=None):
+        self.user = user
+
+    async def find_one(self, query):
+        return self.user
+
+
+class FakeDatabase:
+    def __init__(self, user=None):
+        self.users = FakeUsers(user)
+
+
+def fill_pending(monkeypatch):
+    monkeypatch.setattr(security, "_pending", settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_PENDING)
+
+
+def test_run_rejects_when_pool_is_full(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 1)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 1)
+
+    async def main():
+        # 一个计算中、一个排队中，第三个直接拒绝
+        running = [asyncio.ensure_future(security._run(time.sleep, 0.2)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert security.pending_count() == 2
+        with pytest.raises(security.PasswordHashOverloaded):
+            await security._run(time.sleep, 0)
+        await asyncio.gather(*running)
+        assert security.pending_count() == 0
+
+    asyncio.run(main())
+
+
+def test_hash_and_verify_raise_when_overloaded(monkeypatch):
+    hashed = asyncio.run(security.hash_password("secret"))
+    assert asyncio.run(security.verify_password("secret", hashed))
+    fill_pending(monkeypatch)
+    with pytest.raises(security.PasswordHashOverloaded):
+        asyncio.run(security.hash_password("secret"))
+    with pytest.raises(security.PasswordHashOverloaded):
+        asyncio.run(security.verify_password("secret", hashed))
+
+
+def test_endpoints_return_503_when_overloaded(monkeypatch):
+    app = FastAPI()
+    app.include_router(user_router, prefix="/api/v1/users")
+    client = TestClient(app)
+    user = {"_id": "0" * 24, "username": "alice", "hashed_password": "x"}
+    monkeypatch.setattr(user_service, "get_database", lambda: FakeDatabase(user))
+    fill_pending(monkeypatch)
+
+    response = client.post("/api/v1/users/login", json={"username": "alice", "password": "secret"})
+    assert response.status_code == 503
+
+    monkeypatch.setattr(user_service, "get_database", lambda: FakeDatabase())
+    response = client.post("/api/v1/users/register", json={"username": "bob", "password": "secret"})
+    assert response.status_code == 503
+    assert response.json()["detail"] == str(security.PasswordHashOverloaded())
@@ -0,0 +1,110 @@
+import asyncio
+
+from fastapi import FastAPI
+import httpx
+import pytest
+
+from app.api.v1.endpoints.admin import stats as stats_endpoint
+from app.core.config import settings
+from app.services import stats_service as module
+from app.services.auth_service import get_current_admin
+from app.services.stats_service import StatsService, cached_overview
+
+URL = "/api/v1/admin/stats/overview"
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def overview(monkeypatch):
+    '''get_overview 的替身，返回 state["data"] 并记录调用次数'''
+    state = {"data": {"points_increase": {"day": 1, "week": 2, "month": 3, "total": 4},
+                      "total_users": 5, "active_users": 6}, "calls": 0}
+
+    async def get_overview(self):
+        state["calls"] += 1
+        return dict(state["data"])
+
+    clock = Clock()
+    monkeypatch.setattr(StatsService, "__init__", lambda self, db=None: None)
+    monkeypatch.setattr(StatsService, "get_overview", get_overview)
+    monkeypatch.setattr(module, "_overview_cache", None)
+    monkeypatch.setattr(module.time, "monotonic", clock)
+    monkeypatch.setattr(settings, "STATS_OVERVIEW_CACHE_TTL", 10)
+    state["clock"] = clock
+    return state
+
+
+def make_app(admin={"username": "root"}):
+    app = FastAPI()
+    app.include_router(stats_endpoint.router, prefix="/api/v1/admin")
+    app.dependency_overrides[get_current_admin] = lambda: admin
+    return app
+
+
+def get_all(app, *headers):
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(URL, headers=header) for header in headers]
+    return asyncio.run(main())
+
+
+def test_etag_and_conditional_requests(overview):
+    first, = get_all(make_app(), {})
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.json()["data"] == overview["data"]
+    assert etag.startswith('"') and etag.endswith('"')
+    assert first.headers["cache-control"] == "private, max-age=10"
+
+    responses = get_all(
+        make_app(),
+        {"If-None-Match": etag},
+        {"If-None-Match": f"W/{etag}"},
+        {"If-None-Match": f'"stale", W/{etag}'},
+        {"If-None-Match": "*"},
+        {"If-None-Match": '"stale"'},
+    )
+    for response in responses[:4]:
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert response.headers["cache-control"] == "private, max-age=10"
+    stale = responses[4]
+    assert stale.status_code == 200 and stale.json()["data"] == overview["data"]
+    assert stale.headers["etag"] == etag
+    # 缓存期内只计算一次
+    assert overview["calls"] == 1
+
+
+def test_cached_overview_ttl(overview):
+    data, etag = asyncio.run(cached_overview())
+    overview["data"] = {**overview["data"], "total_users": 50}
+    overview["clock"].now += 9
+    assert asyncio.run(cached_overview()) == (data, etag)
+    assert overview["calls"] == 1
+
+    overview["clock"].now += 2
+    changed, changed_etag = asyncio.run(cached_overview())
+    assert changed["total_users"] == 50 and changed_etag != etag
+    assert overview["calls"] == 2
+
+    # 数据不变时 ETag 不变；ttl 为 0 时不缓存
+    assert asyncio.run(cached_overview(ttl=0)) == (changed, changed_etag)
+    overview["clock"].now += 20
+    asyncio.run(cached_overview(ttl=0))
+    asyncio.run(cached_overview(ttl=0))
+    assert overview["calls"] == 4
+
+
+def test_unauthorized_is_not_wrapped_as_500(overview):
+    response, = get_all(make_app(admin=None), {})
+    assert response.status_code == 401
+    assert overview["calls"] == 0
@@ -0,0 +1,287 @@
+import asyncio
+import copy
+from datetime import datetime, timedelta, timezone
+import random
+
+from fastapi import FastAPI
+import httpx
+import pytest
+
+from app.api.v1.endpoints.admin import stats as stats_endpoint
+from app.services import stats_service as module
+from app.services.auth_service import get_current_admin
+from app.services.stats_service import MAX_SERIES_BUCKETS, StatsService, bucket_id, bucket_start, period_start
+
+# 2024-05-15 是周三
+NOW = datetime(2024, 5, 15, 10, 30)
+
+DATE_PARTS = {
+    "$year": lambda moment: moment.year,
+    "$month": lambda moment: moment.month,
+    "$dayOfMonth": lambda moment: moment.day,
+    "$hour": lambda moment: moment.hour,
+}
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return NOW
+
+
+def matches(document, query):
+    '''只支持等值、$gte、$lt、$nin'''
+    for key, condition in query.items():
+        value = document.get(key)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for op, bound in condition.items():
+            if op == "$gte" and not (value is not None and value >= bound):
+                return False
+            if op == "$lt" and not (value is not None and value < bound):
+                return False
+            if op == "$nin" and value in bound:
+                return False
+    return True
+
+
+def evaluate(expression, document):
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document.get(expression[1:])
+    if isinstance(expression, dict):
+        (op, argument), = expression.items()
+        return DATE_PARTS[op](evaluate(argument, document))
+    return expression
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length):
+        return self.documents
+
+
+class FakeCollection:
+    def __init__(self, documents=()):
+        self.documents = {}
+        for document in documents:
+            self.documents[document.get("_id", len(self.documents))] = copy.deepcopy(document)
+        self.finds = []
+
+    async def find_one(self, query):
+        return next((copy.deepcopy(document) for document in self.documents.values() if matches(document, query)), None)
+
+    def find(self, query, projection=None):
+        self.finds.append(query)
+        return FakeCursor([copy.deepcopy(document) for document in self.documents.values() if matches(document, query)])
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            _id = operation._filter["_id"]
+            update = operation._doc
+            document = self.documents.get(_id)
+            if document is None:
+                assert operation._upsert
+                document = self.documents[_id] = {"_id": _id, **update.get("$setOnInsert", {})}
+            for field, value in update.get("$inc", {}).items():
+                document[field] = document.get(field, 0) + value
+            document.update(update.get("$set", {}))
+
+    async def delete_many(self, query):
+        for _id in [_id for _id, document in self.documents.items() if matches(document, query)]:
+            del self.documents[_id]
+
+    def aggregate(self, pipeline):
+        group, = pipeline
+        spec = dict(group["$group"])
+        key_spec = spec.pop("_id")
+        rows = {}
+        for document in self.documents.values():
+            key = {name: evaluate(expression, document) for name, expression in key_spec.items()}
+            row = rows.setdefault(tuple(key.values()), {"_id": key, **dict.fromkeys(spec, 0)})
+            for field, accumulator in spec.items():
+                row[field] += evaluate(accumulator["$sum"], document)
+        return FakeCursor(list(rows.values()))
+
+
+class FakeDatabase:
+    def __init__(self, points_logs=()):
+        self.stats_rollups = FakeCollection()
+        self.points_logs = FakeCollection(points_logs)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+@pytest.fixture
+def frozen(monkeypatch):
+    monkeypatch.setattr(module, "datetime", FrozenDatetime)
+
+
+def record(service, changes):
+    async def main():
+        for points_change, created_at in changes:
+            await service.record_points_change(points_change, created_at)
+    asyncio.run(main())
+
+
+def test_bucket_boundaries_are_utc():
+    last_moment = datetime(2024, 3, 10, 23, 59, 59, 999999)
+    assert bucket_start(last_moment, "hour") == datetime(2024, 3, 10, 23)
+    assert bucket_start(last_moment, "day") == datetime(2024, 3, 10)
+    assert bucket_start(last_moment + timedelta(microseconds=1), "day") == datetime(2024, 3, 11)
+    with pytest.raises(ValueError):
+        bucket_start(last_moment, "week")
+
+    operations = StatsService(FakeDatabase())._bucket_updates("points", last_moment, {"$inc": {"count": 1}})
+    assert [op._filter["_id"] for op in operations] == [
+        "points:hour:2024-03-10T23", "points:day:2024-03-10T00", "points:total"
+    ]
+    assert all(op._upsert and op._doc["$inc"] == {"count": 1} for op in operations)
+    assert [op._doc["$setOnInsert"]["bucket"] for op in operations] == [
+        datetime(2024, 3, 10, 23), datetime(2024, 3, 10), None
+    ]
+
+    # 带时区的时间先换算成 UTC 再分桶：东八区 3 月 11 日 07:30 属于 UTC 3 月 10 日
+    local = datetime(2024, 3, 11, 7, 30, tzinfo=timezone(timedelta(hours=8)))
+    assert bucket_start(module.as_utc(local), "day") == datetime(2024, 3, 10)
+
+    assert period_start("day", NOW) == datetime(2024, 5, 15)
+    assert period_start("week", NOW) == datetime(2024, 5, 13)
+    assert period_start("week", datetime(2024, 5, 12, 23)) == datetime(2024, 5, 6)
+    assert period_start("month", NOW) == datetime(2024, 5, 1)
+    assert period_start(None, NOW) is None
+
+
+def test_points_increase_sums_each_period(frozen):
+    service = StatsService(FakeDatabase())
+    record(service, [
+        (5, datetime(2024, 5, 15, 9, 59)),
+        (-2, datetime(2024, 5, 15, 9, 0)),
+        (7, datetime(2024, 5, 15, 0, 0)),
+        (11, datetime(2024, 5, 14, 23, 59, 59)),   # 昨天，仍在本周
+        (17, datetime(2024, 5, 13, 0, 0)),         # 周一零点
+        (13, datetime(2024, 5, 12, 23, 59, 59)),   # 上周日，仍在本月
+        (19, datetime(2024, 4, 30, 23, 59, 59)),   # 上个月
+        (23, datetime(2023, 1, 1)),
+    ])
+
+    async def main():
+        return {period: await service.get_points_increase(period) for period in ("day", "week", "month", None)}
+
+    assert asyncio.run(main()) == {"day": 10, "week": 38, "month": 51, None: 93}
+    assert service.rollups.documents["points:total"]["count"] == 8
+    assert service.rollups.documents["points:hour:2024-05-15T09"]["points_change"] == 3
+    assert asyncio.run(StatsService(FakeDatabase()).get_points_increase(None)) == 0
+
+
+def test_timeseries_fills_empty_buckets():
+    service = StatsService(FakeDatabase())
+    record(service, [
+        (5, datetime(2024, 5, 15, 1, 10)),
+        (6, datetime(2024, 5, 15, 1, 50)),
+        (7, datetime(2024, 5, 15, 4, 0)),
+        (8, datetime(2024, 5, 15, 6, 0)),   # 不含 end
+    ])
+
+    hours = asyncio.run(service.get_timeseries(
+        "points", "hour", datetime(2024, 5, 15, 0, 30), datetime(2024, 5, 15, 6)
+    ))
+    # start 向下取整到所在的桶
+    assert [(point["bucket"].hour, point["points_change"], point["count"]) for point in hours] == [
+        (0, 0, 0), (1, 11, 2), (2, 0, 0), (3, 0, 0), (4, 7, 1), (5, 0, 0)
+    ]
+
+    tz = timezone(timedelta(hours=8))
+    days = asyncio.run(service.get_timeseries(
+        "points", "day", datetime(2024, 5, 15, 8, tzinfo=tz), datetime(2024, 5, 17, 8, tzinfo=tz)
+    ))
+    assert days == [
+        {"bucket": datetime(2024, 5, 15), "points_change": 26, "count": 4},
+        {"bucket": datetime(2024, 5, 16), "points_change": 0, "count": 0},
+    ]
+
+    users = asyncio.run(service.get_timeseries("users", "day", datetime(2024, 5, 15), datetime(2024, 5, 16)))
+    assert users == [{"bucket": datetime(2024, 5, 15), "total_users": 0, "active_users": 0}]
+
+
+def test_timeseries_rejects_invalid_ranges():
+    service = StatsService(FakeDatabase())
+    start = datetime(2024, 1, 1)
+
+    def series(metric="points", granularity="hour", end=start + timedelta(hours=1)):
+        return asyncio.run(service.get_timeseries(metric, granularity, start, end))
+
+    assert len(series(end=start + timedelta(hours=MAX_SERIES_BUCKETS))) == MAX_SERIES_BUCKETS
+    for kwargs in (
+        {"end": start + timedelta(hours=MAX_SERIES_BUCKETS, minutes=1)},
+        {"end": start},
+        {"metric": "logins"},
+        {"granularity": "week"},
+    ):
+        with pytest.raises(ValueError):
+            series(**kwargs)
+
+
+def test_timeseries_endpoint_maps_value_error_to_400(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(module, "get_database", lambda: db)
+    app = FastAPI()
+    app.include_router(stats_endpoint.router, prefix="/api/v1/admin")
+    app.dependency_overrides[get_current_admin] = lambda: {"username": "root"}
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            url = "/api/v1/admin/stats/timeseries"
+            ok = await client.get(url, params={"granularity": "day", "start": "2024-01-01T00:00:00", "end": "2024-01-08T00:00:00"})
+            too_many = await client.get(url, params={"granularity": "hour", "start": "2024-01-01T00:00:00", "end": "2025-01-01T00:00:00"})
+            bad_metric = await client.get(url, params={"metric": "logins"})
+            app.dependency_overrides[get_current_admin] = lambda: None
+            unauthorized = await client.get(url)
+            return ok, too_many, bad_metric, unauthorized
+
+    ok, too_many, bad_metric, unauthorized = asyncio.run(main())
+    assert ok.status_code == 200 and len(ok.json()["data"]["series"]) == 7
+    assert too_many.status_code == 400
+    assert bad_metric.status_code == 400
+    assert unauthorized.status_code == 401
+
+
+def test_rebuild_reproduces_live_increments(frozen):
+    rng = random.Random(0)
+    start = datetime(2024, 4, 28)
+    changes = [
+        (rng.randint(-50, 200), start + timedelta(seconds=rng.randint(0, 5 * 24 * 3600)))
+        for _ in range(300)
+    ]
+    live = StatsService(FakeDatabase())
+    record(live, changes)
+
+    db = FakeDatabase(points_logs=[
+        {"_id": index, "points_change": points_change, "created_at": created_at}
+        for index, (points_change, created_at) in enumerate(changes)
+    ])
+    rebuilt = StatsService(db)
+    # 重建前残留的桶：没有对应记录的会被删除，已有的会被覆盖，用户数快照不受影响
+    stale = {"_id": bucket_id("points", "hour", datetime(2020, 1, 1)), "metric": "points", "points_change": 99}
+    users = {"_id": bucket_id("users", "total"), "metric": "users", "total_users": 3}
+    db.stats_rollups.documents = {
+        stale["_id"]: stale,
+        users["_id"]: users,
+        "points:total": {"_id": "points:total", "metric": "points", "points_change": 1, "count": 1},
+    }
+
+    written = asyncio.run(rebuilt.rebuild_points_rollups())
+    assert written == len(live.rollups.documents)
+    assert {_id: document for _id, document in db.stats_rollups.documents.items() if _id != users["_id"]} == \
+        live.rollups.documents
+    assert db.stats_rollups.documents[users["_id"]] == users
+
+    async def sums(service):
+        return [await service.get_points_increase(period) for period in ("day", "week", "month", None)]
+
+    assert asyncio.run(sums(rebuilt)) == asyncio.run(sums(live))
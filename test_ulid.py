@@ -0,0 +1,63 @@
+import re
+import time
+
+from app.utils import ulid
+from app.utils.utils import generate_task_id
+
+ULID_PATTERN = re.compile(r"^[0-9A-HJKMNP-TV-Z]{26}$")
+
+
+def freeze_clock(monkeypatch, now_ms):
+    clock = {"ms": now_ms}
+    monkeypatch.setattr(ulid.time, "time", lambda: clock["ms"] / 1000)
+    monkeypatch.setattr(ulid, "_last_ms", -1)
+    monkeypatch.setattr(ulid, "_last_random", 0)
+    return clock
+
+
+def random_part(value):
+    number = 0
+    for char in value[10:]:
+        number = number * 32 + ulid.ENCODING.index(char)
+    return number
+
+
+def test_encoding_length_and_alphabet():
+    assert len(ulid.ENCODING) == 32 and not set("ILOU") & set(ulid.ENCODING)
+    assert ulid._encode(0, 10) == "0" * 10
+    assert ulid._encode(31, 2) == "0Z"
+    assert ulid._encode((1 << 80) - 1, 16) == "Z" * 16
+    for _ in range(100):
+        assert ULID_PATTERN.match(ulid.new_ulid())
+
+
+def test_monotonic_within_one_millisecond(monkeypatch):
+    freeze_clock(monkeypatch, 1700000000123)
+    ids = [ulid.new_ulid() for _ in range(1000)]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert {ulid.ulid_timestamp(value) for value in ids} == {1700000000123}
+    # 同一毫秒内随机部分逐个加一
+    parts = [random_part(value) for value in ids]
+    assert parts == list(range(parts[0], parts[0] + len(parts)))
+
+
+def test_clock_going_backwards_and_random_overflow(monkeypatch):
+    clock = freeze_clock(monkeypatch, 1700000000123)
+    first = ulid.new_ulid()
+    clock["ms"] -= 50
+    second = ulid.new_ulid()
+    assert second > first and ulid.ulid_timestamp(second) == 1700000000123
+
+    # 随机部分用尽时借用下一毫秒
+    monkeypatch.setattr(ulid, "_last_random", (1 << ulid.RANDOM_BITS) - 1)
+    third = ulid.new_ulid()
+    assert third > second and ulid.ulid_timestamp(third) == 1700000000124
+
+
+def test_generate_task_id_format():
+    before = int(time.time() * 1000)
+    task_id = generate_task_id()
+    after = int(time.time() * 1000)
+    assert ULID_PATTERN.match(task_id)
+    assert before <= ulid.ulid_timestamp(task_id) <= after + 1
+    assert generate_task_id() > task_id